@@ -0,0 +1,743 @@
+#!/usr/bin/python3
+###############################################################################
+#
+# Copyright (c) 2026 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller Benchmark"""
+
+###############################################################################
+#
+# This benchmark runs the full rvmc install sequence against fleets of
+# simulated BMCs served by the Redfish BMC Simulator and reports how rvmc
+# scales with fleet size and BMC latency.
+#
+# For each latency profile and fleet size it
+#
+#     Step 1: Simulate   ... start the simulator with 'size' BMCs on
+#                            consecutive localhost ports
+#     Step 2: Install    ... run rvmc against all of them at once with
+#                            a timing trace file
+#     Step 3: Measure    ... wall time, user+system CPU time and peak RSS
+#                            of the rvmc process, per stage and per request
+#                            p50/p95/p99 latency and requests per target
+#                            from the trace file
+#
+# Before that it measures rvmc's startup import cost with
+# 'python3 -X importtime' ; the import time of 'python3 -m rvmc --help'
+# and of the stage engine must stay within STARTUP_BUDGETS and neither
+# may import the modules rvmc only imports once they are needed.
+# 'tox -e rvmc-startup' runs this check alone ; see --startup-only.
+#
+# It also measures how long loading one target of a CONFIG_TARGETS
+# target config file takes ; parsed on the first run and from its
+# compiled config cache on the next. The cached load must stay within
+# CONFIG_BUDGET_MS.
+#
+# It then measures the per-target memory footprint ; see MEMORY_PROBE.
+# The stage engine installs MEMORY_TARGETS simulated targets under
+# tracemalloc and the memory each target object still holds once
+# installed must stay within MEMORY_BUDGET_KB.
+#
+# The results are saved as json. Given a baseline results file each run is
+# compared against the baseline run of the same profile and size and the
+# benchmark fails if the wall time, CPU time or any stage's p95 regressed
+# by more than the threshold.
+#
+# Calling Sequence:
+#
+#    > rvmc_benchmark.py --sizes 1,10,100,1000 --profiles local,lan,slow \
+#          --output results.json
+#
+#    > rvmc_benchmark.py --baseline results.json --threshold 0.2 \
+#          --output new_results.json
+#
+#    > rvmc_benchmark.py --startup-only
+#
+#    > rvmc_benchmark.py --memory-only --memory-targets 1000
+#
+#    --sizes <list>        ... comma delimited fleet sizes ; default 1,10,100
+#    --profiles <list>     ... comma delimited latency profiles ; see PROFILES
+#    --repeat <n>          ... runs per profile and size ; the fastest is kept
+#    --baseline <file>     ... results file to compare against
+#    --threshold <ratio>   ... allowed slowdown ; 0.2 = 20%
+#    --min-delta <secs>    ... slowdowns smaller than this are noise
+#    --startup-only        ... only measure the startup import and
+#                              config load cost
+#    --memory-only         ... only measure the startup import cost and
+#                              the per-target memory footprint
+#    --memory-targets <n>  ... targets of the memory measurement
+#
+# Note: rvmc's reachability check is part of each measured install ;
+#       the simulated BMCs answer its tcp connect check. Its image
+#       pre-flight check is not ; no image server serves the simulated
+#       BMCs' image url.
+#
+###############################################################################
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+FEATURE_NAME = 'Redfish Virtual Media Controller Benchmark'
+VERSION_MAJOR = 1
+VERSION_MINOR = 1
+
+TOOL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RVMC_DIR = os.path.join(TOOL_DIR, 'centos', 'docker')
+# the rvmc command line ; python arguments, run with RVMC_DIR on the path
+RVMC = ['-m', 'rvmc']
+SIMULATOR = os.path.join(TOOL_DIR, 'simulator', 'redfish_simulator.py')
+
+# Simulated BMC latency profiles ; simulator options
+#
+#   local ... an idle BMC next door ; measures rvmc's own overhead
+#   lan   ... typical BMC request latency and media/power delays
+#   slow  ... slow, jittery BMC firmware
+PROFILES = {
+    'local': ['--latency', '0', '--mount-delay', '0.5',
+              '--eject-delay', '0.2', '--power-delay', '0.5'],
+    'lan': ['--latency', '0.02', '--latency-jitter', '0.02',
+            '--mount-delay', '2', '--eject-delay', '0.5',
+            '--power-delay', '1'],
+    'slow': ['--latency', '0.25', '--latency-jitter', '0.25',
+             '--mount-delay', '5', '--eject-delay', '1',
+             '--power-delay', '3'],
+}
+
+# max seconds for the simulator to start or one rvmc run to complete
+SIMULATOR_START_SECS = 120
+RVMC_TIMEOUT_SECS = 3600
+
+PERCENTILES = [50, 95, 99]
+
+# Startup import budgets ; name -> (python arguments, max import
+# milliseconds, modules that must not be imported). Each is measured
+# STARTUP_RUNS times and the fastest run is kept.
+STARTUP_BUDGETS = {
+    'help': (RVMC + ['--help'], 40,
+             ['asyncio', 'ssl', 'yaml', 'redfish', 'rvmc.engine']),
+    'engine': (['-c', 'import rvmc.engine'], 200,
+               ['yaml', 'redfish']),
+}
+STARTUP_RUNS = 5
+
+# Config load measurement ; the number of targets in the config file
+# and the max milliseconds loading one of them from the config cache
+# may take, imports included
+CONFIG_TARGETS = 5000
+CONFIG_BUDGET_MS = 50
+
+# Run by the config load measurement's python process with the config
+# file, cache file and target name as arguments ; prints the load ms
+CONFIG_PROBE = """
+import sys, time
+start = time.perf_counter()
+from rvmc import config
+cfg = config.load_config(sys.argv[1], sys.argv[2])
+target = cfg['virtual_media_iso'][sys.argv[3]]
+sys.stderr.write('%.1f' % ((time.perf_counter() - start) * 1000))
+"""
+
+# Per-target memory measurement ; the number of simulated targets and
+# the max kilobytes each installed target object may hold
+MEMORY_TARGETS = 100
+MEMORY_BUDGET_KB = 16
+
+# Run by the memory measurement's python process with the config file
+# and results file as arguments. stdout carries the install logs so
+# the results are written to the results file.
+MEMORY_PROBE = """
+import gc, json, sys, tracemalloc
+from rvmc import config, engine
+# the codec of the first tls hostname ; a one time import, not per target
+import encodings.idna
+cfg = config.load_config(sys.argv[1])
+engine.image_check = 'none'
+gc.collect()
+tracemalloc.start()
+base = tracemalloc.get_traced_memory()[0]
+target_objects = engine.load_targets(cfg)
+count = max(len(target_objects), 1)
+created = tracemalloc.get_traced_memory()[0] - base
+if hasattr(tracemalloc, 'reset_peak'):
+    tracemalloc.reset_peak()
+failed = engine.install(target_objects, parallel=count, probe='none')
+gc.collect()
+installed, peak = tracemalloc.get_traced_memory()
+with open(sys.argv[2], 'w') as results:
+    json.dump({'targets': count, 'failed': len(failed),
+               'object_bytes': sys.getsizeof(target_objects[0]),
+               'created_kb': round(created / 1024.0 / count, 2),
+               'installed_kb': round((installed - base) / 1024.0 / count, 2),
+               'peak_kb': round((peak - base) / 1024.0 / count, 2)},
+              results)
+"""
+
+
+def percentile(values, pct):
+    """
+    Return the nearest rank percentile of a list of values
+
+    :param values: the values
+    :type values: list
+    :param pct: the percentile ; 0..100
+    :type pct: int
+    """
+
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = int(round(pct / 100.0 * len(ordered) + 0.5)) - 1
+    return ordered[min(max(rank, 0), len(ordered) - 1)]
+
+
+def summarize(values):
+    """Return a p50/p95/p99 dictionary of a list of values"""
+
+    summary = {}
+    for pct in PERCENTILES:
+        value = percentile(values, pct)
+        summary['p%d' % pct] = None if value is None else round(value, 1)
+    summary['count'] = len(values)
+    return summary
+
+
+def parse_importtime(output):
+    """
+    Parse 'python3 -X importtime' output.
+
+    :param output: the importtime stderr lines
+    :type output: str
+    :returns (import microseconds, set of imported module names) of the
+             imports that follow the interpreter's own site imports
+    """
+
+    total = 0
+    modules = set()
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        fields = line.split('|')
+        if len(fields) != 3:
+            continue
+        name = fields[2].rstrip()
+        entries.append((name.strip(), name.startswith(' ' * 2),
+                        int(fields[1])))
+    # the interpreter imports site ; and all it needs ; before it runs
+    # any code of its own
+    sites = [index for index, entry in enumerate(entries)
+             if entry[0] == 'site']
+    if sites:
+        entries = entries[sites[-1] + 1:]
+    for name, nested, cumulative in entries:
+        modules.add(name)
+        if not nested:
+            total += cumulative
+    return total, modules
+
+
+def measure_startup():
+    """
+    Measure the startup import cost of rvmc against STARTUP_BUDGETS.
+
+    :returns dictionary of name -> import ms, budget ms and the
+             modules imported that should not have been
+    """
+
+    results = {}
+    env = dict(os.environ, PYTHONPATH=RVMC_DIR)
+    for name, (arguments, budget, forbidden) in \
+            sorted(STARTUP_BUDGETS.items()):
+        runs = []
+        for _run in range(STARTUP_RUNS):
+            process = subprocess.run([sys.executable, '-X', 'importtime'] +
+                                     arguments,
+                                     stdout=subprocess.DEVNULL,
+                                     stderr=subprocess.PIPE,
+                                     cwd=RVMC_DIR, env=env,
+                                     universal_newlines=True, check=True)
+            runs.append(parse_importtime(process.stderr))
+        total, modules = min(runs, key=lambda run: run[0])
+        results[name] = {'import_ms': round(total / 1000.0, 1),
+                         'budget_ms': budget,
+                         'unexpected': sorted(set(forbidden) & modules)}
+    return results
+
+
+def measure_config(work_dir):
+    """
+    Measure loading one target of a CONFIG_TARGETS target config file.
+
+    :returns dictionary of the parse and cached load ms and the budget
+    """
+
+    config_file = os.path.join(work_dir, 'config-x%d.yaml' % CONFIG_TARGETS)
+    cache_file = config_file + '.cache'
+    with open(config_file, 'w') as config:
+        config.write("virtual_media_iso:\n")
+        for index in range(CONFIG_TARGETS):
+            config.write("    bmc%d:\n"
+                         "        bmc_address: 10.%d.%d.%d\n"
+                         "        bmc_username: root\n"
+                         "        bmc_password: cGFzc3dvcmQ=\n"
+                         "        image: http://10.0.0.1:8080/boot.iso\n" %
+                         (index, index >> 16, (index >> 8) & 255,
+                          index & 255))
+    if os.path.exists(cache_file):
+        os.unlink(cache_file)
+
+    runs = []
+    env = dict(os.environ, PYTHONPATH=RVMC_DIR)
+    for _run in range(STARTUP_RUNS + 1):
+        process = subprocess.run([sys.executable, '-c', CONFIG_PROBE,
+                                  config_file, cache_file,
+                                  'bmc%d' % (CONFIG_TARGETS // 2)],
+                                 stdout=subprocess.DEVNULL,
+                                 stderr=subprocess.PIPE,
+                                 cwd=RVMC_DIR, env=env,
+                                 universal_newlines=True, check=True)
+        runs.append(float(process.stderr.strip().splitlines()[-1]))
+    # the first run parses the config and writes the cache
+    return {'targets': CONFIG_TARGETS,
+            'parse_ms': runs[0],
+            'cached_ms': min(runs[1:]),
+            'budget_ms': CONFIG_BUDGET_MS}
+
+
+def print_config(config):
+    """Print the config load times ; returns the failures"""
+
+    problem = ''
+    if config['cached_ms'] > config['budget_ms']:
+        problem = "over budget"
+    sys.stdout.write("%-8s %8s %10s %10s %10s  %s\n" %
+                     ('Config', 'Targets', 'Parse ms', 'Cached ms',
+                      'Budget ms', 'Result'))
+    sys.stdout.write("%-8s %8d %10.1f %10.1f %10d  %s\n" %
+                     ('load', config['targets'], config['parse_ms'],
+                      config['cached_ms'], config['budget_ms'],
+                      problem or 'ok'))
+    return ["config load %s" % problem] if problem else []
+
+
+def print_startup(startup):
+    """Print the startup import cost table ; returns the failures"""
+
+    failures = []
+    sys.stdout.write("%-8s %10s %10s  %s\n" %
+                     ('Startup', 'Import ms', 'Budget ms', 'Result'))
+    for name, result in sorted(startup.items()):
+        problems = []
+        if result['import_ms'] > result['budget_ms']:
+            problems.append("over budget")
+        if result['unexpected']:
+            problems.append("imports %s" % ', '.join(result['unexpected']))
+        sys.stdout.write("%-8s %10.1f %10d  %s\n" %
+                         (name, result['import_ms'], result['budget_ms'],
+                          ' ; '.join(problems) or 'ok'))
+        failures.extend(["startup %s %s" % (name, problem)
+                         for problem in problems])
+    return failures
+
+
+def measure_memory(size, base_port, work_dir):
+    """
+    Measure the per-target memory footprint of the stage engine.
+
+    :returns dictionary of the kilobytes per target once created,
+             once installed and at the install's peak
+    """
+
+    config_file = os.path.join(work_dir, 'memory-x%d.yaml' % size)
+    results_file = os.path.join(work_dir, 'memory-x%d.json' % size)
+    log_file = os.path.join(work_dir, 'memory-x%d.log' % size)
+    simulator = start_simulator(size, 'local', base_port, config_file)
+    try:
+        with open(log_file, 'w') as log:
+            # a failed probe is reported with its log ; not raised
+            process = subprocess.run([sys.executable, '-c', MEMORY_PROBE,
+                                      config_file, results_file],
+                                     stdout=log, stderr=log, cwd=RVMC_DIR,
+                                     env=dict(os.environ,
+                                              PYTHONPATH=RVMC_DIR),
+                                     timeout=RVMC_TIMEOUT_SECS, check=False)
+    finally:
+        stop_simulator(simulator)
+    memory = {'budget_kb': MEMORY_BUDGET_KB,
+              'log': log_file,
+              'exit_code': process.returncode}
+    if process.returncode == 0:
+        with open(results_file, 'r') as results:
+            memory.update(json.load(results))
+    return memory
+
+
+def print_memory(memory):
+    """Print the per-target memory footprint ; returns the failures"""
+
+    if memory.get('exit_code'):
+        return ["memory measurement ; see %s" % memory['log']]
+    sys.stdout.write("%-8s %8s %10s %10s %10s %10s  %s\n" %
+                     ('Memory', 'Targets', 'Object B', 'Created KB',
+                      'Install KB', 'Peak KB', 'Result'))
+    problems = []
+    if memory['failed']:
+        problems.append("%d targets failed" % memory['failed'])
+    if memory['installed_kb'] > memory['budget_kb']:
+        problems.append("over budget of %d KB" % memory['budget_kb'])
+    sys.stdout.write("%-8s %8d %10d %10.2f %10.2f %10.2f  %s\n" %
+                     ('target', memory['targets'], memory['object_bytes'],
+                      memory['created_kb'], memory['installed_kb'],
+                      memory['peak_kb'], ' ; '.join(problems) or 'ok'))
+    return ["memory %s" % problem for problem in problems]
+
+
+def raise_open_file_limit():
+    """
+    Raise the open file soft limit to the hard limit ; inherited by
+    the simulator and rvmc so large fleets don't run out of sockets.
+    """
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+
+def start_simulator(size, profile, base_port, config_file):
+    """
+    Start the simulator and wait until it is serving.
+
+    :returns the simulator process
+    """
+
+    command = [sys.executable, SIMULATOR,
+               '--count', str(size),
+               '--base-port', str(base_port),
+               '--vendor', 'mixed',
+               '--seed', '1',
+               '--write-config', config_file] + PROFILES[profile]
+    simulator = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT,
+                                 universal_newlines=True)
+    deadline = time.monotonic() + SIMULATOR_START_SECS
+    while time.monotonic() < deadline:
+        line = simulator.stdout.readline()
+        if not line:
+            break
+        if 'serving' in line:
+            return simulator
+    simulator.kill()
+    simulator.wait()
+    raise RuntimeError("simulator failed to start")
+
+
+def stop_simulator(simulator):
+    """Stop the simulator"""
+
+    simulator.terminate()
+    try:
+        simulator.wait(10)
+    except subprocess.TimeoutExpired:
+        simulator.kill()
+        simulator.wait()
+
+
+def run_rvmc(size, config_file, trace_file, log_file):
+    """
+    Install all the simulated targets at once with rvmc
+
+    :returns (exit code, wall seconds, cpu seconds, peak rss kb)
+    """
+
+    command = [sys.executable] + RVMC + ['--config', config_file,
+                                         '--parallel', str(max(size, 2)),
+                                         '--image-check', 'none',
+                                         '--journal', 'none',
+                                         '--trace-file', trace_file]
+    start_time = time.monotonic()
+    with open(log_file, 'w') as log:
+        rvmc = subprocess.Popen(command, stdout=log, stderr=log,
+                                cwd=RVMC_DIR,
+                                env=dict(os.environ, PYTHONPATH=RVMC_DIR))
+        deadline = start_time + RVMC_TIMEOUT_SECS
+        while True:
+            pid, status, usage = os.wait4(rvmc.pid, os.WNOHANG)
+            if pid:
+                break
+            if time.monotonic() > deadline:
+                rvmc.kill()
+                pid, status, usage = os.wait4(rvmc.pid, 0)
+                break
+            time.sleep(0.05)
+    wall = time.monotonic() - start_time
+    rvmc.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else 1
+
+    # ru_maxrss is in kilobytes on linux
+    return (rvmc.returncode, wall,
+            usage.ru_utime + usage.ru_stime, usage.ru_maxrss)
+
+
+def parse_trace(trace_file):
+    """
+    Summarize the rvmc trace file
+
+    :returns dictionary of stage, request and target summaries
+    """
+
+    stages = {}
+    requests = []
+    requests_per_target = {}
+    targets = {'ok': 0, 'failed': 0}
+    with open(trace_file, 'r') as trace:
+        for line in trace:
+            record = json.loads(line)
+            if record['type'] == 'stage':
+                stages.setdefault(record['stage'], []).append(record['ms'])
+            elif record['type'] == 'request':
+                requests.append(record['ms'])
+                requests_per_target[record['target']] = \
+                    requests_per_target.get(record['target'], 0) + 1
+            elif record['type'] == 'target':
+                targets[record['result']] = \
+                    targets.get(record['result'], 0) + 1
+
+    counts = list(requests_per_target.values())
+    return {'targets': targets,
+            'stage_ms': dict((stage, summarize(values))
+                             for stage, values in stages.items()),
+            'request_ms': summarize(requests),
+            'requests_per_target': {
+                'mean': round(sum(counts) / len(counts), 1) if counts else 0,
+                'max': max(counts) if counts else 0}}
+
+
+def run_one(size, profile, base_port, work_dir):
+    """Benchmark one fleet size and latency profile"""
+
+    name = "%s-%d" % (profile, size)
+    config_file = os.path.join(work_dir, name + '.yaml')
+    trace_file = os.path.join(work_dir, name + '.ndjson')
+    log_file = os.path.join(work_dir, name + '.log')
+    if os.path.exists(trace_file):
+        os.remove(trace_file)
+
+    simulator = start_simulator(size, profile, base_port, config_file)
+    try:
+        code, wall, cpu, rss = run_rvmc(size, config_file,
+                                        trace_file, log_file)
+    finally:
+        stop_simulator(simulator)
+
+    result = {'profile': profile,
+              'size': size,
+              'exit_code': code,
+              'wall_secs': round(wall, 3),
+              'cpu_secs': round(cpu, 3),
+              'peak_rss_kb': rss,
+              'log': log_file}
+    if os.path.exists(trace_file):
+        result.update(parse_trace(trace_file))
+    return result
+
+
+def compare(results, baseline, threshold, min_delta):
+    """
+    Compare results against a baseline.
+
+    :returns list of regression descriptions
+    """
+
+    baseline_runs = dict(((run['profile'], run['size']), run)
+                         for run in baseline.get('runs', []))
+    regressions = []
+
+    def check(what, new, old, scale):
+        if new is None or old is None:
+            return
+        if new > old * (1 + threshold) and new - old > min_delta * scale:
+            regressions.append("%s ; %.3f -> %.3f (+%.0f%%)" %
+                               (what, old, new, (new / old - 1) * 100
+                                if old else float('inf')))
+
+    for run in results:
+        old = baseline_runs.get((run['profile'], run['size']))
+        if old is None:
+            continue
+        label = "%s x%d" % (run['profile'], run['size'])
+        check(label + " wall_secs", run['wall_secs'], old['wall_secs'], 1)
+        check(label + " cpu_secs", run['cpu_secs'], old['cpu_secs'], 1)
+        for stage, summary in run.get('stage_ms', {}).items():
+            old_summary = old.get('stage_ms', {}).get(stage)
+            if old_summary:
+                check("%s stage '%s' p95_ms" % (label, stage),
+                      summary['p95'], old_summary['p95'], 1000)
+    return regressions
+
+
+def print_report(results):
+    """Print a summary table"""
+
+    row = "%-6s %6s %9s %8s %9s %10s %10s %10s %9s  %s"
+    sys.stdout.write(row % ('Prof', 'Size', 'Wall(s)', 'CPU(s)', 'RSS(MB)',
+                            'Req p50ms', 'Req p95ms', 'Req p99ms',
+                            'Req/Tgt', 'Result') + "\n")
+    for run in results:
+        request_ms = run.get('request_ms', {})
+        targets = run.get('targets', {})
+        sys.stdout.write(row % (run['profile'], run['size'],
+                                "%.2f" % run['wall_secs'],
+                                "%.2f" % run['cpu_secs'],
+                                "%.1f" % (run['peak_rss_kb'] / 1024.0),
+                                request_ms.get('p50'),
+                                request_ms.get('p95'),
+                                request_ms.get('p99'),
+                                run.get('requests_per_target',
+                                        {}).get('mean'),
+                                "%d ok ; %d failed" %
+                                (targets.get('ok', 0),
+                                 targets.get('failed', 0))) + "\n")
+        for stage, summary in sorted(run.get('stage_ms', {}).items()):
+            sys.stdout.write("    %-48s p50 %9s  p95 %9s  p99 %9s ms\n" %
+                             (stage, summary['p50'], summary['p95'],
+                              summary['p99']))
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(description=FEATURE_NAME)
+    parser.add_argument("--sizes", type=str, default='1,10,100',
+                        help="Comma delimited fleet sizes")
+    parser.add_argument("--profiles", type=str, default='local,lan',
+                        help="Comma delimited latency profiles ; one or "
+                             "more of %s" % ', '.join(sorted(PROFILES)))
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Runs per profile and size ; the fastest "
+                             "is kept")
+    parser.add_argument("--base-port", type=int, default=19000,
+                        help="First simulated BMC port")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Results json file")
+    parser.add_argument("--baseline", type=str, default=None,
+                        help="Baseline results json file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown ratio ; default 0.2")
+    parser.add_argument("--min-delta", type=float, default=0.25,
+                        help="Ignore slowdowns under this many seconds")
+    parser.add_argument("--work-dir", type=str, default=None,
+                        help="Directory for configs, traces and logs")
+    parser.add_argument("--startup-only", action='store_true',
+                        help="Only measure the startup import and config "
+                             "load cost")
+    parser.add_argument("--memory-only", action='store_true',
+                        help="Only measure the startup import cost and "
+                             "the per-target memory footprint")
+    parser.add_argument("--memory-targets", type=int, default=MEMORY_TARGETS,
+                        help="Targets of the memory measurement ; 0 "
+                             "skips it")
+    options = parser.parse_args(argv)
+
+    options.size_list = [int(size) for size in options.sizes.split(',')]
+    options.profile_list = options.profiles.split(',')
+    unknown = set(options.profile_list) - set(PROFILES)
+    if unknown:
+        parser.error("unknown profiles: %s" % ', '.join(sorted(unknown)))
+    return options
+
+
+def main(argv=None):
+    """Run the benchmark ; returns 1 if a run failed or regressed"""
+
+    options = parse_args(argv)
+    raise_open_file_limit()
+    work_dir = options.work_dir or tempfile.mkdtemp(prefix='rvmc-bench-')
+    if not os.path.isdir(work_dir):
+        os.makedirs(work_dir)
+
+    sys.stdout.write("%s version %d.%d ; work dir %s\n" %
+                     (FEATURE_NAME, VERSION_MAJOR, VERSION_MINOR, work_dir))
+
+    startup = measure_startup()
+    over_budget = print_startup(startup)
+    config = measure_config(work_dir)
+    over_budget.extend(print_config(config))
+
+    memory = {}
+    if options.memory_targets > 0 and not options.startup_only:
+        sys.stdout.write("Measuring memory x%d ...\n" %
+                         options.memory_targets)
+        sys.stdout.flush()
+        memory = measure_memory(options.memory_targets,
+                                options.base_port, work_dir)
+        over_budget.extend(print_memory(memory))
+
+    results = []
+    for profile in options.profile_list:
+        if options.startup_only or options.memory_only:
+            break
+        for size in options.size_list:
+            runs = []
+            for _repeat in range(max(options.repeat, 1)):
+                sys.stdout.write("Running %s x%d ...\n" % (profile, size))
+                sys.stdout.flush()
+                runs.append(run_one(size, profile,
+                                    options.base_port, work_dir))
+            results.append(min(runs, key=lambda run: run['wall_secs']))
+
+    if results:
+        print_report(results)
+
+    report = {'meta': {'version': "%d.%d" % (VERSION_MAJOR, VERSION_MINOR),
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%SZ',
+                                             time.gmtime()),
+                       'python': platform.python_version(),
+                       'host': platform.node(),
+                       'cpus': os.cpu_count()},
+              'startup': startup,
+              'config': config,
+              'memory': memory,
+              'runs': results}
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(report, output, indent=1, sort_keys=True)
+        sys.stdout.write("Results saved to %s\n" % options.output)
+
+    failed = [run for run in results
+              if run['exit_code'] or run.get('targets', {}).get('failed')]
+    for run in failed:
+        sys.stdout.write("FAILED: %s x%d ; see %s\n" %
+                         (run['profile'], run['size'], run['log']))
+    for failure in over_budget:
+        sys.stdout.write("FAILED: %s\n" % failure)
+
+    regressions = []
+    if options.baseline:
+        with open(options.baseline, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline,
+                              options.threshold, options.min_delta)
+        for regression in regressions:
+            sys.stdout.write("REGRESSION: %s\n" % regression)
+        if not regressions:
+            sys.stdout.write("No regressions against %s (threshold %d%%)\n" %
+                             (options.baseline, options.threshold * 100))
+
+    return 1 if failed or over_budget or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,391 @@
+###############################################################################
+#
+# Copyright (c) 2019-2020 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller"""
+
+###############################################################################
+#
+# This Redfish Virtual Media Controller forces an install of a specified BMC's
+# host using the Redfish Platform management protocol.
+#
+# To do so the following Redfish operations are performed
+#
+#     Step 1: Client Connect ... Establish a client connection to the BMC
+#     Step 2: Root Query     ... Learn Redfish Services offered by the BMC
+#     Step 3: Find CD/DVD    ... Locate the virtual media CD/DVD device
+#     Step 4: Power Off Host ... Host power needs to be off
+#     Step 5: Eject Iso      ... Eject iso if needed
+#     Step 6: Inject Iso     ... Inject the URL based ISO image into CD/DVD
+#     Step 7: Force DVD Boot ... Set Net boot device to be CD/DVD
+#     Step 8: Power On Host  ... Host will boot and install from DVD
+#
+# Note: All server starting state conditions such as the server running or
+#       being stuck in POST, say at the grub prompt due to previous host boot
+#       failure, the host needs to be in the powered off state for the ISO
+#       Insertion and Set DVD for Next Boot steps.
+#
+# Calling Sequence: Single Server Config
+#
+#    > python3 -m rvmc
+#
+#    Config file assumed to be '/etc/rvmc.yaml' with the following format
+#
+#    bmc_address: <bmc ip address>
+#    bmc_username: <the bmc username>
+#    bmc_password: <base64 encoded password>
+#    image: http://<ip>:<port>/<path>/bootimage.iso
+#
+#    An optional 'bmc_port: <port>' selects a Redfish https port other
+#    than 443 ; as served by the Redfish BMC Simulator
+#    (tools/rvmc/simulator).
+#
+#    Real Example:
+#
+#    bmc_address: 123.45.67.89
+#    bmc_username: root
+#    bmc_password: TGk2OW51eCo=
+#    image: http://[2620:10a:a001:a103::81]:8080/iso/sub_cloud_bootimage.iso
+#
+# Optional Arguments: Additional arguments inform the tool to look for a
+#                     multi target config file and enable debug logs
+#
+#    --target <list of one or more comma separated targets>
+#
+#    Multi Server Config : Each BMC is represented by an arbitrary target name
+#    -------------------   under a primary label called virtual_media_iso.
+#
+#    Config file assumed to be '/etc/rvmc.yaml' with the following format
+#
+#    virtual_media_iso:
+#        dcloud1:
+#            bmc_address: <bmc ip address>
+#            bmc_username: <the bmc username>
+#            bmc_password: <base64 encoded>
+#            image: http://<ip>:<port>/<path>/bootimage.iso
+#        dcloud2:
+#            bmc_address: <bmc ip address>
+#            bmc_username: <the bmc username>
+#            bmc_password: <base64 encoded>
+#            image: http://<ip>:<port>/<path>/bootimage.iso
+#        dcloud3:
+#            bmc_address: <bmc ip address>
+#            bmc_username: <the bmc username>
+#            bmc_password: <base64 encoded>
+#            image: http://<ip>:<port>/<path>/bootimage.iso
+#
+#    > python3 -m rvmc --target dcloud1,dcloud2,dcloud3 --debug level
+#
+#    --config <file>
+#
+#             Note: Read the config from 'file' rather than the default
+#                   '/etc/rvmc.yaml' ; as written by the Redfish BMC
+#                   Simulator and used by the rvmc benchmark.
+#
+#    --config-cache <file|none>
+#
+#             Note: Compile the config file into 'file' the first time
+#                   it is parsed ; default none, owner only permissions.
+#                   Put it on a writable volume ; the config file is
+#                   usually a read-only mount. Later runs load the cache
+#                   and only decode the targets they install, so a
+#                   config of thousands of targets loads in
+#                   milliseconds. The cache is rebuilt once the config
+#                   file changes. The yaml is parsed with the C LibYAML
+#                   loader if PyYAML has it.
+#
+#    --debug <0 .. 4>
+#
+#             Note: 0   no debug info
+#                   1 = execution stage
+#                   2 + http request logs
+#                   3 + headers and payloads and misc other
+#                   4 + json output of all command responses
+#
+#    > python3 -m rvmc --target dcloud1,dcloud2,dcloud3 --debug <level>
+#
+#    --parallel <max number of targets to install at the same time>
+#
+#             Note: 0 or 1 installs one target at a time.
+#
+#                   N > 1 installs up to N targets at the same time.
+#                   Each log is prefixed with its [target] label and a
+#                   per target summary table is printed at the end.
+#
+#                   Either way a failing target does not stop the
+#                   others. Each failed target's error is logged at the
+#                   end and the exit code is 1 if any target failed.
+#
+#    > python3 -m rvmc --target dcloud1,dcloud2,dcloud3 --parallel 3
+#
+#    --transport <asyncio|redfish>
+#
+#             Note: asyncio = built in asyncio Redfish transport (default)
+#                             ; all targets are driven from one thread.
+#                   redfish = the Redfish Python Library transport
+#                             ; each request runs in a worker thread.
+#
+#    --discovery-cache <file> [--discovery-cache-ttl <seconds>]
+#
+#             Note: Remember each BMC's discovered Systems member,
+#                   CD/DVD virtual media, reset and boot override info
+#                   in 'file'. Repeat runs against the same BMC skip the
+#                   Managers, Systems and Virtual Media discovery stages
+#                   after one validation GET. Entries are keyed by BMC
+#                   address and root query identity and expire after
+#                   the ttl ; default 86400 seconds (1 day).
+#
+#    --session-cache <file> [--logout-cached]
+#
+#             Note: Leave each BMC's X-Auth-Token session open and
+#                   remember it in 'file' ; owner only permissions.
+#                   Later runs reuse it after one validation GET of the
+#                   session rather than creating a new one, and a session
+#                   that expires while in use is renewed on its first
+#                   401. --logout-cached logs out of the targets' cached
+#                   sessions and exits.
+#
+#    > python3 -m rvmc --target dcloud1 --session-cache /var/lib/rvmc/sessions
+#    > python3 -m rvmc --session-cache /var/lib/rvmc/sessions --logout-cached
+#
+#    --reconcile
+#
+#             Note: Read the BMC's current virtual media, boot override
+#                   and power state after discovery and only perform
+#                   the install steps that are not already done ; so a
+#                   retried install does not eject and re-insert an
+#                   already mounted image or re-set the boot override.
+#                   Skipped steps are logged.
+#
+#    --mount-cap <count> [--vendor-cap <count>] [--canary <count>]
+#
+#             Note: Release the targets in waves so hundreds of BMCs
+#                   don't all pull the same image from one image server
+#                   at the same time. --mount-cap limits the targets of
+#                   each image host ; the host:port of the image url,
+#                   with an image inserted at the same time ; a target
+#                   holds its mount slot until its install ends.
+#                   --vendor-cap limits the targets of each BMC vendor
+#                   with a session at the same time. --canary installs
+#                   that many targets first ; one per image host first,
+#                   and the others only if all of them succeed. With
+#                   any of them the targets start longest first by
+#                   their last install time in the journal. 0 = no cap
+#                   or canary (default).
+#
+#    > python3 -m rvmc --parallel 64 --mount-cap 16 --vendor-cap 32 --canary 2
+#
+#    --serial-stages
+#
+#             Note: Each target's install runs as a small graph of
+#                   stages ; the stages that don't depend on each other
+#                   run at the same time. The Managers and Systems
+#                   discovery, the eject and the power off, and the boot
+#                   override capabilities read and the insert overlap.
+#                   The host is always off before the image is inserted
+#                   and the boot override set, and the boot override is
+#                   only set once the image is inserted. Each target's
+#                   critical path ; the time of its stages that didn't
+#                   overlap others, is logged and shown in the summary
+#                   table and trace file. --serial-stages runs the
+#                   stages one at a time.
+#
+#    --retry-attempts <count> [--retry-budget <count>]
+#                             [--retry-cap <seconds>]
+#
+#             Note: Retry requests that fail with a transient error ;
+#                   a 503, 429 or similar busy status or a connection
+#                   error. GETs and PATCHes are retried on more of them
+#                   than POST actions, which are only retried when the
+#                   BMC surely did not act on them. Each request gets
+#                   up to 'attempts' tries ; default 4, 1 = no retries.
+#                   The wait before a retry is the BMC's Retry-After or
+#                   a random 0 .. 0.5 * 2^n seconds up to 'cap' ; default
+#                   8. A target stops retrying after 'budget' retries ;
+#                   default 30. Retries are logged per target and
+#                   counted in the summary and metrics file.
+#
+#    --probe <any|tcp|icmp|none> [--probe-timeout <seconds>]
+#                                [--probe-attempts <count>]
+#
+#             Note: Before the install phase, check that every target's
+#                   BMC is reachable ; all targets at the same time and
+#                   in process. tcp = connect to the Redfish port, icmp
+#                   = echo request ; needs a raw socket or the ping
+#                   socket group permission, any = either one answers
+#                   (default), none = skip the check. Each target gets
+#                   'attempts' tries of up to 'timeout' seconds ;
+#                   default 3 tries of 2 seconds. Unreachable targets
+#                   are reported and dropped from the install.
+#
+#    --image-check <sample|verify|none> [--image-check-timeout <seconds>]
+#
+#             Note: After the reachability check, check each unique
+#                   image url once ; all of them at the same time. A
+#                   HEAD and a 1 MB Range GET learn the image's size,
+#                   whether its server serves byte ranges and its
+#                   throughput, and an optional <image url>.sha256
+#                   sidecar is read. verify also downloads the whole
+#                   image and compares its sha256 with the sidecar's.
+#                   The targets of an image that can't be fetched fail
+#                   before any host is powered off. Each request may
+#                   take up to 'timeout' seconds ; default 10. none, the
+#                   default, skips the check ; the image is fetched by
+#                   the BMCs and rvmc may have no route to its server.
+#
+#    --serve-image <file> [--serve-address <address>] [--serve-port <port>]
+#                         [--serve-max-transfers <count>]
+#                         [--serve-cert <file> [--serve-key <file>]]
+#
+#             Note: Serve a local install image file from rvmc itself
+#                   and point every target's image url at it ; at the
+#                   local address of the route to each target's BMC.
+#                   Byte ranges and keep-alive connections are served
+#                   and the file is sent with sendfile, or from an mmap,
+#                   without being read into the process. Listens on all
+#                   ipv4 and ipv6 addresses ; or 'address', on port 8080
+#                   ; 0 = any free port. At most 'count' transfers run
+#                   at the same time ; default 32, the others wait.
+#                   --serve-cert serves https. A <file>.sha256 sidecar
+#                   is served too. Per client throughput is logged at
+#                   exit and served as json at /_rvmc/stats.
+#
+#    > python3 -m rvmc --serve-image /opt/images/bootimage.iso --parallel 32
+#
+#    --image-cache <dir> [--image-cache-size <GB>]
+#
+#             Note: Serve the targets' configured images through a read
+#                   through caching proxy ; the built-in image server
+#                   with the --serve-* options above. Each target's
+#                   image url is rewritten to the proxy, which fetches
+#                   each upstream image once into 'dir' ; named by its
+#                   sha256. Range requests are answered as soon as their
+#                   bytes arrive, before the fetch completes. Cached
+#                   images are revalidated with a HEAD on first use and
+#                   fetched again if they changed upstream. The least
+#                   recently used images are evicted to keep the cache
+#                   under 'GB' ; default 20. So a region fetches each
+#                   image over the WAN once rather than once per BMC.
+#
+#    > python3 -m rvmc --image-cache /var/lib/rvmc/images --parallel 32
+#
+#    --daemon <unix socket path>
+#
+#             Note: Run as a long running install daemon that serves
+#                   install, eject and power jobs for the config file's
+#                   targets over a local http API on the UNIX socket.
+#                   Each target's Redfish session and discovery info are
+#                   kept warm between jobs. --parallel limits the number
+#                   of targets that run a job at the same time ; default
+#                   16. See rvmc/daemon.py for the API.
+#
+#    > python3 -m rvmc --daemon /run/rvmc/rvmc.sock --config /etc/rvmc.yaml
+#
+#    > curl --unix-socket /run/rvmc/rvmc.sock http://rvmc/jobs \
+#           -d '{"operation": "install", "targets": ["dcloud1"], \
+#                "stream": true}'
+#
+#    --trace-file <file>
+#
+#             Note: Append one json line per http request and per
+#                   execution stage with its latency in milliseconds,
+#                   and one per target with its result and critical
+#                   path. Written at every debug level.
+#
+#    --metrics-file <file>
+#
+#             Note: Write stage, request and target latency histograms
+#                   labeled by BMC vendor and model in the Prometheus
+#                   textfile format ; for the node exporter textfile
+#                   collector.
+#
+#    --record <dir>
+#
+#             Note: Record every Redfish request of each target, with
+#                   its reply and latency, in a gzip json lines cassette
+#                   file in 'dir' ; <target>.jsonl.gz. Passwords and
+#                   session tokens are not recorded.
+#
+#    --replay <dir> [--replay-speed <N>]
+#
+#             Note: Answer each target's Redfish requests from its
+#                   recorded cassette instead of its BMC ; after the
+#                   recorded latency. No BMC, host or image server is
+#                   used ; the reachability and image checks are
+#                   skipped. The stages wait and time out against a clock 'N'
+#                   times faster than real time ; default 1, the
+#                   recorded timing. For regression and performance
+#                   tests of the stage logic of each vendor's firmware.
+#
+#    > python3 -m rvmc --record /var/tmp/cassettes --target dcloud1
+#    > python3 -m rvmc --replay /var/tmp/cassettes --replay-speed 50
+#
+#    --journal <file|none> [--resume]
+#
+#             Note: Record each target's install progress ; its last
+#                   completed stage, image and timestamps, in 'file'
+#                   within a second of every stage ; default none. Put
+#                   it on a volume that outlives the pod.
+#
+#                   --resume continues an interrupted run ; targets the
+#                   journal shows are done with the same address and
+#                   image are skipped and the others are re-verified
+#                   with a reconcile plan so steps that are already
+#                   done are not repeated.
+#
+#    > python3 -m rvmc --journal /var/lib/rvmc/rvmc.journal --resume
+#
+#    --failed-targets <file>
+#
+#             Note: Write the comma delimited list of the targets that
+#                   failed, or were unreachable, to 'file' ; empty if
+#                   none did. Feed it back to retry just those targets.
+#
+#    > python3 -m rvmc --target $(cat failed.txt) --failed-targets failed.txt
+#
+###############################################################################
+#
+# Package layout:
+#
+#   rvmc.cli        ... command line ; main() is the entry point of
+#                       'python3 -m rvmc'
+#   rvmc.config     ... config file loading and its compiled cache
+#   rvmc.engine     ... stage engine ; VmcObject, install(), ...
+#   rvmc.transport  ... Redfish http transports
+#   rvmc.daemon     ... install daemon ; --daemon
+#   rvmc.image      ... install image pre-flight check
+#   rvmc.isoserver  ... built-in install image server ; --serve-image
+#   rvmc.imagecache ... install image caching proxy ; --image-cache
+#   rvmc.schedule   ... install wave scheduler ; --mount-cap, --canary
+#   rvmc.cassette   ... request recording and replay ; --record, --replay
+#   rvmc.errors     ... per target stage errors
+#   rvmc.log        ... logging
+#
+# Importing the package only imports this file ; each module imports
+# its own dependencies.
+#
+###############################################################################
+
+FEATURE_NAME = 'Redfish Virtual Media Controller'
+VERSION_MAJOR = 3
+VERSION_MINOR = 0
+
+# The host system's mounted rvmc config file
+CONFIG_FILE = '/etc/rvmc.yaml'
+
+
+def main(argv=None):
+    """
+    Command line entry point ; see rvmc.cli.main
+
+    :param argv: command line arguments ; sys.argv[1:] if None
+    :type argv: list
+    :returns the exit code
+    """
+
+    from rvmc import cli
+
+    return cli.main(argv)
@@ -0,0 +1,14 @@
+###############################################################################
+#
+# Copyright (c) 2019-2020 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller ; python3 -m rvmc"""
+
+import sys
+
+from rvmc import main
+
+sys.exit(main())
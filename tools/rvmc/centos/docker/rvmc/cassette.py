@@ -0,0 +1,417 @@
+###############################################################################
+#
+# Copyright (c) 2026 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller request recording and replay"""
+
+###############################################################################
+#
+# An install is a sequence of Redfish requests whose replies steer the
+# stages ; and each BMC vendor's firmware replies differently. A
+# recorded install replays the stage logic without any hardware:
+#
+#   --record <dir>  ... every request a target's transport issues, with
+#                       its reply or error and its latency, and the
+#                       connect check are recorded in the target's
+#                       cassette ; <dir>/<label>.jsonl.gz
+#   --replay <dir>  ... the targets' transports answer each request from
+#                       their cassettes instead of the BMCs, after the
+#                       recorded latency
+#
+# A cassette is gzip compressed json lines ; a header line and then one
+# line per interaction:
+#
+#   m, p    ... the method and path ; CONNECT for the connect check
+#   t, l    ... ms from the start of the recording to the request's
+#               start and the request's latency in ms
+#   q       ... the request body ; without its passwords
+#   s, h    ... the reply's status and headers
+#   b or r  ... the reply body ; or the index of the first interaction
+#               with the same body, as most polls get the same reply
+#   e       ... the error raised instead of a reply ; [class, message]
+#
+# Passwords, session tokens and cookies are not recorded.
+#
+# Replay serves the interactions of each method and path in recorded
+# order ; once they run out the last one is served again, so a loop
+# that polls more often than it did when recorded sees the final state.
+# The library transport creates and deletes its sessions itself ; a
+# session create or delete that was not recorded gets a made-up reply.
+#
+# The engine takes its time and sleeps from a Clock. --replay-speed N
+# replays against a clock N times faster than the real one ; recorded
+# latencies, poll intervals and retry delays take 1/N of the time and
+# timeouts expire N times sooner, so an install of many minutes replays
+# the same stage decisions in seconds.
+#
+###############################################################################
+
+import asyncio
+import collections
+import gzip
+import json
+import os
+import re
+import time
+
+from rvmc.log import dlog1
+from rvmc.log import elog
+from rvmc.transport import AsyncRedfishTransport
+from rvmc.transport import CONNECT
+from rvmc.transport import DELETE
+from rvmc.transport import POST
+from rvmc.transport import REDFISH_SESSIONS_PATH
+from rvmc.transport import RedfishResponse
+
+# version of the cassette layout ; a cassette of another is refused
+CASSETTE_VERSION = 1
+
+CASSETTE_SUFFIX = '.jsonl.gz'
+
+# recorded in place of passwords and of a reply's session token
+REDACTED = 'redacted'
+
+# reply headers that are not recorded ; connection framing, or they
+# would leak a session
+UNRECORDED_HEADERS = frozenset(['connection', 'content-length', 'date',
+                                'keep-alive', 'server', 'set-cookie',
+                                'transfer-encoding'])
+
+# the errors a replayed interaction can raise ; ConnectionError for
+# the others
+REPLAYED_ERRORS = dict((error.__name__, error) for error in
+                       [ConnectionError, ConnectionAbortedError,
+                        ConnectionRefusedError, ConnectionResetError,
+                        BrokenPipeError, OSError])
+REPLAYED_ERRORS['TimeoutError'] = asyncio.TimeoutError
+
+
+class Clock(object):
+    """
+    The engine's time source and sleeps ; real time
+    """
+
+    def monotonic(self):
+        """Return the monotonic time in seconds"""
+
+        return time.monotonic()
+
+    async def sleep(self, seconds):
+        """Wait 'seconds'"""
+
+        await asyncio.sleep(seconds)
+
+
+class ScaledClock(Clock):
+    """
+    A clock 'speed' times faster than real time
+    """
+
+    def __init__(self, speed):
+        """
+        :param speed: how many times faster than real time
+        :type speed: float
+        """
+
+        self.speed = speed
+        self.start = time.monotonic()
+
+    def monotonic(self):
+        """Return the scaled monotonic time in seconds"""
+
+        return self.start + (time.monotonic() - self.start) * self.speed
+
+    async def sleep(self, seconds):
+        """Wait 'seconds' of scaled time"""
+
+        await asyncio.sleep(max(seconds, 0) / self.speed)
+
+
+def redact(body):
+    """Return a request body without its passwords"""
+
+    if isinstance(body, dict):
+        return dict((key, REDACTED if 'password' in key.lower()
+                     else redact(value))
+                    for key, value in body.items())
+    if isinstance(body, list):
+        return [redact(value) for value in body]
+    return body
+
+
+def reply_headers(response):
+    """
+    Return the headers of a reply to record.
+
+    :param response: a RedfishResponse or the library's response object
+    :returns dictionary ; lower case names
+    """
+
+    headers = getattr(response, 'headers', None)
+    if not isinstance(headers, dict):
+        try:
+            headers = dict(response.getheaders())
+        except (AttributeError, TypeError, ValueError):
+            headers = {}
+    recorded = {}
+    for name, value in headers.items():
+        name = name.lower()
+        if name in UNRECORDED_HEADERS:
+            continue
+        if name == 'x-auth-token':
+            value = REDACTED
+        recorded[name] = value
+    return recorded
+
+
+class Cassette(object):
+    """
+    The recorded interactions of one target
+    """
+
+    def __init__(self, label):
+        """
+        :param label: the target label ; its name or bmc address
+        :type label: str
+        """
+
+        self.label = label
+        self.interactions = []
+        self.bodies = {}            # reply body -> first interaction index
+        self.start_time = time.monotonic()  # when the recording started
+        self.queues = None          # (method, path) -> left to replay
+        self.last = {}              # (method, path) -> last one replayed
+
+    def record(self, method, path, body, response, error, seconds):
+        """
+        Record one interaction ; a transport's recorder callback.
+
+        :param method: http method ; CONNECT for the connect check
+        :type method: str
+        :param path: request path
+        :type path: str
+        :param body: json request body
+        :type body: dictionary
+        :param response: the reply ; None if there is none
+        :param error: the error raised instead of a reply ; None for none
+        :type error: BaseException
+        :param seconds: the latency
+        :type seconds: float
+        """
+
+        if isinstance(error, asyncio.CancelledError):
+            return
+        start_time = time.monotonic() - seconds
+        interaction = {'m': method, 'p': path,
+                       't': int(round((start_time -
+                                       self.start_time) * 1000)),
+                       'l': int(round(seconds * 1000))}
+        if body is not None:
+            interaction['q'] = redact(body)
+        if error is not None:
+            interaction['e'] = [error.__class__.__name__, str(error)]
+        elif response is not None:
+            interaction['s'] = response.status
+            headers = reply_headers(response)
+            if headers:
+                interaction['h'] = headers
+            text = response.read or ''
+            if text:
+                index = self.bodies.get(text)
+                if index is None:
+                    self.bodies[text] = len(self.interactions)
+                    interaction['b'] = text
+                else:
+                    interaction['r'] = index
+        self.interactions.append(interaction)
+
+    def body(self, interaction):
+        """Return the reply body of an interaction"""
+
+        if 'r' in interaction:
+            return self.interactions[interaction['r']].get('b', '')
+        return interaction.get('b', '')
+
+    def next(self, method, path):
+        """
+        Return the next interaction of a method and path to replay.
+
+        :returns the interaction dictionary ; None if none was recorded
+        """
+
+        if self.queues is None:
+            self.queues = {}
+            for interaction in self.interactions:
+                self.queues.setdefault(
+                    (interaction['m'], interaction['p']),
+                    collections.deque()).append(interaction)
+        key = (method, path)
+        queue = self.queues.get(key)
+        if queue:
+            self.last[key] = queue.popleft()
+        elif key in self.last:
+            dlog1("Replay      : %s %s replayed again" % (method, path))
+        return self.last.get(key)
+
+    def dump(self, cassette_file):
+        """Write the cassette to a text file object"""
+
+        cassette_file.write(json.dumps({'version': CASSETTE_VERSION,
+                                        'target': self.label}) + '\n')
+        for interaction in self.interactions:
+            cassette_file.write(json.dumps(interaction,
+                                           separators=(',', ':')) + '\n')
+
+    @classmethod
+    def load(cls, cassette_file):
+        """
+        Read a cassette from a text file object.
+
+        :returns Cassette
+        :raises ValueError if it is not a cassette of this version
+        """
+
+        header = json.loads(cassette_file.readline() or '{}')
+        if header.get('version') != CASSETTE_VERSION:
+            raise ValueError("not a version %d cassette" % CASSETTE_VERSION)
+        cassette = cls(header.get('target'))
+        cassette.interactions = [json.loads(line) for line in cassette_file
+                                 if line.strip()]
+        return cassette
+
+
+class CassetteDirectory(object):
+    """
+    The cassettes of a run's targets ; one file per target
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: the cassette directory
+        :type directory: str
+        """
+
+        self.directory = directory
+        self.cassettes = {}         # target label -> Cassette
+
+    def filename(self, label):
+        """Return the cassette file of a target label"""
+
+        return os.path.join(self.directory,
+                            re.sub(r'[^\w.-]', '_', label) + CASSETTE_SUFFIX)
+
+    def recording(self, label):
+        """Return the cassette a target's interactions are recorded in"""
+
+        if label not in self.cassettes:
+            self.cassettes[label] = Cassette(label)
+        return self.cassettes[label]
+
+    def replaying(self, label):
+        """
+        Return the recorded cassette of a target ; read once.
+
+        :raises IOError, OSError or ValueError if it can't be read
+        """
+
+        if label not in self.cassettes:
+            with gzip.open(self.filename(label), 'rt') as cassette_file:
+                self.cassettes[label] = Cassette.load(cassette_file)
+        return self.cassettes[label]
+
+    def save(self, label):
+        """
+        Write a target's recorded cassette.
+
+        It is written to a temporary file that is then renamed so
+        readers never see a partial file.
+        """
+
+        cassette = self.cassettes.get(label)
+        if cassette is None or not cassette.interactions:
+            return
+        filename = self.filename(label)
+        tmp_filename = "%s.%d.tmp" % (filename, os.getpid())
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with gzip.open(tmp_filename, 'wt') as cassette_file:
+                cassette.dump(cassette_file)
+            os.rename(tmp_filename, filename)
+        except (IOError, OSError) as ex:
+            elog("Record      : unable to write %s (%s)" % (filename, ex))
+
+
+class ReplayTransport(AsyncRedfishTransport):
+    """
+    Answers one target's Redfish requests from its cassette.
+
+    Offers the asyncio transport's interface ; it has no connections.
+    """
+
+    def __init__(self, cassette, address, username, password, port, clock):
+        """
+        :param cassette: the target's recorded cassette
+        :type cassette: Cassette
+        :param clock: the clock the recorded latencies are waited on
+        :type clock: Clock
+        """
+
+        super(ReplayTransport, self).__init__(address, username, password,
+                                              port)
+        self.cassette = cassette
+        self.clock = clock
+        self.monotonic = clock.monotonic
+
+    async def _replay(self, method, path):
+        """
+        Wait for the next interaction of a method and path to replay.
+
+        :returns the interaction ; None if none was recorded
+        :raises the error the interaction recorded
+        """
+
+        interaction = self.cassette.next(method, path)
+        if interaction is None:
+            return None
+        await self.clock.sleep(interaction.get('l', 0) / 1000.0)
+        if 'e' in interaction:
+            name, message = interaction['e']
+            raise REPLAYED_ERRORS.get(name, ConnectionError)(message)
+        return interaction
+
+    async def connect(self):
+        """Replay the connect check"""
+
+        if not self.cassette.interactions:
+            raise ConnectionError("no recorded interactions")
+        await self._replay(CONNECT, '')
+
+    async def _request(self, method, path, body, headers):
+        """Answer one http request from the cassette"""
+
+        self.stats.requests += 1
+        interaction = await self._replay(method, path)
+        if interaction is not None:
+            return RedfishResponse(interaction.get('s', 200),
+                                   dict(interaction.get('h', {})),
+                                   self.cassette.body(interaction))
+
+        sessions_path = self.sessions_path or REDFISH_SESSIONS_PATH
+        if method == POST and path == sessions_path:
+            dlog1("Replay      : made-up session create")
+            return RedfishResponse(201, {'x-auth-token': REDACTED,
+                                         'location': sessions_path +
+                                         '/' + REDACTED}, '')
+        if method == DELETE and path.startswith(sessions_path):
+            dlog1("Replay      : made-up session delete")
+            return RedfishResponse(204, {}, '')
+        dlog1("Replay      : %s %s was not recorded" % (method, path))
+        return RedfishResponse(404, {}, '')
+
+    async def open_event_stream(self, path):
+        """Event streams are not recorded"""
+
+        raise ConnectionError("event streams are not replayed")
@@ -0,0 +1,431 @@
+###############################################################################
+#
+# Copyright (c) 2019-2020 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller command line"""
+
+###############################################################################
+#
+# Parses the command line and the config file and then hands the
+# targets to the stage engine.
+#
+# Only the standard library modules needed to parse the command line
+# are imported up front. The config file loader and the stage engine,
+# with its asyncio and transport dependencies, are imported once they
+# are needed ; so --help and command line errors cost next to nothing.
+#
+###############################################################################
+
+import argparse
+import sys
+
+from rvmc import CONFIG_FILE
+from rvmc import FEATURE_NAME
+from rvmc import VERSION_MAJOR
+from rvmc import VERSION_MINOR
+from rvmc import log
+from rvmc.log import dlog1
+from rvmc.log import elog
+from rvmc.log import ilog
+
+
+def build_parser():
+    """Return the command line argument parser"""
+
+    parser = argparse.ArgumentParser(description=FEATURE_NAME)
+
+    parser.add_argument("--target", type=str, required=False,
+                        help="One or more bmc host descriptor targets ;\n"
+                             "type: comma delimited target list")
+
+    parser.add_argument("--config", type=str, required=False,
+                        default=CONFIG_FILE,
+                        help="Optional config file ; default %s" %
+                             CONFIG_FILE)
+
+    parser.add_argument("--config-cache", type=str, required=False,
+                        metavar='FILE',
+                        help="Optional compiled config cache file on a "
+                             "writable volume ; default none")
+
+    parser.add_argument("--debug", type=int, required=False, default=0,
+                        help="Optional debug level ; 1..4")
+
+    parser.add_argument("--parallel", type=int, required=False, default=0,
+                        help="Optional max number of targets to install "
+                             "at the same time ; 0 or 1 = one at a time")
+
+    parser.add_argument("--transport", type=str, required=False,
+                        default='asyncio', choices=['asyncio', 'redfish'],
+                        help="Optional Redfish transport ; "
+                             "asyncio (default) or redfish (library)")
+
+    parser.add_argument("--discovery-cache", type=str, required=False,
+                        help="Optional Redfish discovery cache file")
+
+    parser.add_argument("--discovery-cache-ttl", type=int, required=False,
+                        default=86400,
+                        help="Optional discovery cache entry time to live "
+                             "in seconds ; default 86400")
+
+    parser.add_argument("--session-cache", type=str, required=False,
+                        help="Optional Redfish session cache file ; "
+                             "sessions are reused by later runs")
+
+    parser.add_argument("--logout-cached", action='store_true',
+                        required=False,
+                        help="Optional ; log out of the targets' cached "
+                             "sessions and exit")
+
+    parser.add_argument("--reconcile", action='store_true', required=False,
+                        help="Optional ; skip install steps the BMC's current "
+                             "state shows are already done")
+
+    parser.add_argument("--mount-cap", type=int, required=False,
+                        default=0,
+                        help="Optional max targets per image host with an "
+                             "image inserted at the same time ; "
+                             "default 0 = no cap")
+
+    parser.add_argument("--vendor-cap", type=int, required=False,
+                        default=0,
+                        help="Optional max targets per BMC vendor with a "
+                             "session at the same time ; default 0 = no cap")
+
+    parser.add_argument("--canary", type=int, required=False, default=0,
+                        help="Optional number of targets installed first ; "
+                             "the others only if they all succeed")
+
+    parser.add_argument("--serial-stages", action='store_true',
+                        required=False,
+                        help="Optional ; run each target's stages one at a "
+                             "time rather than the independent ones at the "
+                             "same time")
+
+    parser.add_argument("--retry-attempts", type=int, required=False,
+                        default=4,
+                        help="Optional max attempts of a request that fails "
+                             "with a transient error ; default 4")
+
+    parser.add_argument("--retry-budget", type=int, required=False,
+                        default=30,
+                        help="Optional max request retries per target "
+                             "; default 30")
+
+    parser.add_argument("--retry-cap", type=float, required=False,
+                        default=8.0,
+                        help="Optional max seconds between request "
+                             "attempts ; default 8")
+
+    parser.add_argument("--probe", type=str, required=False,
+                        default='any', choices=['any', 'tcp', 'icmp', 'none'],
+                        help="Optional BMC reachability check made before the "
+                             "install ; any (default), tcp, icmp or none")
+
+    parser.add_argument("--probe-timeout", type=float, required=False,
+                        default=2.0,
+                        help="Optional seconds to wait for one reachability "
+                             "check attempt ; default 2")
+
+    parser.add_argument("--probe-attempts", type=int, required=False,
+                        default=3,
+                        help="Optional reachability check attempts per "
+                             "target ; default 3")
+
+    parser.add_argument("--image-check", type=str, required=False,
+                        default='none', choices=['sample', 'verify', 'none'],
+                        help="Optional install image pre-flight check of "
+                             "each unique image url from rvmc ; sample, "
+                             "verify or none (default)")
+
+    parser.add_argument("--image-check-timeout", type=float, required=False,
+                        default=10.0,
+                        help="Optional seconds to wait for each image "
+                             "check request ; default 10")
+
+    parser.add_argument("--serve-image", type=str, required=False,
+                        metavar='FILE',
+                        help="Optional local install image file served by "
+                             "rvmc ; the targets' image urls point at it")
+
+    parser.add_argument("--image-cache", type=str, required=False,
+                        metavar='DIR',
+                        help="Optional image cache directory ; rvmc serves "
+                             "the targets' images through a caching proxy")
+
+    parser.add_argument("--image-cache-size", type=float, required=False,
+                        default=20.0,
+                        help="Optional max GB of cached images ; the least "
+                             "recently used are evicted ; default 20")
+
+    parser.add_argument("--serve-address", type=str, required=False,
+                        help="Optional image server listen address ; "
+                             "default all ipv4 and ipv6 addresses")
+
+    parser.add_argument("--serve-port", type=int, required=False,
+                        default=8080,
+                        help="Optional image server listen port ; "
+                             "default 8080")
+
+    parser.add_argument("--serve-max-transfers", type=int, required=False,
+                        default=32,
+                        help="Optional max image transfers at the same "
+                             "time ; default 32")
+
+    parser.add_argument("--serve-cert", type=str, required=False,
+                        metavar='FILE',
+                        help="Optional image server https certificate "
+                             "chain file ; default http")
+
+    parser.add_argument("--serve-key", type=str, required=False,
+                        metavar='FILE',
+                        help="Optional image server https private key file "
+                             "; default in the certificate file")
+
+    parser.add_argument("--daemon", type=str, required=False,
+                        metavar='SOCKET',
+                        help="Optional ; run the install daemon on this "
+                             "UNIX socket")
+
+    parser.add_argument("--trace-file", type=str, required=False,
+                        help="Optional stage and request timing trace file ; "
+                             "json lines")
+
+    parser.add_argument("--metrics-file", type=str, required=False,
+                        help="Optional Prometheus textfile of stage and "
+                             "request latency histograms")
+
+    parser.add_argument("--record", type=str, required=False,
+                        metavar='DIR',
+                        help="Optional ; record each target's Redfish "
+                             "requests and replies in a cassette file in "
+                             "this directory")
+
+    parser.add_argument("--replay", type=str, required=False,
+                        metavar='DIR',
+                        help="Optional ; answer each target's Redfish "
+                             "requests from its cassette file in this "
+                             "directory instead of its bmc")
+
+    parser.add_argument("--replay-speed", type=float, required=False,
+                        default=1.0,
+                        help="Optional number of times faster than "
+                             "recorded to replay ; default 1")
+
+    parser.add_argument("--journal", type=str, required=False,
+                        metavar='FILE',
+                        help="Optional per target stage progress journal ; "
+                             "default none")
+
+    parser.add_argument("--resume", action='store_true', required=False,
+                        help="Optional ; resume an interrupted run from its "
+                             "journal")
+
+    parser.add_argument("--failed-targets", type=str, required=False,
+                        metavar='FILE',
+                        help="Optional file the comma delimited list of "
+                             "failed targets is written to ; for --target")
+
+    return parser
+
+
+def write_failed_targets(path, names):
+    """
+    Write the failed target list to a file.
+
+    :param path: the file path
+    :type path: str
+    :param names: comma delimited failed target list ; may be empty
+    :type names: str
+    :returns True if written
+    """
+
+    try:
+        with open(path, 'w') as failed_file:
+            failed_file.write(names + "\n")
+    except (IOError, OSError) as ex:
+        elog("Unable to write failed targets file %s (%s)" % (path, ex))
+        return False
+    dlog1("Failed List : %s" % path)
+    return True
+
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    :param argv: command line arguments ; sys.argv[1:] if None
+    :type argv: list
+    :returns the exit code
+    """
+
+    # get command line arguments
+    args = build_parser().parse_args(argv)
+
+    # get debug level
+    log.debug = args.debug
+
+    # target list ; assumes none or comma delimited list
+    targets = []
+    if args.target and args.target != 'None':
+        targets = args.target.split(',')
+
+    ilog("%s version %d.%d\n" % (FEATURE_NAME, VERSION_MAJOR, VERSION_MINOR))
+    dlog1("Debug       : %d" % args.debug)
+    dlog1("Transport   : %s" % args.transport)
+    if args.reconcile:
+        dlog1("Reconcile   : enabled")
+    if args.resume:
+        dlog1("Resume      : enabled")
+    if args.parallel > 1:
+        dlog1("Parallel    : %d" % args.parallel)
+    if len(targets):
+        dlog1("Targets     : %s" % (args.target))
+
+    from rvmc import config
+
+    cache_file = args.config_cache
+    if cache_file == 'none':
+        cache_file = None
+    cfg = config.load_config(args.config, cache_file)
+    if cfg is None:
+        sys.stdout.write("\n\n")
+        return 1
+
+    # the stage engine and its dependencies
+    from rvmc import engine
+
+    engine.CONFIG_FILE = args.config
+    engine.transport = args.transport
+    engine.reconcile = args.reconcile
+    engine.pipeline = not args.serial_stages
+    if args.mount_cap > 0 or args.vendor_cap > 0 or args.canary > 0:
+        from rvmc import schedule
+
+        engine.scheduler = schedule.WaveScheduler(
+            mount_cap=max(args.mount_cap, 0),
+            vendor_cap=max(args.vendor_cap, 0),
+            canary=max(args.canary, 0))
+    engine.image_check = args.image_check
+    engine.image_check_timeout = args.image_check_timeout
+    engine.retry_policy = engine.RetryPolicy(
+        attempts=max(args.retry_attempts, 1),
+        budget=args.retry_budget,
+        cap=args.retry_cap)
+
+    try:
+        target_objects = engine.load_targets(cfg, targets)
+
+        if args.discovery_cache:
+            engine.discovery_cache = engine.DiscoveryCache(
+                args.discovery_cache, args.discovery_cache_ttl)
+
+        if args.session_cache:
+            engine.session_cache = engine.SessionCache(
+                args.session_cache, engine.SESSION_CACHE_TTL_SECS)
+        elif args.logout_cached:
+            elog("Unable to log out of cached sessions without a "
+                 "--session-cache")
+            engine.rvmc_exit(1)
+
+        if args.logout_cached:
+            failed = engine.logout_cached(target_objects)
+            engine.shutdown()
+            return 1 if failed else 0
+
+        probe = args.probe
+        if args.record or args.replay:
+            from rvmc import cassette
+
+            if args.record and args.replay:
+                elog("Unable to record and replay at the same time")
+                engine.rvmc_exit(1)
+            if args.replay_speed <= 0:
+                elog("Invalid --replay-speed %s ; must be more than 0" %
+                     args.replay_speed)
+                engine.rvmc_exit(1)
+            if args.record:
+                ilog("Record      : %s" % args.record)
+                engine.recordings = cassette.CassetteDirectory(args.record)
+            else:
+                ilog("Replay      : %s at %gx speed" %
+                     (args.replay, args.replay_speed))
+                engine.replays = cassette.CassetteDirectory(args.replay)
+                if args.replay_speed != 1:
+                    engine.clock = cassette.ScaledClock(args.replay_speed)
+                # the bmcs and image servers are not used
+                probe = 'none'
+                engine.image_check = 'none'
+
+        if args.journal and args.journal != 'none':
+            engine.journal = engine.StateJournal(args.journal)
+        elif args.resume:
+            elog("Unable to resume without a journal")
+            engine.rvmc_exit(1)
+
+        if args.trace_file or args.metrics_file:
+            try:
+                engine.timings = engine.TimingRecorder(args.trace_file,
+                                                       args.metrics_file)
+            except (IOError, OSError) as ex:
+                elog("Unable to open trace file %s (%s)" %
+                     (args.trace_file, ex))
+                engine.rvmc_exit(1)
+
+        if not target_objects:
+            elog("Operation aborted ; no valid bmc information found")
+            if args.config and cfg:
+                ilog("Config File :\n%s" % cfg)
+            engine.rvmc_exit(1)
+
+        if args.serve_image or args.image_cache:
+            from rvmc import isoserver
+
+            cache = None
+            if not args.serve_image:
+                from rvmc import imagecache
+
+                cache = imagecache.ImageCache(
+                    args.image_cache, int(args.image_cache_size * 1e9))
+            server = isoserver.IsoServer(
+                args.serve_image, args.serve_address, args.serve_port,
+                args.serve_max_transfers, args.serve_cert, args.serve_key,
+                cache)
+            try:
+                server.start()
+            except (IOError, OSError) as ex:
+                elog("Unable to serve image %s (%s)" %
+                     (args.serve_image or args.image_cache, ex))
+                engine.rvmc_exit(1)
+            engine.iso_server = server
+            server.serve_targets(target_objects)
+
+        if args.daemon:
+            from rvmc import daemon
+
+            code = daemon.run(target_objects, args.daemon,
+                              args.parallel or daemon.DAEMON_WORKERS)
+            engine.shutdown()
+            return code
+
+        failed = engine.install(target_objects,
+                                parallel=args.parallel,
+                                probe=probe,
+                                probe_timeout=args.probe_timeout,
+                                probe_attempts=args.probe_attempts,
+                                resume=args.resume)
+    except SystemExit as ex:
+        # early failures exit through rvmc_exit ; it saved the cache
+        # and metrics files
+        return ex.code
+
+    code = 1 if failed else 0
+    if args.failed_targets:
+        if not write_failed_targets(args.failed_targets,
+                                    engine.failed_targets(failed)):
+            code = 1
+    engine.shutdown()
+    return code
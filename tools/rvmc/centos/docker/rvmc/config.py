@@ -0,0 +1,301 @@
+###############################################################################
+#
+# Copyright (c) 2019-2020 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller config file loading"""
+
+###############################################################################
+#
+# A multi target config file may hold thousands of targets while a run
+# only installs the few named by --target. Parsing all of the yaml on
+# every run would cost far more than the install's own startup.
+#
+# So with --config-cache the first run that parses a config file ; with
+# the C LibYAML loader when PyYAML has it ; compiles it into a json
+# cache file. The config usually sits on a read-only mount, so the
+# cache file is named by the caller ; on a writable volume. Each target
+# of a section of targets is kept in the cache as its own json text and
+# is only decoded when it is looked up ; so a later run decodes and
+# validates only the targets it installs.
+#
+# The cache file's first line is a json header ; the layout version,
+# the config file stamps described below and the config's values that
+# are not sections of targets. Each following line is one target:
+#
+#     <section> <tab> <target> <tab> <json text>
+#
+# json texts never hold a tab or a newline ; a config with a section or
+# target name that does is not cached.
+#
+# The cache records the config file's size, modification time and
+# sha256. A cache whose size and modification time don't match is
+# only used if the config's sha256 still does ; otherwise the config
+# is parsed again and the cache rewritten.
+#
+# The cache holds the config's bmc passwords ; it is only ever written
+# with owner only permissions. A cache that can't be written is not an
+# error ; the config is then parsed on every run.
+#
+###############################################################################
+
+import json
+import os
+
+from collections.abc import Mapping
+
+from rvmc import log
+from rvmc.log import alog
+from rvmc.log import dlog1
+from rvmc.log import dlog3
+from rvmc.log import elog
+
+# version of the cache file layout ; a cache of another is rebuilt
+CONFIG_CACHE_VERSION = 1
+
+
+class TargetSection(Mapping):
+    """
+    A config section of targets whose key value pairs are decoded from
+    their cached json text when first looked up.
+    """
+
+    __slots__ = ('texts', 'values')
+
+    def __init__(self, texts):
+        """
+        :param texts: target name -> json text of its key value pairs
+        :type texts: dictionary
+        """
+
+        self.texts = texts
+        self.values = {}
+
+    def __getitem__(self, name):
+        if name not in self.values:
+            self.values[name] = json.loads(self.texts[name])
+        return self.values[name]
+
+    def __iter__(self):
+        return iter(self.texts)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __contains__(self, name):
+        return name in self.texts
+
+    def __repr__(self):
+        # only made by debug and error logs ; decodes every target
+        return repr(dict(self.items()))
+
+
+def parse_yaml(text):
+    """
+    Parse a yaml config file's text ; with the C LibYAML loader if
+    PyYAML was built with it.
+
+    :param text: the config file's text
+    :type text: bytes
+    :returns the parsed config file
+    """
+
+    import yaml
+
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    dlog1("Config Load : %s" % loader.__name__)
+    return yaml.load(text, Loader=loader)
+
+
+def plain_name(name):
+    """Return True if a name can be a field of a cache file line"""
+
+    return isinstance(name, str) and \
+        '\t' not in name and '\n' not in name and '\r' not in name
+
+
+def compile_config(cfg):
+    """
+    Return the cached form of a parsed config file.
+
+    Each mapping of mappings is a section of targets ; its targets are
+    kept as json texts. Everything else is kept as is.
+
+    :param cfg: the parsed config file
+    :type cfg: dictionary
+    :returns (values, sections) ; None if the config doesn't survive a
+             trip through json unchanged
+    """
+
+    try:
+        if not isinstance(cfg, dict) or json.loads(json.dumps(cfg)) != cfg:
+            return None
+    except (TypeError, ValueError):
+        return None
+
+    values = {}
+    sections = {}
+    for key, value in cfg.items():
+        if isinstance(value, dict) and value and \
+                all(isinstance(item, dict) for item in value.values()):
+            if not plain_name(key) or \
+                    not all(plain_name(name) for name in value):
+                return None
+            sections[key] = dict((name, json.dumps(item, sort_keys=True))
+                                 for name, item in value.items())
+        else:
+            values[key] = value
+    return values, sections
+
+
+class ConfigCache(object):
+    """
+    Compiled config file cache
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: the cache file
+        :type filename: str.
+        """
+
+        self.filename = filename
+
+    def load(self, stat, digest):
+        """
+        Load the config file's cached form.
+
+        :param stat: the config file's os.stat result
+        :type stat: os.stat_result
+        :param digest: returns the config file's sha256 hex digest
+        :type digest: function
+        :returns the config with its target sections lazy ; None if it
+                 isn't cached or the cache is stale
+        """
+
+        try:
+            with open(self.filename, 'r') as cache_file:
+                lines = cache_file.read().split('\n')
+            header = json.loads(lines[0])
+        except (IOError, OSError):
+            return None
+        except ValueError as ex:
+            dlog1("Conf Cache  : ignoring corrupt %s (%s)" %
+                  (self.filename, ex))
+            return None
+
+        if not isinstance(header, dict) or \
+                header.get('version') != CONFIG_CACHE_VERSION:
+            return None
+        if header.get('size') != stat.st_size or \
+                header.get('mtime_ns') != stat.st_mtime_ns:
+            if header.get('sha256') != digest():
+                dlog1("Conf Cache  : %s is stale" % self.filename)
+                return None
+
+        sections = dict((key, {}) for key in header.get('sections', []))
+        for line in lines[1:]:
+            fields = line.split('\t', 2)
+            if len(fields) == 3 and fields[0] in sections:
+                sections[fields[0]][fields[1]] = fields[2]
+
+        cfg = dict(header.get('values', {}))
+        for key, texts in sections.items():
+            cfg[key] = TargetSection(texts)
+        dlog1("Conf Cache  : %s" % self.filename)
+        return cfg
+
+    def save(self, stat, sha256, compiled):
+        """
+        Write the config file's cached form.
+
+        It is written to a temporary file that is then renamed so
+        readers never see a partial file.
+        """
+
+        values, sections = compiled
+        header = {'version': CONFIG_CACHE_VERSION,
+                  'size': stat.st_size,
+                  'mtime_ns': stat.st_mtime_ns,
+                  'sha256': sha256,
+                  'values': values,
+                  'sections': sorted(sections)}
+
+        tmp_filename = "%s.%d.tmp" % (self.filename, os.getpid())
+        try:
+            fd = os.open(tmp_filename,
+                         os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as cache_file:
+                cache_file.write(json.dumps(header))
+                for key, texts in sorted(sections.items()):
+                    for name, text in texts.items():
+                        cache_file.write("\n%s\t%s\t%s" % (key, name, text))
+            os.rename(tmp_filename, self.filename)
+            dlog1("Conf Cache  : saved %s" % self.filename)
+        except (IOError, OSError) as ex:
+            dlog1("Conf Cache  : unable to write %s (%s)" %
+                  (self.filename, ex))
+            try:
+                os.unlink(tmp_filename)
+            except (IOError, OSError):
+                pass
+
+
+def load_config(config_file, cache_file=None):
+    """
+    Find, Open and Read callers config file
+
+    :param config_file: the config file path
+    :type config_file: str
+    :param cache_file: the compiled config cache file ; None for none
+    :type cache_file: str
+    :returns the parsed config file ; None if it can't be loaded
+    """
+
+    if not os.path.exists(config_file):
+        elog("Unable to find specified config file: %s" % config_file)
+        alog("Check config file spelling and presence")
+        return None
+
+    try:
+        with open(config_file, 'rb') as yaml_config:
+            dlog1("Config File : %s" % config_file)
+            stat = os.fstat(yaml_config.fileno())
+            text = yaml_config.read()
+    except Exception as ex:
+        elog("Unable to open specified config file: %s (%s)" %
+             (config_file, ex))
+        alog("Check config file access and permissions.")
+        return None
+
+    def digest():
+        import hashlib
+
+        return hashlib.sha256(text).hexdigest()
+
+    cache = None
+    if cache_file is not None:
+        cache = ConfigCache(cache_file)
+        cfg = cache.load(stat, digest)
+        if cfg is not None:
+            return cfg
+
+    try:
+        cfg = parse_yaml(text)
+        if log.debug >= 3:
+            dlog3("Config Data : %s" % cfg)
+    except Exception as ex:
+        elog("Unable to open specified config file: %s (%s)" %
+             (config_file, ex))
+        alog("Check config file access and permissions.")
+        return None
+
+    if cache is not None:
+        compiled = compile_config(cfg)
+        if compiled is None:
+            dlog1("Conf Cache  : config can't be cached as json")
+        else:
+            cache.save(stat, digest(), compiled)
+    return cfg
@@ -0,0 +1,454 @@
+###############################################################################
+#
+# Copyright (c) 2026 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller install daemon"""
+
+###############################################################################
+#
+# The install daemon serves install, eject and power jobs for the targets
+# of its config file over a local UNIX socket http API.
+#
+# Each target's Redfish session and discovery info are kept warm between
+# jobs ; a job against a warm target starts with one session check GET
+# instead of a connect, root query, login and discovery. A warm session
+# that the BMC expired is replaced.
+#
+# Jobs are queued ; each target runs one job at a time and at most
+# 'workers' targets run at the same time.
+#
+#   GET  /targets              ... the targets and whether they are warm
+#   GET  /jobs                 ... all jobs
+#   POST /jobs                 ... queue a job ; json body
+#
+#         {"operation": "install" | "eject" | "power",
+#          "targets": [<target>, ...],  ... optional ; default all
+#          "state": "On" | "Off",       ... power jobs only
+#          "image": <url>,              ... optional install image
+#          "stream": true}              ... optional ; stream progress
+#
+#   GET  /jobs/<id>            ... job status and per target results
+#   GET  /jobs/<id>/events     ... stream job progress
+#
+# Progress streams are json lines ; one per log line, target status
+# change and job status change, until the job is finished. A failed
+# target's status event names the error of its failed stage and why.
+# A finished target's status event holds its critical path seconds ;
+# the time of its stages that didn't overlap others.
+#
+#   > curl --unix-socket /run/rvmc/rvmc.sock http://rvmc/jobs \
+#          -d '{"operation": "install", "targets": ["dcloud1"], \
+#               "stream": true}'
+#
+###############################################################################
+
+import asyncio
+import json
+import os
+import signal
+import time
+
+from collections import OrderedDict
+
+from rvmc import engine
+from rvmc import image
+from rvmc import log
+from rvmc.log import dlog1
+from rvmc.log import elog
+from rvmc.log import ilog
+
+# max number of targets that run a job at the same time ; by default
+DAEMON_WORKERS = 16
+
+# max bytes of a job request body
+MAX_REQUEST_BYTES = 65536
+
+# number of finished jobs kept for status queries
+MAX_FINISHED_JOBS = 100
+
+OPERATIONS = ['install', 'eject', 'power']
+
+HTTP_REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request',
+                404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large'}
+
+
+class Job(object):
+    """
+    An install, eject or power job for one or more targets
+    """
+
+    def __init__(self, job_id, operation, targets, state=None, image_url=None):
+        """
+        :param job_id: the job id
+        :type job_id: int
+        :param operation: install, eject or power
+        :type operation: str
+        :param targets: the target labels
+        :type targets: list
+        :param state: power job state ; On or Off
+        :type state: str
+        :param image_url: install job image url ; None for the configured one
+        :type image_url: str
+        """
+
+        self.id = job_id
+        self.operation = operation
+        self.targets = targets
+        self.state = state
+        self.image = image_url
+        self.status = 'queued'
+        self.created = time.time()
+        self.finished = None
+        self.results = OrderedDict((target, 'queued') for target in targets)
+        self.events = []            # progress events so far
+        self.watchers = []          # a queue per progress stream
+
+    def publish(self, event):
+        """Record a progress event and pass it to the progress streams"""
+
+        event['job'] = self.id
+        event['time'] = round(time.time(), 3)
+        self.events.append(event)
+        for watcher in self.watchers:
+            watcher.put_nowait(event)
+
+    def done(self):
+        """Return True once the job is finished"""
+
+        return self.finished is not None
+
+    def summary(self):
+        """Return the job's status dictionary"""
+
+        return {'id': self.id,
+                'operation': self.operation,
+                'state': self.state,
+                'image': self.image,
+                'status': self.status,
+                'created': round(self.created, 3),
+                'finished': self.finished and round(self.finished, 3),
+                'results': self.results}
+
+
+class InstallDaemon(object):
+    """
+    UNIX socket job server with warm per target Redfish sessions
+    """
+
+    def __init__(self, target_objects, socket_path, workers):
+        """
+        :param target_objects: the targets that jobs can operate on
+        :type target_objects: list
+        :param socket_path: the UNIX socket to serve on
+        :type socket_path: str
+        :param workers: max number of targets running a job at once
+        :type workers: int
+        """
+
+        self.targets = OrderedDict()
+        for targetObj in target_objects:
+            label = targetObj.target
+            if label is None:
+                label = targetObj.ip
+            targetObj.keep_session = True
+            self.targets[label] = targetObj
+        self.socket_path = socket_path
+        self.workers = max(workers, 1)
+        self.jobs = OrderedDict()
+        self.next_id = 1
+        self.tasks = set()          # running job tasks
+
+        # created in the event loop
+        self.locks = None           # target label -> one job at a time
+        self.slots = None           # limits the targets running at once
+        self.stopping = None
+
+    async def serve(self):
+        """Serve jobs until SIGTERM or SIGINT"""
+
+        self.locks = dict((label, asyncio.Lock()) for label in self.targets)
+        self.slots = asyncio.Semaphore(self.workers)
+        self.stopping = asyncio.Event()
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._client,
+                                                 path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+
+        loop = asyncio.get_event_loop()
+        for signum in [signal.SIGTERM, signal.SIGINT]:
+            loop.add_signal_handler(signum, self.stopping.set)
+
+        ilog("Daemon      : serving %d targets on %s ; %d at a time" %
+             (len(self.targets), self.socket_path, self.workers))
+        await self.stopping.wait()
+        ilog("Daemon      : stopping")
+
+        server.close()
+        await server.wait_closed()
+        for task in list(self.tasks):
+            task.cancel()
+        if self.tasks:
+            await asyncio.wait(list(self.tasks))
+        for targetObj in self.targets.values():
+            await targetObj.release()
+        os.unlink(self.socket_path)
+
+    ###########################################################################
+    # Jobs
+    ###########################################################################
+    def submit(self, request):
+        """
+        Queue a job.
+
+        :param request: the job request ; see the module description
+        :type request: dictionary
+        :returns the Job
+        :raises ValueError: if the request is not valid
+        """
+
+        operation = request.get('operation')
+        if operation not in OPERATIONS:
+            raise ValueError("operation must be one of %s" %
+                             ', '.join(OPERATIONS))
+        targets = request.get('targets') or list(self.targets)
+        if not isinstance(targets, list):
+            raise ValueError("targets must be a list")
+        unknown = [target for target in targets if target not in self.targets]
+        if unknown:
+            raise ValueError("unknown targets: %s" %
+                             ', '.join(str(target) for target in unknown))
+        state = request.get('state')
+        if operation == 'power' and state not in [engine.POWER_ON,
+                                                  engine.POWER_OFF]:
+            raise ValueError("power state must be %s or %s" %
+                             (engine.POWER_ON, engine.POWER_OFF))
+
+        job = Job(self.next_id, operation, targets, state,
+                  request.get('image'))
+        self.next_id += 1
+        self.jobs[job.id] = job
+        task = asyncio.ensure_future(self._run(job))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        ilog("Job %d      : %s %s" % (job.id, operation, ', '.join(targets)))
+        return job
+
+    async def _run(self, job):
+        """Run a job's operation on all its targets"""
+
+        job.status = 'running'
+        job.publish({'type': 'job', 'status': job.status})
+        checks = {}
+        if job.operation == 'install' and engine.image_check != 'none':
+            checks = await image.check_images(
+                [job.image or self.targets[target].img
+                 for target in job.targets],
+                engine.image_check, engine.image_check_timeout)
+        await asyncio.gather(*[self._run_target(job, target, checks)
+                               for target in job.targets])
+        failed = [target for target, result in job.results.items()
+                  if result != 'ok']
+        job.status = 'failed' if failed else 'done'
+        job.finished = time.time()
+        job.publish({'type': 'job', 'status': job.status,
+                     'results': job.results})
+        ilog("Job %d      : %s ; %d of %d targets failed" %
+             (job.id, job.status, len(failed), len(job.targets)))
+
+        # forget the oldest finished jobs
+        finished = [old.id for old in self.jobs.values() if old.done()]
+        for job_id in finished[:-MAX_FINISHED_JOBS]:
+            del self.jobs[job_id]
+
+    async def _run_target(self, job, target, checks):
+        """
+        Run a job's operation on one target with its logs streamed.
+
+        :param checks: the image checks of an install job ; by url
+        :type checks: dictionary
+        """
+
+        targetObj = self.targets[target]
+        async with self.locks[target]:
+            async with self.slots:
+                job.results[target] = 'running'
+                job.publish({'type': 'target', 'target': target,
+                             'status': 'running'})
+                task = log.current_task()
+                log.log_prefixes[task] = "[%d %s] " % (job.id, target)
+                log.log_listeners[task] = \
+                    lambda line: job.publish({'type': 'log',
+                                              'target': target,
+                                              'line': line})
+                configured = targetObj.img
+                try:
+                    operation = None
+                    if job.operation == 'install':
+                        targetObj.img = job.image or configured
+                        check = checks.get(targetObj.img)
+                        if check is not None and check.ok is False:
+                            targetObj.image_unavailable(check)
+                        else:
+                            operation = targetObj.execute()
+                    elif job.operation == 'eject':
+                        operation = targetObj.eject()
+                    else:
+                        operation = targetObj.power(job.state)
+                    ok = operation is not None and \
+                        await engine.run_target(targetObj, operation)
+                finally:
+                    targetObj.img = configured
+                    del log.log_prefixes[task]
+                    del log.log_listeners[task]
+
+        event = {'type': 'target', 'target': target}
+        if targetObj.critical_path is not None:
+            event['critical_seconds'] = round(targetObj.critical_path, 1)
+        if ok:
+            result = 'ok'
+        else:
+            result = 'failed: %s' % targetObj.stage
+            event['error'] = targetObj.error.__class__.__name__
+            event['reason'] = targetObj.error.reason
+        job.results[target] = result
+        event['status'] = result
+        job.publish(event)
+
+    ###########################################################################
+    # HTTP API
+    ###########################################################################
+    async def _client(self, reader, writer):
+        """Serve one http request ; the connection is closed after it"""
+
+        try:
+            request_line = await reader.readline()
+            method, path, _version = request_line.decode('latin-1').split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in [b'\r\n', b'\n', b'']:
+                    break
+                name, _sep, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0))
+            if length > MAX_REQUEST_BYTES:
+                await self._respond(writer, 413, {'error': 'too large'})
+                return
+            body = await reader.readexactly(length) if length else b''
+            dlog1("Daemon      : %s %s" % (method, path))
+            await self._route(writer, method, path.split('?')[0], body)
+        except (ValueError, asyncio.IncompleteReadError) as ex:
+            await self._respond(writer, 400, {'error': str(ex)})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, writer, method, path, body):
+        """Route one http request"""
+
+        parts = [part for part in path.split('/') if part]
+        if parts == ['targets'] and method == 'GET':
+            await self._respond(writer, 200, [
+                {'target': label,
+                 'address': targetObj.ip,
+                 'warm': targetObj.warm}
+                for label, targetObj in self.targets.items()])
+        elif parts == ['jobs'] and method == 'GET':
+            await self._respond(writer, 200, [job.summary() for job in
+                                              self.jobs.values()])
+        elif parts == ['jobs'] and method == 'POST':
+            try:
+                request = json.loads(body.decode('utf-8') or '{}')
+                if not isinstance(request, dict):
+                    raise ValueError("job request must be a json object")
+                job = self.submit(request)
+            except ValueError as ex:
+                await self._respond(writer, 400, {'error': str(ex)})
+                return
+            if request.get('stream'):
+                await self._stream(writer, job)
+            else:
+                await self._respond(writer, 202, job.summary())
+        elif len(parts) in [2, 3] and parts[0] == 'jobs':
+            job = None
+            if parts[1].isdigit():
+                job = self.jobs.get(int(parts[1]))
+            if job is None:
+                await self._respond(writer, 404, {'error': 'no such job'})
+            elif method != 'GET':
+                await self._respond(writer, 405, {'error': 'use GET'})
+            elif len(parts) == 2:
+                await self._respond(writer, 200, job.summary())
+            elif parts[2] == 'events':
+                await self._stream(writer, job)
+            else:
+                await self._respond(writer, 404, {'error': 'not found'})
+        else:
+            await self._respond(writer, 404, {'error': 'not found'})
+
+    @staticmethod
+    async def _respond(writer, status, content):
+        """Send a json response"""
+
+        body = json.dumps(content, sort_keys=True).encode('utf-8') + b'\n'
+        writer.write(("HTTP/1.1 %d %s\r\n"
+                      "Content-Type: application/json\r\n"
+                      "Content-Length: %d\r\n"
+                      "Connection: close\r\n\r\n" %
+                      (status, HTTP_REASONS[status], len(body))).encode() +
+                     body)
+        await writer.drain()
+
+    @staticmethod
+    async def _stream(writer, job):
+        """Stream a job's progress events until it is finished"""
+
+        watcher = asyncio.Queue()
+        job.watchers.append(watcher)
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\n"
+                         b"Content-Type: application/x-ndjson\r\n"
+                         b"Connection: close\r\n\r\n")
+            # the events so far ; then each new one as it happens
+            for event in list(job.events):
+                writer.write(json.dumps(event).encode('utf-8') + b'\n')
+            await writer.drain()
+            while not (job.done() and watcher.empty()):
+                event = await watcher.get()
+                writer.write(json.dumps(event).encode('utf-8') + b'\n')
+                await writer.drain()
+        finally:
+            job.watchers.remove(watcher)
+
+
+def run(target_objects, socket_path, workers=DAEMON_WORKERS):
+    """
+    Run the install daemon until it is stopped.
+
+    :param target_objects: the targets that jobs can operate on
+    :type target_objects: list
+    :param socket_path: the UNIX socket to serve on
+    :type socket_path: str
+    :param workers: max number of targets running a job at once
+    :type workers: int
+    :returns the exit code
+    """
+
+    event_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(event_loop)
+    try:
+        event_loop.run_until_complete(
+            InstallDaemon(target_objects, socket_path, workers).serve())
+    except OSError as ex:
+        elog("Unable to serve on %s (%s)" % (socket_path, ex))
+        return 1
+    finally:
+        event_loop.close()
+    return 0
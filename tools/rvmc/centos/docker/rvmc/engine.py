@@ -0,0 +1,4224 @@
+###############################################################################
+#
+# Copyright (c) 2019-2020 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller stage engine"""
+
+###############################################################################
+#
+# The stage engine installs the host of one or more BMCs. It can be
+# used by other maintenance tooling without the command line:
+#
+#   from rvmc import engine
+#
+#   targets = engine.load_targets(config)   ... parsed rvmc.yaml content
+#   failed = engine.install(targets, parallel=4)  ... targets that failed
+#   engine.shutdown()                       ... save cache and metrics
+#
+# The module globals below the imports hold the command line settings
+# shared by all targets ; set them before calling install.
+#
+###############################################################################
+#
+# Code structure: Note: any error causes error log, session close and
+#                       ends that target's execution with the TargetError
+#                       of its stage ; the other targets carry on
+#
+#   install(target objects)
+#
+#   journal.resume                      ... --resume ; skip the targets an
+#                                           interrupted run finished
+#   probe_targets                       ... check all bmcs are reachable
+#                                           ; drop the unreachable ones
+#   check_target_images                 ... --image-check ; check each
+#                                           unique image url once ; fail
+#                                           the targets of the images
+#                                           that can't be fetched
+#   scheduler.order / waves             ... --canary, --mount-cap, ..
+#                                           ; longest first, canary wave
+#                                           first
+#
+#   for each object of each wave ; up to --parallel objects at a time
+#       execute(object) ; each stage is an asyncio coroutine
+#           _redfish_client_connect     ... connect to bmc
+#           _redfish_root_query         ... get base url tree
+#           _redfish_create_session     ... authenticated session
+#           _redfish_subscribe_events   ... open bmc event stream if offered
+#           _redfish_load_cached_discovery  get discovery info from cache
+#                                           ; skips the next 4 on a hit
+#           _redfish_get_managers       ... get managers urls
+#           _redfish_get_systems_members .. get systems members info
+#                                           ; along with the next 3
+#           _redfish_get_vm_url         ... get cd/dvd vm url ; after the
+#                                           managers
+#           _redfish_load_vm_actions    ... get eject/insert action urls/info
+#           _redfish_reconcile_plan     ... --reconcile ; read current state
+#                                           and plan the steps still needed
+#           _redfish_poweroff_host      ... tell bmc to power-off the host
+#           _redfish_eject_image        ... eject current media if present
+#                                           ; along with the power off
+#           _redfish_insert_image       ... insert and verify insertion of iso
+#                                           ; once ejected and powered off
+#           _redfish_get_boot_capabilities  get boot override modes ; once
+#                                           powered off, along with the
+#                                           insert
+#           _redfish_set_boot_override  ... set boot from cd/dvd on next reset
+#                                           ; once inserted
+#           _redfish_poweron_host       ... tell bmc to power-on the host
+#
+#   The stages that don't depend on each other run at the same time ;
+#   see _run_stages. --serial-stages runs them one at a time.
+#
+###############################################################################
+
+import asyncio
+import base64
+import email.utils
+import json
+import os
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+
+from urllib.parse import urlsplit
+
+import rvmc
+
+from rvmc import image
+from rvmc import log
+from rvmc.cassette import Clock
+from rvmc.cassette import ReplayTransport
+from rvmc.errors import stage_error
+from rvmc.errors import TargetError
+from rvmc.log import alog
+from rvmc.log import current_task
+from rvmc.log import dlog1
+from rvmc.log import dlog2
+from rvmc.log import dlog3
+from rvmc.log import dlog4
+from rvmc.log import elog
+from rvmc.log import ilog
+from rvmc.log import log_prefixes
+from rvmc.log import slog
+from rvmc.transport import AsyncRedfishTransport
+from rvmc.transport import GET
+from rvmc.transport import GET_HEADERS
+from rvmc.transport import LibraryRedfishTransport
+from rvmc.transport import LoginFailed
+from rvmc.transport import PATCH
+from rvmc.transport import PATCH_HEADERS
+from rvmc.transport import POST
+from rvmc.transport import POST_HEADERS
+from rvmc.transport import REDFISH_PORT
+from rvmc.transport import REDFISH_ROOT_PATH
+
+POWER_ON = 'On'
+POWER_OFF = "Off"
+
+# The config file the targets were loaded from ; for error logs
+CONFIG_FILE = rvmc.CONFIG_FILE
+
+# the redfish transport ; asyncio or redfish (library)
+transport = 'asyncio'
+
+# only perform the install steps that are not already done
+reconcile = False
+
+# the discovery cache ; None for none
+discovery_cache = None
+
+# the session cache ; None for none
+session_cache = None
+
+# the timing recorder ; None for none
+timings = None
+
+# the per target stage progress journal ; None for none
+journal = None
+
+# run the stages that don't depend on each other at the same time
+pipeline = True
+
+# the install wave scheduler ; None for none
+scheduler = None
+
+# the built-in install image server ; None for none
+iso_server = None
+
+# the cassettes the requests are recorded in ; None for none
+recordings = None
+
+# the cassettes the requests are answered from ; None to use the BMCs
+replays = None
+
+# the time source and sleeps of the stages ; a faster one for replays
+clock = Clock()
+
+# the install image pre-flight check ; sample, verify or none
+image_check = image.IMAGE_CHECK_DEFAULT
+image_check_timeout = image.IMAGE_CHECK_TIMEOUT_SECS
+
+# Constants
+# ---------
+PRIMARY_CONFIG_LABEL = 'virtual_media_iso'       # Primary Config label
+SUPPORTED_VIRTUAL_MEDIA_DEVICES = ['CD', 'DVD']  # Maybe add USB to list
+
+# Cached sessions are forgotten after a day ; most BMCs expire idle
+# sessions long before that
+SESSION_CACHE_TTL_SECS = 86400
+
+# Reachability check: the max number of targets checked at the same
+# time, the delay between attempts that fail right away and the icmp
+# echo request identifier.
+PROBE_CONCURRENCY = 256
+PROBE_RETRY_SECS = 1
+ICMP_ECHO_ID = os.getpid() & 0xffff
+
+# Redfish $expand levels that fetch the Managers collection down to its
+# Virtual Media members ; Managers -> Manager -> VirtualMedia -> Members
+MANAGERS_EXPAND_LEVELS = 3
+
+# max number of polling retries while waiting for some long task to complete
+MAX_POLL_COUNT = 200
+# some servers timeout on inter comm gaps longer than 10 secs
+RETRY_DELAY_SECS = 10
+# 2 second delay constant
+DELAY_2_SECS = 2
+
+# max seconds to wait for virtual media insertion or ejection
+MEDIA_TIMEOUT_SECS = MAX_POLL_COUNT * RETRY_DELAY_SECS
+# max seconds to wait for a power state change ;
+# some servers take longer than 10 seconds
+POWER_TIMEOUT_SECS = 60
+
+# Adaptive polling: the first poll interval, its growth factor per poll,
+# the +/- jitter fraction applied to each interval, and the interval cap
+# while waiting for a power state change. The media interval cap is
+# RETRY_DELAY_SECS.
+POLL_FIRST_SECS = 0.5
+POLL_GROWTH = 1.5
+POLL_JITTER = 0.2
+POWER_POLL_MAX_SECS = 2
+
+# Request retries: the http statuses and exceptions retried per method,
+# the max attempts per request, the max retries per target operation,
+# the exponential backoff base and cap and the max Retry-After honored.
+# A POST action isn't idempotent ; it is only retried when the BMC
+# surely didn't act on it.
+RETRY_STATUSES = {GET: [408, 429, 500, 502, 503, 504],
+                  PATCH: [408, 429, 502, 503, 504],
+                  POST: [429, 503]}
+RETRY_EXCEPTIONS = {GET: (ConnectionError, asyncio.TimeoutError,
+                          asyncio.IncompleteReadError),
+                    PATCH: (ConnectionError, asyncio.TimeoutError,
+                            asyncio.IncompleteReadError),
+                    POST: (ConnectionRefusedError,)}
+RETRY_ATTEMPTS = 4
+RETRY_BUDGET = 30
+RETRY_BASE_SECS = 0.5
+RETRY_CAP_SECS = 8
+RETRY_AFTER_MAX_SECS = 60
+
+
+class AdaptiveBackoff(object):
+    """
+    Adaptive polling interval generator.
+
+    Intervals start short so fast state changes are seen quickly and
+    grow geometrically up to a cap so slow ones don't flood the BMC with
+    useless requests. Each interval is jittered so the polls of targets
+    started together spread out.
+    """
+
+    def __init__(self, cap, first=POLL_FIRST_SECS):
+        """
+        :param cap: the max interval in seconds
+        :type cap: float
+        :param first: the first interval in seconds
+        :type first: float
+        """
+
+        self.cap = cap
+        self.interval = min(first, cap)
+
+    def next_interval(self):
+        """Return the next poll interval in seconds"""
+
+        interval = self.interval * random.uniform(1 - POLL_JITTER,
+                                                  1 + POLL_JITTER)
+        self.interval = min(self.interval * POLL_GROWTH, self.cap)
+        return min(interval, self.cap)
+
+
+class RetryPolicy(object):
+    """
+    Request retry policy.
+
+    Decides whether a failed request is retried and how long to wait
+    first ; exponential backoff with full jitter so the retries of many
+    targets hitting the same overloaded BMC or network spread out, or
+    the BMC's Retry-After if it sent one.
+    """
+
+    def __init__(self, attempts=RETRY_ATTEMPTS, budget=RETRY_BUDGET,
+                 base=RETRY_BASE_SECS, cap=RETRY_CAP_SECS,
+                 statuses=None, exceptions=None):
+        """
+        :param attempts: max attempts per request ; 1 = no retries
+        :type attempts: int
+        :param budget: max retries per target operation
+        :type budget: int
+        :param base: backoff of the first retry in seconds
+        :type base: float
+        :param cap: max backoff in seconds
+        :type cap: float
+        :param statuses: http method -> list of retried statuses
+        :type statuses: dictionary
+        :param exceptions: http method -> tuple of retried exceptions
+        :type exceptions: dictionary
+        """
+
+        self.attempts = attempts
+        self.budget = budget
+        self.base = base
+        self.cap = cap
+        self.statuses = RETRY_STATUSES if statuses is None else statuses
+        self.exceptions = \
+            RETRY_EXCEPTIONS if exceptions is None else exceptions
+
+    @staticmethod
+    def retry_after(response):
+        """
+        Return the seconds a response's Retry-After header asks to wait
+        ; None if it has none.
+        """
+
+        try:
+            value = response.getheader('Retry-After')
+        except Exception:
+            return None
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                when = email.utils.parsedate_to_datetime(value)
+                seconds = when.timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(seconds, 0), RETRY_AFTER_MAX_SECS)
+
+    def delay(self, method, attempt, retries, response, error):
+        """
+        Return the seconds to wait before retrying a failed request ;
+        None if it isn't retried.
+
+        :param method: the http method
+        :type method: str
+        :param attempt: the attempt that failed ; 1 for the first
+        :type attempt: int
+        :param retries: the target operation's retries so far
+        :type retries: int
+        :param response: the response ; None if there wasn't one
+        :param error: the exception raised ; None if there wasn't one
+        :type error: Exception
+        """
+
+        if attempt >= self.attempts or retries >= self.budget:
+            return None
+        if response is not None:
+            if response.status not in self.statuses.get(method, []):
+                return None
+            seconds = self.retry_after(response)
+            if seconds is not None:
+                return seconds
+        elif error is None or \
+                not isinstance(error, self.exceptions.get(method, ())):
+            return None
+        return random.uniform(0, min(self.cap,
+                                     self.base * 2 ** (attempt - 1)))
+
+
+# the request retry policy
+retry_policy = RetryPolicy()
+
+
+def is_ipv6_address(address):
+    """
+    Check IPv6 Address.
+
+    :param address: the ip address to compare user name.
+    :type address: str.
+    :returns bool: True if address is an IPv6 address else False
+    """
+
+    try:
+        socket.inet_pton(socket.AF_INET6, address)
+        dlog3("Address     : %s is IPv6" % address)
+    except socket.error:
+        dlog3("Address     : %s is IPv4" % address)
+        return False
+    return True
+
+
+def supported_device(devices):
+    """
+    Supported Device
+
+    :param devices: list of devices
+    :type : list
+    :returns True if a device in devices list is in the
+             SUPPORTED_VIRTUAL_MEDIA_DEVICES list.
+             Otherwise False is returned.
+    """
+
+    for device in devices:
+        if device in SUPPORTED_VIRTUAL_MEDIA_DEVICES:
+            return True
+    return False
+
+
+###############################################################################
+#
+# Redfish Discovery Cache
+#
+# Remembers the URLs and capabilities that the discovery stages learn
+# from each BMC so that repeat installs of the same fleet can go straight
+# to the eject/insert stages.
+#
+# Entries are keyed by the BMC's address and the identity published in
+# its root query (RedfishVersion, UUID, Vendor, Product) so a firmware
+# update or board swap misses the cache. Entries expire after the
+# configured time to live.
+#
+# The cache is a json file ; read once at startup and written atomically
+# when the tool exits.
+#
+###############################################################################
+class DiscoveryCache(object):
+    """
+    Persistent on-disk Redfish discovery cache
+    """
+
+    # The log label and name of the cache
+    LABEL = 'Disc Cache  '
+    NAME = 'discovery cache'
+
+    # The VmcObject members an entry holds
+    MEMBERS = ['systems_member_url',
+               'vm_url',
+               'vm_actions',
+               'vm_media_types',
+               'vm_label',
+               'vm_version',
+               'reset_command_url',
+               'reset_action_dict',
+               'boot_override_modes']
+
+    def __init__(self, filename, ttl):
+        """
+        :param filename: the cache file
+        :type filename: str.
+        :param ttl: entry time to live in seconds
+        :type ttl: int
+        """
+
+        self.filename = filename
+        self.ttl = ttl
+        self.entries = {}
+        self.updates = {}       # entries stored or invalidated by this run
+        self.load()
+
+    def load(self):
+        """Load the cache file ; a missing or corrupt file is empty"""
+
+        try:
+            with open(self.filename, 'r') as cache_file:
+                self.entries = json.load(cache_file)
+            dlog1("%s: %s (%d entries)" %
+                  (self.LABEL, self.filename, len(self.entries)))
+        except (IOError, OSError):
+            self.entries = {}
+        except ValueError as ex:
+            elog("Ignoring corrupt %s %s (%s)" %
+                 (self.NAME, self.filename, ex))
+            self.entries = {}
+
+    def lookup(self, key):
+        """
+        Look up an entry.
+
+        :param key: bmc identity key
+        :type key: str.
+        :returns the entry dictionary or None if not cached or expired
+        """
+
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry.get('stored', 0) > self.ttl:
+            dlog1("%s: expired entry for %s" % (self.LABEL, key))
+            self.invalidate(key)
+            return None
+        return entry
+
+    def store(self, key, entry):
+        """
+        Store an entry.
+
+        :param key: bmc identity key
+        :type key: str.
+        :param entry: dictionary of MEMBERS values
+        :type entry: dictionary
+        """
+
+        entry['stored'] = time.time()
+        self.entries[key] = entry
+        self.updates[key] = entry
+
+    def invalidate(self, key):
+        """Remove an entry"""
+
+        if key in self.entries:
+            del self.entries[key]
+            self.updates[key] = None
+
+    def save(self):
+        """
+        Write this run's updates to the cache file.
+
+        The file is re-read first so entries written by other rvmc runs
+        since startup are kept. It is written to a temporary file that
+        is then renamed so readers never see a partial file.
+        """
+
+        if not self.updates:
+            return
+
+        saved_updates = self.updates
+        self.updates = {}
+        self.load()
+        for key, entry in saved_updates.items():
+            if entry is None:
+                self.entries.pop(key, None)
+            else:
+                self.entries[key] = entry
+
+        tmp_filename = "%s.%d.tmp" % (self.filename, os.getpid())
+        try:
+            fd = os.open(tmp_filename,
+                         os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as cache_file:
+                json.dump(self.entries, cache_file, indent=1, sort_keys=True)
+            os.rename(tmp_filename, self.filename)
+            dlog1("%s: saved %d entries to %s" %
+                  (self.LABEL, len(self.entries), self.filename))
+        except (IOError, OSError) as ex:
+            elog("Failed to save %s %s (%s)" %
+                 (self.NAME, self.filename, ex))
+
+
+###############################################################################
+#
+# Redfish Session Cache
+#
+# Remembers each BMC's X-Auth-Token session so that the next rvmc run
+# against it can skip the session create ; some BMCs take seconds to
+# create one and cap the number of concurrent sessions.
+#
+# Entries are keyed by the BMC's url and username. A cached session is
+# validated with a GET of its session resource before it is reused and
+# a session that expires while in use is renewed on its first 401.
+# Sessions are left open ; --logout-cached logs them all out.
+#
+# The cache holds credentials ; it is only ever written with owner only
+# permissions.
+#
+###############################################################################
+class SessionCache(DiscoveryCache):
+    """
+    Persistent on-disk Redfish session cache
+    """
+
+    LABEL = 'Sess Cache  '
+    NAME = 'session cache'
+
+    def load(self):
+        """Load the cache file ; made owner only if others can read it"""
+
+        try:
+            if os.stat(self.filename).st_mode & 0o077:
+                os.chmod(self.filename, 0o600)
+                alog("Session cache %s was accessible by others ; "
+                     "made owner only" % self.filename)
+        except (IOError, OSError):
+            pass
+        super(SessionCache, self).load()
+
+
+# Per Target Stage Progress Journal
+#
+# Remembers how far each target's install got so that a run that was
+# interrupted, say by a pod eviction, can be resumed with --resume:
+#
+#   {"<target>": {"address": .., "image": .., "status": "running",
+#                 "stage": "Power Off Host", "stages": [..],
+#                 "started": <epoch>, "updated": <epoch>,
+#                 "seconds": <critical path seconds once done>}, ..}
+#
+# status is running, done or failed ; stage is the last completed stage
+# and stages lists them all. The wave scheduler starts the targets
+# whose last install took longest first. Only the install operation is
+# journaled.
+#
+# The entries are kept in memory ; the ones that changed are written at
+# most every JOURNAL_FLUSH_SECS, in the event loop's executor so the
+# stages never wait for the disk, and at the end of a run. The file is
+# rewritten atomically and only re-read if another rvmc run changed it.
+#
+# A resumed run skips the targets that are done with the same address
+# and image. The others are installed with a reconcile plan ; the BMC's
+# current state is re-read and only the install steps that are not
+# already done are performed.
+#
+###############################################################################
+JOURNAL_FLUSH_SECS = 1.0
+
+
+class StateJournal(object):
+    """
+    Persistent on-disk per target stage progress journal
+    """
+
+    # the last install stage ; the target is done once it completed
+    FINAL_STAGE = 'Power On Host'
+
+    def __init__(self, filename):
+        """
+        :param filename: the journal file
+        :type filename: str.
+        """
+
+        self.filename = filename
+        self.entries = {}
+        self.updates = {}       # entries written by this run
+        self.write_failed = False  # True once a failed write is logged
+        self.mtime = None       # of the file when last read or written
+        self.dirty = False      # True if an update is not written yet
+        self.timer = None       # the pending flush
+        self.sequence = 0       # of the last update snapshot taken
+        self.written = 0        # of the last update snapshot written
+        self.lock = threading.Lock()    # one write at a time
+        self.load()
+
+    def load(self):
+        """Load the journal file ; a missing or corrupt file is empty"""
+
+        try:
+            with open(self.filename, 'r') as journal_file:
+                self.mtime = os.fstat(journal_file.fileno()).st_mtime_ns
+                self.entries = json.load(journal_file)
+            dlog1("Journal     : %s (%d entries)" %
+                  (self.filename, len(self.entries)))
+        except (IOError, OSError):
+            self.entries = {}
+        except ValueError as ex:
+            elog("Ignoring corrupt journal %s (%s)" % (self.filename, ex))
+            self.entries = {}
+
+    def resume(self, target_objects):
+        """
+        Set up the targets of an interrupted run to be resumed.
+
+        :param target_objects: list of target objects to install
+        :type target_objects: list
+        :returns list of the target objects that are not done
+        """
+
+        remaining = []
+        for targetObj in target_objects:
+            entry = self.entries.get(targetObj.label)
+            if entry is None or \
+                    entry.get('address') != targetObj.ip or \
+                    entry.get('image') != targetObj.img:
+                remaining.append(targetObj)
+                continue
+            stages = entry.get('stages', [])
+            if entry.get('status') == 'done' or \
+                    self.FINAL_STAGE in stages:
+                ilog("Resume      : %s done at %s ; skipped" %
+                     (targetObj.label,
+                      time.ctime(entry.get('updated', 0))))
+                continue
+            ilog("Resume      : %s %s after '%s' ; re-verifying" %
+                 (targetObj.label, entry.get('status'),
+                  entry.get('stage')))
+            targetObj.resume_stages = stages
+            remaining.append(targetObj)
+        return remaining
+
+    def start(self, targetObj):
+        """
+        Start a target's install entry.
+
+        :param targetObj: the target object being installed
+        :type targetObj: VmcObject
+        :returns the entry
+        """
+
+        now = time.time()
+        entry = {'address': targetObj.ip,
+                 'image': targetObj.img,
+                 'status': 'running',
+                 'stage': None,
+                 'stages': list(targetObj.resume_stages or []),
+                 'started': now,
+                 'updated': now}
+        if entry['stages']:
+            entry['stage'] = entry['stages'][-1]
+        self._write(targetObj.label, entry)
+        return entry
+
+    def stage_done(self, targetObj, entry, stage):
+        """Record that one of a target's install stages completed"""
+
+        if stage not in entry['stages']:
+            entry['stages'].append(stage)
+        entry['stage'] = stage
+        entry['updated'] = time.time()
+        self._write(targetObj.label, entry)
+
+    def finish(self, targetObj, entry, status):
+        """
+        Record the outcome of a target's install.
+
+        :param status: done or failed
+        :type status: str
+        """
+
+        entry['status'] = status
+        entry['updated'] = time.time()
+        if status == 'done':
+            # the time of its stages ; not of its scheduler waits
+            entry['seconds'] = round(targetObj.critical_seconds(), 1)
+        self._write(targetObj.label, entry)
+
+    def durations(self):
+        """
+        Return the critical path seconds of the last finished install
+        of each target ; by target label.
+        """
+
+        return dict((label, entry['seconds'])
+                    for label, entry in self.entries.items()
+                    if entry.get('status') == 'done' and
+                    isinstance(entry.get('seconds'), (int, float)))
+
+    def _write(self, key, entry):
+        """
+        Update a target's entry ; it is written within
+        JOURNAL_FLUSH_SECS, or by flush.
+        """
+
+        self.updates[key] = entry
+        self.dirty = True
+        if self.timer is not None:
+            return
+        loop = asyncio.get_event_loop()
+        if loop.is_running():
+            self.timer = loop.call_later(JOURNAL_FLUSH_SECS,
+                                         self._flush_later, loop)
+        else:
+            self.flush()
+
+    def _snapshot(self):
+        """Return a numbered copy of this run's entries to write"""
+
+        self.dirty = False
+        self.sequence += 1
+        return self.sequence, dict((key, dict(entry,
+                                              stages=list(entry['stages'])))
+                                   for key, entry in self.updates.items())
+
+    def _flush_later(self, loop):
+        """Flush timer ; write the updated entries in the executor"""
+
+        self.timer = None
+        if self.dirty:
+            loop.run_in_executor(None, self._save, *self._snapshot())
+
+    def flush(self):
+        """Write the entries not written yet ; at the end of a run"""
+
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.dirty:
+            self._save(*self._snapshot())
+
+    def _save(self, sequence, updates):
+        """
+        Write this run's entries to the journal file.
+
+        The file is re-read first if it changed since it was last read
+        or written so entries written by other rvmc runs are kept. It is
+        written to a temporary file that is then renamed so an
+        interrupted write never leaves a partial file.
+
+        :param sequence: the number of the updates snapshot ; an older
+                         snapshot than the last one written is dropped
+        :type sequence: int
+        :param updates: this run's entries
+        :type updates: dictionary
+        """
+
+        with self.lock:
+            if sequence <= self.written:
+                return
+            try:
+                mtime = os.stat(self.filename).st_mtime_ns
+            except (IOError, OSError):
+                mtime = None
+            if mtime != self.mtime:
+                self.load()
+            self.entries.update(updates)
+
+            tmp_filename = "%s.%d.tmp" % (self.filename, os.getpid())
+            try:
+                fd = os.open(tmp_filename,
+                             os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, 'w') as journal_file:
+                    json.dump(self.entries, journal_file, sort_keys=True)
+                    journal_file.flush()
+                    self.mtime = os.fstat(journal_file.fileno()).st_mtime_ns
+                os.rename(tmp_filename, self.filename)
+                self.written = sequence
+            except (IOError, OSError) as ex:
+                if self.write_failed is False:
+                    self.write_failed = True
+                    alog("Journal     : unable to write %s (%s) ; check "
+                         "that it is on a writable volume" %
+                         (self.filename, ex))
+
+
+###############################################################################
+#
+# Stage and Request Timing
+#
+# Records the monotonic latency of every execution stage and every http
+# request of every target, independent of the debug level.
+#
+# The trace file gets one json line per event as it happens:
+#
+#   {"type": "request", "target": .., "bmc": .., "method": "GET",
+#    "path": "/redfish/v1/Managers/{id}", "status": 200, "bytes": 912,
+#    "ms": 41.7, ...}
+#   {"type": "stage", "target": .., "stage": "Power Off Host",
+#    "result": "ok", "ms": 2511.2, ...}
+#   {"type": "target", "target": .., "vendor": .., "model": ..,
+#    "result": "ok", "ms": 9412.0, ...}
+#
+# The metrics file is rewritten with the latency histograms of all the
+# targets finished so far. A target's observations are added once it
+# finishes because its vendor and model labels are only known after its
+# root query.
+#
+###############################################################################
+
+# Histogram bucket upper bounds in seconds
+REQUEST_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+STAGE_BUCKETS = [0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200]
+
+# Redfish collections ; the path segment after one is a member id
+REDFISH_COLLECTIONS = ['Managers', 'Systems', 'Chassis', 'VirtualMedia',
+                       'Sessions', 'Tasks', 'TaskMonitors',
+                       'Subscriptions', 'Members']
+
+
+def path_template(path):
+    """
+    Return the request path with its member ids replaced by {id}
+    so that requests to different BMCs aggregate.
+
+    /redfish/v1/Managers/iDRAC.Embedded.1/VirtualMedia/CD
+        -> /redfish/v1/Managers/{id}/VirtualMedia/{id}
+
+    :param path: request path or url
+    :type path: str.
+    """
+
+    segments = urlsplit(path).path.rstrip('/').split('/')
+    for index in range(1, len(segments)):
+        if segments[index - 1] in REDFISH_COLLECTIONS and \
+                segments[index - 1] != segments[index]:
+            segments[index] = '{id}'
+    return '/'.join(segments) or '/'
+
+
+class Histogram(object):
+    """
+    Prometheus histogram of one label set
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Add one observation"""
+
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class TimingRecorder(object):
+    """
+    Stage and request latency trace and metrics writer
+    """
+
+    def __init__(self, trace_filename, metrics_filename):
+        """
+        :param trace_filename: json lines trace file ; None for none
+        :type trace_filename: str.
+        :param metrics_filename: Prometheus textfile ; None for none
+        :type metrics_filename: str.
+        """
+
+        self.trace_file = None
+        if trace_filename:
+            self.trace_file = open(trace_filename, 'a', buffering=1)
+        self.metrics_filename = metrics_filename
+
+        # metric name -> {label tuple: Histogram}
+        self.histograms = {'rvmc_request_duration_seconds': {},
+                           'rvmc_stage_duration_seconds': {},
+                           'rvmc_target_duration_seconds': {}}
+        # label tuple -> count
+        self.responses = {}
+        self.response_bytes = {}
+        self.retries = {}
+
+    def trace(self, record_type, targetObj, **fields):
+        """
+        Write one trace record.
+
+        :param record_type: request, stage or target
+        :type record_type: str.
+        :param targetObj: the target the record is for
+        :type targetObj: VmcObject
+        """
+
+        if self.trace_file is None:
+            return
+        record = {'type': record_type,
+                  'time': round(time.time(), 3),
+                  'target': targetObj.target,
+                  'bmc': targetObj.ip}
+        record.update(fields)
+        self.trace_file.write(json.dumps(record, sort_keys=True) + "\n")
+
+    def request(self, targetObj, method, path, status, nbytes, seconds):
+        """Record one http request ; status is None if it failed"""
+
+        self.trace('request', targetObj,
+                   method=method,
+                   path=path_template(path),
+                   status=status,
+                   bytes=nbytes,
+                   ms=round(seconds * 1000, 1))
+
+    def stage(self, targetObj, stage, result, seconds):
+        """Record one execution stage"""
+
+        self.trace('stage', targetObj,
+                   stage=stage,
+                   result=result,
+                   ms=round(seconds * 1000, 1))
+
+    def target(self, targetObj, result, seconds):
+        """
+        Record a finished target and add its stage and request
+        latencies to the histograms.
+        """
+
+        vendor = targetObj.vendor or 'unknown'
+        model = targetObj.model or 'unknown'
+        self.trace('target', targetObj,
+                   vendor=vendor,
+                   model=model,
+                   result=result,
+                   stage=targetObj.stage,
+                   retries=sum(targetObj.retries.values()),
+                   critical_ms=round(targetObj.critical_path * 1000, 1),
+                   ms=round(seconds * 1000, 1))
+
+        for key, count in targetObj.retries.items():
+            method, reason = key.split(' ', 1)
+            labels = (('method', method), ('reason', reason),
+                      ('vendor', vendor), ('model', model))
+            self.retries[labels] = self.retries.get(labels, 0) + count
+
+        for method, path, status, nbytes, request_seconds in \
+                targetObj.request_timings:
+            path = path_template(path)
+            self._observe('rvmc_request_duration_seconds', REQUEST_BUCKETS,
+                          (('method', method), ('path', path),
+                           ('vendor', vendor), ('model', model)),
+                          request_seconds)
+            labels = (('method', method), ('path', path),
+                      ('status', str(status)),
+                      ('vendor', vendor), ('model', model))
+            self.responses[labels] = self.responses.get(labels, 0) + 1
+            labels = (('vendor', vendor), ('model', model))
+            self.response_bytes[labels] = \
+                self.response_bytes.get(labels, 0) + nbytes
+        for stage, stage_result, stage_seconds in targetObj.stage_timings:
+            self._observe('rvmc_stage_duration_seconds', STAGE_BUCKETS,
+                          (('stage', stage), ('result', stage_result),
+                           ('vendor', vendor), ('model', model)),
+                          stage_seconds)
+        self._observe('rvmc_target_duration_seconds', STAGE_BUCKETS,
+                      (('result', result),
+                       ('vendor', vendor), ('model', model)),
+                      seconds)
+
+    def _observe(self, name, buckets, labels, value):
+        """Add an observation to the histogram of a label set"""
+
+        histogram = self.histograms[name].get(labels)
+        if histogram is None:
+            histogram = self.histograms[name][labels] = Histogram(buckets)
+        histogram.observe(value)
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        """Return a Prometheus label set string"""
+
+        pairs = []
+        for name, value in tuple(labels) + tuple(extra):
+            value = str(value).replace('\\', '\\\\')
+            value = value.replace('"', '\\"').replace('\n', '\\n')
+            pairs.append('%s="%s"' % (name, value))
+        return '{' + ','.join(pairs) + '}'
+
+    def save(self):
+        """
+        Write the metrics file.
+
+        It is written to a temporary file that is then renamed so the
+        node exporter never reads a partial file.
+        """
+
+        if self.metrics_filename is None:
+            return
+
+        lines = []
+        helps = {'rvmc_request_duration_seconds':
+                 'Redfish http request latency',
+                 'rvmc_stage_duration_seconds':
+                 'Install execution stage latency',
+                 'rvmc_target_duration_seconds':
+                 'Install latency of one target'}
+        for name in sorted(self.histograms):
+            lines.append('# HELP %s %s' % (name, helps[name]))
+            lines.append('# TYPE %s histogram' % name)
+            for labels in sorted(self.histograms[name]):
+                histogram = self.histograms[name][labels]
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append('%s_bucket%s %d' %
+                                 (name,
+                                  self._labels(labels, [('le', bound)]),
+                                  count))
+                lines.append('%s_bucket%s %d' %
+                             (name, self._labels(labels, [('le', '+Inf')]),
+                              histogram.count))
+                lines.append('%s_sum%s %.6f' %
+                             (name, self._labels(labels), histogram.sum))
+                lines.append('%s_count%s %d' %
+                             (name, self._labels(labels), histogram.count))
+
+        lines.append('# HELP rvmc_responses_total Redfish http responses')
+        lines.append('# TYPE rvmc_responses_total counter')
+        for labels in sorted(self.responses):
+            lines.append('rvmc_responses_total%s %d' %
+                         (self._labels(labels), self.responses[labels]))
+        lines.append('# HELP rvmc_response_bytes_total '
+                     'Redfish http response body bytes')
+        lines.append('# TYPE rvmc_response_bytes_total counter')
+        for labels in sorted(self.response_bytes):
+            lines.append('rvmc_response_bytes_total%s %d' %
+                         (self._labels(labels), self.response_bytes[labels]))
+        lines.append('# HELP rvmc_request_retries_total '
+                     'Redfish http request retries')
+        lines.append('# TYPE rvmc_request_retries_total counter')
+        for labels in sorted(self.retries):
+            lines.append('rvmc_request_retries_total%s %d' %
+                         (self._labels(labels), self.retries[labels]))
+
+        tmp_filename = "%s.%d.tmp" % (self.metrics_filename, os.getpid())
+        try:
+            with open(tmp_filename, 'w') as metrics_file:
+                metrics_file.write("\n".join(lines) + "\n")
+            os.rename(tmp_filename, self.metrics_filename)
+            dlog1("Metrics     : saved to %s" % self.metrics_filename)
+        except (IOError, OSError) as ex:
+            elog("Failed to save metrics file %s (%s)" %
+                 (self.metrics_filename, ex))
+
+
+def parse_target(target_name, target_dict):
+    """
+    Parse key value pairs in target and if successful create
+    a vmcObject.
+
+    :param target_name: arbitrary target label
+    :type target_name: str.
+    :param target_dict: dictionary of key value config file pairs
+    :type target_dict: dictionary
+    :returns the VmcObject ; None if the target is not valid
+    """
+
+    dlog3("Parse Target: %s:%s" % (target_name, target_dict))
+
+    pw = target_dict.get('bmc_password')
+    if pw is None:
+        elog("Failed get bmc password from config file")
+        return
+
+    try:
+        pw_dec = base64.b64decode(pw).decode('utf-8')
+    except Exception as ex:
+        elog("Failed to decode bmc password found in config file (%s)" % ex)
+        alog("Verify config file's bmc password is base64 encoded")
+        return
+
+    address = target_dict.get('bmc_address')
+    if address is None:
+        elog("Failed to decode bmc password found in %s" % CONFIG_FILE)
+        alog("Verify config file's bmc password is base64 encoded")
+        return
+
+    ####################################################################
+    #
+    # Add url encoding [] for ipv6 addresses only.
+    #
+    # Note: The imported redfish library produces a python exception
+    #       on the session close if the ipv4 address has [] around it.
+    #
+    #       I debugged the issue and know what it is and how to fix it
+    #       but requires an upstream change that is not worth doing.
+    #
+    # URL Encoding for IPv6 only is an easy solution.
+    #
+    ######################################################################
+    if is_ipv6_address(address) is True:
+        bmc_ipv6 = True
+        address = '[' + address + ']'
+    else:
+        bmc_ipv6 = False
+
+    # optional non-standard Redfish https port
+    try:
+        port = int(target_dict.get('bmc_port', REDFISH_PORT))
+    except (TypeError, ValueError):
+        elog("Failed to parse bmc_port '%s' found in %s" %
+             (target_dict.get('bmc_port'), CONFIG_FILE))
+        alog("Verify config file's bmc port is a number")
+        return
+
+    # Create object
+    try:
+        vmc_obj = VmcObject(target_name,
+                            address,
+                            target_dict.get('bmc_username'),
+                            pw,
+                            str(pw_dec),
+                            target_dict.get('image'),
+                            port)
+        if vmc_obj:
+            vmc_obj.ipv6 = bmc_ipv6
+            return vmc_obj
+        else:
+            elog("Unable to create control object for target:%s ; "
+                 "skipping ..." % target_dict)
+
+    except Exception as ex:
+        elog("Unable to parse configuration for '%s' (%s)"
+             "in config file." % (target_dict, ex))
+        alog("Check presence and spelling of configuration"
+             " members under '%s' for target '%s'." %
+             (PRIMARY_CONFIG_LABEL, target_dict))
+    return None
+
+
+def load_targets(cfg, targets=None):
+    """
+    Create the target objects of a parsed config file.
+
+    :param cfg: the parsed config file ; a single target's key value
+                pairs or targets under the primary config label
+    :type cfg: dictionary
+    :param targets: the targets under the primary config label to
+                    load ; all of them if empty
+    :type targets: list
+    :returns list of target objects
+    """
+
+    target_objects = []
+    found = False  # assume nothing is found to start
+    targets = list(targets or [])
+
+    # loop over all the sections looking for the primary config label
+    for section in cfg:
+        if section == PRIMARY_CONFIG_LABEL:
+            # ... once found then loop over all the targets
+            if log.debug >= 2:
+                dlog2("VM Iso Label: %s" % cfg[section])
+            found = True
+            if targets:
+                dlog2("Using specified target(s): %s" % targets)
+            else:
+                for target in cfg[section]:
+                    targets.append(target)
+
+            dlog1("Targets     : %s" % targets)
+            for target in targets:
+                try:
+                    vmc_obj = parse_target(target, cfg[section][target])
+                except Exception as ex:
+                    elog("Failed to parse info from '%s' target %s" %
+                         (target, ex))
+                    alog("Verify %s file has %s target and such target "
+                         "is properly formatted" %
+                         (CONFIG_FILE, target))
+                    continue
+                if vmc_obj is not None:
+                    target_objects.append(vmc_obj)
+
+    # 'found' would still be false if the config file is for a single target
+    if found is False:
+        dlog3("Try single")
+        vmc_obj = parse_target(None, cfg)
+        if vmc_obj is not None:
+            target_objects.append(vmc_obj)
+    return target_objects
+
+
+class VmcObject(object):
+    """
+    Virtual Media Controller Class Object. One for each BMC
+    """
+
+    # Thousands of targets may be installed by one process ; keep each
+    # object to the fixed set of attributes the stage engine uses.
+    __slots__ = ('target', 'label', 'error', 'uri', 'port', 'url', 'un', 'ip',
+                 'pw_encoded', 'pw', 'img', 'ipv6', 'redfish_obj',
+                 'transport_stats', 'session', 'keep_session', 'warm', 'stage',
+                 'stage_starts', 'branches', 'stage_graph',
+                 'overlapped_stages', 'critical_path', 'start_time',
+                 'vendor', 'model',
+                 'probe_result', 'retries', 'journal_entry', 'resume_stages',
+                 'stage_timings', 'request_timings', 'response',
+                 'response_dict', 'sessions_url', 'event_service_url',
+                 'expand_symbol', 'expand_max_levels', 'select_supported',
+                 'managers_group_url', 'manager_members_list', 'vm_url',
+                 'vm_eject_url', 'vm_group_url', 'vm_group', 'vm_label',
+                 'vm_version', 'vm_actions', 'vm_members_array',
+                 'vm_media_types', 'systems_group_url', 'systems_member_url',
+                 'systems_members_list', 'systems_members', 'systems_expanded',
+                 'power_state', 'boot_control_dict', 'boot_override_modes',
+                 'boot_capabilities_known', 'plan', 'event_stream',
+                 'event_listener', 'state_event', 'wait_times', 'bmc_identity',
+                 'discovery_cached', 'reset_command_url', 'reset_action_dict')
+
+    def __init__(self,
+                 hostname,
+                 address,
+                 username,
+                 password,
+                 password_decoded,
+                 image_url,
+                 port=REDFISH_PORT):
+
+        self.target = hostname
+        self.label = hostname or address.rstrip()  # for logs and results
+        self.error = None           # the TargetError of the last failure
+        self.uri = "https://" + address
+        if port != REDFISH_PORT:
+            self.uri = "%s:%d" % (self.uri, port)
+        self.port = port
+        self.url = REDFISH_ROOT_PATH
+        self.un = username.rstrip()
+        self.ip = address.rstrip()
+        self.pw_encoded = password.rstrip()
+        self.pw = password_decoded
+        self.img = image_url.rstrip()
+        self.ipv6 = False
+        self.redfish_obj = None     # redfish transport object
+        self.transport_stats = None  # its connection reuse counters
+        self.session = False        # True when session for this BMC is created
+        self.keep_session = False   # True to keep the session and discovery
+        #                             info open between operations
+        self.warm = False           # True while they are kept open
+        self.stage = None           # the current/last execution stage
+        self.stage_starts = {}      # running stage -> monotonic start time
+        self.branches = {}          # stage graph task -> its step
+        # stage graph step -> [its stages, dependencies, end time]
+        self.stage_graph = {}
+        self.overlapped_stages = []  # stages off the critical path
+        self.critical_path = None   # seconds of stages on the critical path
+        self.start_time = None      # monotonic start time of execute
+        self.vendor = None          # bmc vendor from the root query
+        self.model = None           # bmc product from the root query
+        self.probe_result = None    # reachability check result
+        self.retries = {}           # 'method reason' -> request retries
+        self.journal_entry = None   # journal entry of a running install
+        self.resume_stages = None   # stages an interrupted run completed
+
+        # timing info ; (stage, result, seconds) and
+        # (method, path, status, bytes, seconds) tuples
+        self.stage_timings = []
+        self.request_timings = []
+
+        self.response = None        # holds response from last http request
+        self.response_dict = None   # dictionary version of above response
+
+        # redfish root query response
+        self.sessions_url = None     # session service sessions url
+        self.event_service_url = None  # event service url ; if published
+        self.expand_symbol = None    # '.' or '*' if $expand is supported
+        self.expand_max_levels = 0   # max $expand $levels ; 0 if no levels
+        self.select_supported = False  # True if $select is supported
+
+        # Managers Info
+        self.managers_group_url = None
+        self.manager_members_list = []
+
+        # Virtual Media Info
+        self.vm_url = None
+        self.vm_eject_url = None
+        self.vm_group_url = None
+        self.vm_group = None
+        self.vm_label = None
+        self.vm_version = None
+        self.vm_actions = {}
+        self.vm_members_array = []
+        self.vm_media_types = []
+
+        # systems info
+        self.systems_group_url = None
+        self.systems_member_url = None
+        self.systems_members_list = []
+        self.systems_members = 0
+        self.systems_expanded = {}   # member url -> $expand'ed resource
+        self.power_state = None
+
+        # boot control info
+        self.boot_control_dict = {}
+        self.boot_override_modes = None      # allowable override modes
+        self.boot_capabilities_known = False  # True once modes are learned
+
+        # reconcile plan ; install step -> (True if needed, reason)
+        self.plan = None
+
+        # state change waiting info
+        self.event_stream = None     # server sent event stream
+        self.event_listener = None   # event stream listener task
+        self.state_event = None      # set when the bmc posts an event
+        self.wait_times = {}         # stage -> measured time-to-state
+
+        # discovery cache info
+        self.bmc_identity = None     # bmc address and root query identity
+        self.discovery_cached = False  # True if discovery came from cache
+
+        # systems reset info
+        self.reset_command_url = None
+        self.reset_action_dict = {}
+
+        # parsed target object info
+        if self.target is not None:
+            dlog1("Target      : %s" % self.target)
+        dlog1("BMC IP      : %s" % self.ip)
+        if self.port != REDFISH_PORT:
+            dlog1("BMC Port    : %d" % self.port)
+        dlog1("Username    : %s" % self.un)
+        dlog1("Password    : %s" % self.pw_encoded)
+        dlog1("Image       : %s" % self.img)
+
+    async def make_request(self, operation=None, path=None, payload=None):
+        """
+        Issue a Redfish http request,
+        Check response,
+        Convert response to dictionary format
+        Convert response to json format
+
+        :param operation: HTTP GET, POST or PATCH operation
+        :type operation: str.
+        :param path: url to perform request to
+        :type path: str
+        :param payload: POST or PATCH payload data
+        :type payload: dictionary
+        :returns True if request succeeded (200,202(accepted),204(no content)
+        """
+
+        if path is not None:
+            url = path
+        else:
+            url = self.url
+
+        # the reply is kept in a local until its retries are done ;
+        # concurrent stage branches share self.response and a sibling
+        # sets it while this request is awaited
+        attempt = 0
+        while True:
+            attempt += 1
+            response = None
+            error = None
+            before_request_time = clock.monotonic()
+            try:
+                dlog3("Request     : %s %s" % (operation, url))
+                if operation == GET:
+                    dlog3("Headers     : %s : %s" % (operation, GET_HEADERS))
+                    response = await self.redfish_obj.request(
+                        GET, url, headers=GET_HEADERS)
+
+                elif operation == POST:
+                    dlog3("Headers     : %s : %s" %
+                          (operation, POST_HEADERS))
+                    dlog3("Payload     : %s" % payload)
+                    response = await self.redfish_obj.request(
+                        POST, url, body=payload, headers=POST_HEADERS)
+
+                elif operation == PATCH:
+                    dlog3("Headers     : %s : %s" %
+                          (operation, PATCH_HEADERS))
+                    dlog3("Payload     : %s" % payload)
+                    response = await self.redfish_obj.request(
+                        PATCH, url, body=payload, headers=PATCH_HEADERS)
+                else:
+                    elog("Unsupported operation: %s" % operation)
+                    return False
+
+            except Exception as ex:
+                error = ex
+
+            # retry a transient failure
+            if await self._retry_wait(operation, url, attempt,
+                                      response, error) is False:
+                break
+
+        if error is not None:
+            elog("Failed operation on '%s' (%s)" % (url, error))
+
+        if response is not None:
+            self.response = response
+            delta = clock.monotonic() - before_request_time
+            # if we got a response, check its status
+            if self.check_ok_status(url, operation, delta) is False:
+                await self._exit(1)
+
+            # handle 204 success with no content ; clear last response
+            if self.response.status == 204:
+                self.response = ""
+                return True
+
+            # handle 202 accepted with no content ; keep the response
+            # for its Task Monitor Location header
+            if self.response.status == 202 and not self.response.read:
+                self.response_dict = {}
+                return True
+            try:
+                if self.resp_dict() is True:
+                    if log.debug >= 4:
+                        dlog4("Response:\n%s\n" % self.response_json)
+                    return True
+                else:
+                    elog("Failed to parse BMC %s response '%s'" %
+                         (operation, url))
+
+            except Exception as ex:
+                elog("Failed to parse BMC %s response '%s' (%s)" %
+                     (operation, url, ex))
+
+            elog("Response:\n%s\n" % self.response)
+        else:
+            elog("No response from %s:%s" % (operation, url))
+        return False
+
+    async def _retry_wait(self, operation, url, attempt, response, error):
+        """
+        Wait before retrying a failed request if the retry policy says
+        it is retried.
+
+        :param operation: the http method
+        :type operation: str
+        :param url: the request path
+        :type url: str
+        :param attempt: the attempt that failed ; 1 for the first
+        :type attempt: int
+        :param response: the failed response ; None if there wasn't one
+        :param error: the exception raised ; None if there wasn't one
+        :type error: Exception
+        :returns True if the request is to be retried
+        """
+
+        delay = retry_policy.delay(operation, attempt,
+                                   sum(self.retries.values()),
+                                   response, error)
+        if delay is None:
+            return False
+        if response is not None:
+            reason = "HTTP %d" % response.status
+        else:
+            reason = error.__class__.__name__
+        key = "%s %s" % (operation, reason)
+        self.retries[key] = self.retries.get(key, 0) + 1
+        dlog1("Retry       : %s %s ; %s ; attempt %d of %d in %.1fs" %
+              (operation, url, reason, attempt + 1,
+               retry_policy.attempts, delay))
+        await clock.sleep(delay)
+        return True
+
+    def resp_dict(self):
+        """
+        Create Response Dictionary
+        """
+
+        if self.response.read:
+            self.response_dict = None
+            try:
+                self.response_dict = self.response.dict
+                if self.response_dict is None:
+                    self.response_dict = json.loads(self.response.read)
+                return True
+            except Exception as ex:
+                elog("Got exception key valuing response ; (%s)" % ex)
+                elog("Response: " % self.response.read)
+        else:
+            elog("No response from last command")
+        return False
+
+    @property
+    def response_json(self):
+        """
+        Return the json formatted version of the last response ; only
+        made when a log prints it.
+        """
+
+        if self.response_dict is None:
+            return None
+        try:
+            return json.dumps(self.response_dict, indent=4, sort_keys=True)
+        except (TypeError, ValueError) as ex:
+            return "unformattable response (%s)" % ex
+
+    def get_key_value(self, key1, key2=None):
+        """
+        Get key1 value if no key2 is specified.
+        Get key2 value from key1 value if key2 is specified.
+
+        :param : key1 value is returned if no key2 is provided.
+        :type : str.
+        :param : key2 value is optional but if provided its value is returned
+        :type : str
+        :returns key1 value or key2 value if key2 is specified
+        """
+
+        value1 = self.response_dict.get(key1)
+        if key2 is None:
+            return value1
+        return value1.get(key2)
+
+    def check_ok_status(self, function, operation, seconds):
+        """
+        Status
+
+        :param function: description of operation
+        :type : str
+        :param operation: http GET, POST or PATCH
+        :type : str
+        :param seconds: the request's latency
+        :type : float
+        :returns True if response status is OK. Otherwise False.
+        """
+
+        # Accept applicable 400 series error from an Eject Request POST.
+        # This error is dealt with by the eject handler.
+        if self.response.status in [400, 403, 404] and \
+                function == self.vm_eject_url and \
+                operation == POST:
+            return True
+
+        if self.response.status not in [200, 202, 204]:
+            try:
+                elog("HTTP Status : %d ; %s %s failed after %.3f secs\n%s\n" %
+                     (self.response.status,
+                      operation, function, seconds,
+                      json.dumps(self.response.dict,
+                                 indent=4, sort_keys=True)))
+                return False
+            except Exception as ex:
+                elog("check status exception ; %s" % ex)
+
+        dlog2("HTTP Status : %s %s Ok (%d) (took %.3f seconds)" %
+              (operation, function, self.response.status, seconds))
+        return True
+
+    async def _exit(self, code):
+        """
+        End this target's execution but not before closing an open
+        Redfish client connection.
+
+        :param code: the exit code ; non-zero for a failure
+        :type code: int
+        :raises TargetError: the failed stage's error if code is non-zero
+        """
+
+        if self.branches:
+            # a stage of the stage graph failed ; its branch closes the
+            # session and stops the others. A sibling that fails while
+            # being stopped ; since CancelledError is an Exception before
+            # python 3.8 ; must only stop too.
+            task = current_task()
+            if task not in self.branches:
+                raise asyncio.CancelledError()
+            step = self.branches[task]
+            self.stage = (self.stage_graph[step][0] or [self.stage])[-1]
+            for other in self.branches:
+                if other is not task:
+                    other.cancel()
+            self.branches = {task: step}
+            self._overlap(step)
+        reason = log.last_error()
+        self._stop_events()
+        self._end_stage('failed' if code else 'ok')
+        if self.journal_entry is not None:
+            journal.finish(self, self.journal_entry,
+                           'failed' if code else 'done')
+            self.journal_entry = None
+        self.warm = False
+        self._cache_session()
+        if self.redfish_obj is not None and self.session is True:
+            try:
+                await self.redfish_obj.logout()
+                self.redfish_obj = None
+                self.session = False
+                dlog1("Session     : Closed")
+
+            except Exception as ex:
+                elog("Session close failed ; %s" % ex)
+                alog("Check BMC username and password in config file")
+        if self.redfish_obj is not None:
+            self.redfish_obj.close()
+
+        self.record_result('failed' if code else 'ok')
+
+        if code and self.discovery_cached is True:
+            # don't trust cached discovery info that led to a failure
+            discovery_cache.invalidate(self.bmc_identity)
+            dlog1("Disc Cache  : invalidated %s" % self.bmc_identity)
+
+        if code:
+            sys.stdout.write("\n-------------------------------------------\n")
+
+            # If exit with reason code then print that reason code and dump
+            # the redfish query data that was learned up to that point
+            elog("Code : %s" % code)
+
+            # Other info
+            ilog("IPv6      : %s" % self.ipv6)
+
+            # Root Query Info
+            ilog("BMC Identity: %s" % self.bmc_identity)
+
+            # Managers Info
+            ilog("Manager URL: %s" % self.managers_group_url)
+            ilog("Manager Members List: %s" % self.manager_members_list)
+
+            # Systems Info
+            ilog("Systems Group URL: %s" % self.systems_group_url)
+            ilog("Systems Member URL: %s" % self.systems_member_url)
+            ilog("Systems Members: %d" % self.systems_members)
+            ilog("Systems Members List: %s" % self.systems_members_list)
+
+            ilog("Power State: %s" % self.power_state)
+            ilog("Reset Actions: %s" % self.reset_action_dict)
+            ilog("Reset Command URL: %s" % self.reset_command_url)
+            ilog("Boot Control Dict: %s" % self.boot_control_dict)
+
+            ilog("VM Members Array: %s" % self.vm_members_array)
+            ilog("VM Group URL: %s" % self.vm_group_url)
+            ilog("VM Group: %s" % self.vm_group)
+            ilog("VM URL: %s" % self.vm_url)
+            ilog("VM Label: %s" % self.vm_label)
+            ilog("VM Version: %s" % self.vm_version)
+            ilog("VM Actions: %s" % self.vm_actions)
+            ilog("VM Media Types: %s" % self.vm_media_types)
+
+            ilog("Last Response raw: %s" % self.response)
+            ilog("Last Response json: %s" % self.response_json)
+
+            if self.transport_stats is not None:
+                ilog("Transport: %s" % self.transport_stats)
+            if self.retries:
+                ilog("Retries: %s" % self.retry_summary())
+
+            self.error = stage_error(self.label, self.stage, reason)
+            raise self.error
+
+    def _stage(self, stage):
+        """
+        Record and log the start of an execution stage.
+
+        :param stage: the execution stage description
+        :type stage: str
+        """
+
+        task = current_task()
+        if task in self.branches:
+            # a stage graph branch only ends its own previous stage
+            ran = self.stage_graph[self.branches[task]][0]
+            if ran:
+                self._end_stage('ok', ran[-1])
+            ran.append(stage)
+        else:
+            self._end_stage('ok')
+        self.stage = stage
+        self.stage_starts[stage] = clock.monotonic()
+        slog(stage)
+
+    def _end_stage(self, result, stage=None):
+        """
+        Record the latency of a running execution stage.
+
+        :param result: ok or failed
+        :type result: str
+        :param stage: the stage to end ; None ends the current stage
+                      with 'result' and any other running stage of the
+                      stage graph as cancelled
+        :type stage: str
+        """
+
+        if stage is None:
+            stages = [(self.stage, result)] + \
+                [(other, 'cancelled') for other in self.stage_starts
+                 if other != self.stage]
+        else:
+            stages = [(stage, result)]
+        for stage, result in stages:
+            start_time = self.stage_starts.pop(stage, None)
+            if start_time is None:
+                continue
+            seconds = clock.monotonic() - start_time
+            self.stage_timings.append((stage, result, seconds))
+            if timings is not None:
+                timings.stage(self, stage, result, seconds)
+            if self.journal_entry is not None and result == 'ok':
+                journal.stage_done(self, self.journal_entry, stage)
+
+    async def _run_stages(self, stages):
+        """
+        Run a dependency graph of stages ; each stage as soon as the
+        stages it depends on are done. Stages that don't depend on each
+        other run at the same time unless 'pipeline' is off.
+
+        Each stage runs in its own task. The first stage that fails
+        cancels the others before its _exit closes their session.
+
+        :param stages: (step, stage coroutine function, steps it depends
+                       on) of each stage to run ; dependencies first.
+                       Dependencies on steps that aren't in the list are
+                       already met.
+        :type stages: list
+        """
+
+        if pipeline is False or len(stages) < 2:
+            for _step, function, _dependencies in stages:
+                await function()
+            return
+
+        # the branches only end their own stages
+        self._end_stage('ok')
+        tasks = {}
+
+        async def branch(step, function, dependencies):
+            # not awaited directly ; stopping this branch would stop them
+            waits = [tasks[dependency] for dependency in dependencies
+                     if dependency in tasks]
+            if waits:
+                await asyncio.wait(waits)
+                if [task for task in waits
+                        if task.cancelled() or task.exception()]:
+                    # the failed stage's branch reports the failure
+                    return
+            await function()
+            node = self.stage_graph[step]
+            if node[0]:
+                self._end_stage('ok', node[0][-1])
+            node[2] = clock.monotonic()
+
+        self.stage_graph = {}
+        for step, function, dependencies in stages:
+            task = asyncio.ensure_future(branch(step, function, dependencies))
+            log.inherit(task)
+            self.branches[task] = step
+            self.stage_graph[step] = [[], dependencies, None]
+            tasks[step] = task
+        # not gather ; it would raise the CancelledError of a stopped
+        # branch rather than the failed stage's error
+        try:
+            await asyncio.wait(list(tasks.values()),
+                               return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            pending = [task for task in tasks.values() if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+            self.branches = {}
+        for task in tasks.values():
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        self._overlap(max(self.stage_graph,
+                          key=lambda step: self.stage_graph[step][2]))
+        self.stage_graph = {}
+
+    def _overlap(self, step):
+        """
+        Record the stages of the stage graph that overlapped the
+        critical path ; the path that ends with 'step' and runs back
+        through the dependency that finished last.
+
+        :param step: the step that failed or else finished last
+        :type step: str
+        """
+
+        graph = self.stage_graph
+        critical = [step]
+        while True:
+            done = [dependency for dependency in graph[step][1]
+                    if dependency in graph and graph[dependency][2]]
+            if not done:
+                break
+            step = max(done, key=lambda step: graph[step][2])
+            critical.append(step)
+        for step, (ran, _dependencies, end_time) in graph.items():
+            if end_time is not None and step not in critical:
+                self.overlapped_stages.extend(ran)
+
+    async def probe(self, method, timeout, attempts):
+        """
+        Check that this target's BMC is reachable. Retried up to
+        'attempts' times.
+
+        :param method: any, tcp or icmp
+        :type method: str
+        :param timeout: max seconds to wait for one attempt
+        :type timeout: float
+        :param attempts: max number of attempts
+        :type attempts: int
+        :returns True if reachable
+        """
+
+        self.start_time = clock.monotonic()
+        self._stage('Reachability Check')
+
+        address = self.ip
+        if self.ipv6 is True:
+            address = address[1:-1]
+        checks = []
+        if method in ['any', 'tcp']:
+            checks.append(tcp_probe(self.port, timeout))
+        if method in ['any', 'icmp']:
+            checks.append(icmp_probe(self.ipv6, timeout))
+
+        reasons = []
+        for attempt in range(1, attempts + 1):
+            attempt_start = time.monotonic()
+            # the first check that gets an answer wins
+            pending = [asyncio.ensure_future(check(address))
+                       for check in checks]
+            reasons = []
+            answer = None
+            while pending and answer is None:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    ok, reason = task.result()
+                    if ok is True:
+                        answer = reason
+                    else:
+                        reasons.append(reason)
+            for task in pending:
+                task.cancel()
+            if answer is not None:
+                self.probe_result = "%s in %.0f ms (attempt %d)" % \
+                    (answer,
+                     (time.monotonic() - attempt_start) * 1000,
+                     attempt)
+                self._end_stage('ok')
+                return True
+            dlog1("Reach Check : attempt %d of %d failed ; %s" %
+                  (attempt, attempts, ' ; '.join(reasons)))
+            if attempt < attempts:
+                # don't retry a fast failure right away
+                delay = PROBE_RETRY_SECS - (time.monotonic() - attempt_start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+        self.probe_result = ' ; '.join(reasons)
+        self.error = stage_error(self.label, self.stage, self.probe_result)
+        self.record_result('failed')
+        return False
+
+    def image_unavailable(self, check):
+        """
+        Fail this target because its install image can't be fetched.
+
+        :param check: the image's failed pre-flight check
+        :type check: image.ImageCheck
+        """
+
+        self.start_time = clock.monotonic()
+        self._stage('Image Pre-flight')
+        elog("Image %s can't be fetched ; %s" % (self.img, check.reason))
+        self.error = stage_error(self.label, self.stage, check.reason)
+        self.record_result('failed')
+
+    def record_result(self, result):
+        """
+        Record the outcome and latency of this target's execution.
+
+        :param result: ok or failed
+        :type result: str
+        """
+
+        self._end_stage(result)
+        self.critical_path = self.critical_seconds()
+        if timings is not None and self.start_time is not None:
+            timings.target(self, result, clock.monotonic() - self.start_time)
+            self.start_time = None
+            # added to the histograms ; not kept for the target's life
+            self.request_timings = []
+
+    async def _wait_slot(self, kind):
+        """
+        Wait for one of the wave scheduler's slots ; it is held until
+        the target's operation ends.
+
+        :param kind: session ; per bmc vendor, or mount ; per image host
+        :type kind: str
+        """
+
+        if scheduler is None:
+            return
+        if not self.branches:
+            # the wait isn't part of the stage before it
+            self._end_stage('ok')
+        seconds = await scheduler.acquire(self, kind)
+        if seconds >= 0.1:
+            ilog("Schedule    : waited %.1f seconds for a %s slot (%s)" %
+                 (seconds, kind, scheduler.slot_key(self, kind)))
+
+    def critical_seconds(self):
+        """
+        Return the seconds of the ended stages on the critical path ;
+        the stages that overlapped others or were cancelled don't add
+        to the install time.
+        """
+
+        return sum([seconds for stage, result, seconds in self.stage_timings
+                    if result != 'cancelled' and
+                    stage not in self.overlapped_stages])
+
+    def retry_summary(self):
+        """Return a summary of the request retries ; by reason"""
+
+        return "%d (%s)" % (sum(self.retries.values()),
+                            ", ".join(["%s x%d" % (key, count)
+                                       for key, count in
+                                       sorted(self.retries.items())]))
+
+    def _observe_request(self, method, path, status, nbytes, seconds):
+        """Transport observer ; record the latency of one http request"""
+
+        # only the timing recorder reads them
+        if timings is not None:
+            self.request_timings.append((method, path, status, nbytes,
+                                         seconds))
+            timings.request(self, method, path, status, nbytes, seconds)
+
+    ###########################################################################
+    #
+    #     P R I V A T E    S T A G E    M E M B E R    F U N C T I O N S
+    #
+    ###########################################################################
+
+    ###########################################################################
+    # Redfish Client Connect
+    ###########################################################################
+    async def _redfish_client_connect(self):
+        """
+        Connect to target Redfish service.
+        """
+
+        stage = 'Redfish Client Connection'
+        self._stage(stage)
+
+        if self.probe_result is not None:
+            ilog("BMC Reach Ok: %s" % self.probe_result)
+
+        # try to connect
+        connect_error = False
+        try:
+            # One time Redfish Transport Object Create
+            if replays is not None:
+                self.redfish_obj = ReplayTransport(
+                    replays.replaying(self.label), self.ip, self.un,
+                    self.pw, self.port, clock)
+            elif transport == 'redfish':
+                self.redfish_obj = LibraryRedfishTransport(self.ip,
+                                                           self.un,
+                                                           self.pw,
+                                                           self.port)
+            else:
+                self.redfish_obj = AsyncRedfishTransport(self.ip,
+                                                         self.un,
+                                                         self.pw,
+                                                         self.port)
+            self.transport_stats = self.redfish_obj.stats
+            self.redfish_obj.observer = self._observe_request
+            self.redfish_obj.renew = session_cache is not None
+            if recordings is not None:
+                self.redfish_obj.recorder = recordings.recording(self.label)
+            await self.redfish_obj.connect()
+        except Exception as ex:
+            connect_error = True
+            elog("Unable to establish %s to BMC at %s (%s)" %
+                 (stage, self.uri, ex))
+
+        if connect_error is True:
+            alog("Check BMC ip address is reachable and supports Redfish")
+            await self._exit(1)
+
+    ###########################################################################
+    # Redfish Root Query
+    ###########################################################################
+    async def _redfish_root_query(self):
+        """
+        Redfish Root Query
+        """
+
+        stage = 'Root Query'
+        self._stage(stage)
+
+        if await self.make_request(operation=GET, path=None) is False:
+            elog("Failed %s GET request")
+            await self._exit(1)
+
+        # learn the session service's sessions url needed to login
+        #
+        # "Links": { "Sessions":
+        #            { "@odata.id": "/redfish/v1/SessionService/Sessions" } },
+        links = self.get_key_value('Links')
+        if links and links.get('Sessions'):
+            self.sessions_url = links.get('Sessions').get('@odata.id')
+
+        # extract the systems get url needed to learn reset
+        # actions for the eventual reset.
+        #
+        # "Systems": { "@odata.id": "/redfish/v1/Systems/" },
+        #
+        # See Reset section below ; following iso insertion where
+        # systems_group_url is used.
+        self.systems_group_url = self.get_key_value('Systems', '@odata.id')
+
+        # Virtual Media support is located through the Managers link.
+        # Learn it now ; the get managers stage may not directly follow
+        # this root query.
+        #
+        # "Managers": { "@odata.id": "/redfish/v1/Managers/" },
+        self.managers_group_url = self.get_key_value('Managers', '@odata.id')
+
+        # BMCs that support the $expand and $select query parameters
+        # can return a collection and its members in one request, and
+        # just the polled properties of a resource.
+        #
+        # "ProtocolFeaturesSupported": {
+        #     "ExpandQuery": { "ExpandAll": true, "Levels": true,
+        #                      "Links": true, "NoLinks": true,
+        #                      "MaxLevels": 3 },
+        #     "SelectQuery": true },
+        features = self.get_key_value('ProtocolFeaturesSupported')
+        if isinstance(features, dict):
+            expand_query = features.get('ExpandQuery')
+            if isinstance(expand_query, dict):
+                # '.' expands subordinate resources but not Links
+                if expand_query.get('NoLinks') is True:
+                    self.expand_symbol = '.'
+                elif expand_query.get('ExpandAll') is True:
+                    self.expand_symbol = '*'
+                if expand_query.get('Levels') is True:
+                    self.expand_max_levels = expand_query.get('MaxLevels', 1)
+            self.select_supported = features.get('SelectQuery') is True
+        dlog2("Query Params: $expand=%s (max levels %d) $select=%s" %
+              (self.expand_symbol, self.expand_max_levels,
+               self.select_supported))
+
+        # BMCs that publish an Event Service may offer a Server Sent
+        # Event stream that posts state changes.
+        #
+        # "EventService": { "@odata.id": "/redfish/v1/EventService" },
+        event_service = self.get_key_value('EventService')
+        if event_service:
+            self.event_service_url = event_service.get('@odata.id')
+
+        # The BMC's vendor and model label its timing metrics.
+        #
+        # "Vendor": "Dell", "Product": "Integrated Dell Remote Access ..",
+        #
+        # Older BMCs don't publish a Vendor ; use their Oem section name.
+        self.vendor = self.get_key_value('Vendor')
+        if not self.vendor and isinstance(self.get_key_value('Oem'), dict):
+            oem = list(self.get_key_value('Oem').keys())
+            if oem:
+                self.vendor = oem[0]
+        self.model = self.get_key_value('Product')
+
+        # The BMC's identity ; keys its discovery cache entry so that
+        # a firmware update or board replacement is a cache miss.
+        self.bmc_identity = "%s|%s|%s|%s|%s" % \
+            (urlsplit(self.uri).netloc,
+             self.get_key_value('RedfishVersion'),
+             self.get_key_value('UUID'),
+             self.get_key_value('Vendor'),
+             self.get_key_value('Product'))
+        dlog2("BMC Identity: %s" % self.bmc_identity)
+
+    ###########################################################################
+    # Create Redfish Communication Session
+    ###########################################################################
+    async def _redfish_create_session(self):
+        """
+        Create Redfish Communication Session
+        """
+
+        stage = 'Create Communication Session'
+        self._stage(stage)
+
+        if session_cache is not None and \
+                await self._resume_cached_session() is True:
+            return
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await self.redfish_obj.login(self.sessions_url)
+                dlog1("Session     : Open")
+                self.session = True
+                return
+            except LoginFailed as ex:
+                failure, response, error = ex, ex.response, None
+            except Exception as ex:
+                failure, response, error = ex, None, ex
+            if await self._retry_wait(POST, self.sessions_url, attempt,
+                                      response, error) is False:
+                elog("Failed to Create session ; %s" % failure)
+                await self._exit(1)
+
+    def _session_cache_key(self):
+        """Return this BMC's session cache key ; its url and username"""
+
+        return "%s %s" % (self.uri, self.un)
+
+    async def _resume_cached_session(self):
+        """
+        Reuse this BMC's cached session if a GET of its session
+        resource shows it is still valid.
+
+        :returns True if the cached session is reused
+        """
+
+        key = self._session_cache_key()
+        entry = session_cache.lookup(key)
+        if entry is None:
+            return False
+
+        self.redfish_obj.resume_session(entry.get('token'),
+                                        entry.get('location'),
+                                        self.sessions_url)
+        status = None
+        renew = self.redfish_obj.renew
+        self.redfish_obj.renew = False
+        try:
+            if entry.get('location'):
+                response = await self.redfish_obj.request(
+                    GET, entry.get('location'), headers=GET_HEADERS)
+                status = response.status
+        except Exception as ex:
+            status = ex
+        finally:
+            self.redfish_obj.renew = renew
+        if status == 200:
+            ilog("Session     : reusing cached session")
+            self.session = True
+            return True
+
+        dlog1("Session     : cached session invalid (%s) ; creating one" %
+              status)
+        session_cache.invalidate(key)
+        self.redfish_obj.resume_session(None, None, self.sessions_url)
+        return False
+
+    def _cache_session(self):
+        """
+        Leave the open session for the next run to reuse ; it is put
+        in the session cache rather than logged out.
+        """
+
+        if session_cache is None or self.session is not True:
+            return
+        token, location = self.redfish_obj.session_token()
+        if token and location:
+            session_cache.store(self._session_cache_key(),
+                                {'token': token, 'location': location})
+            self.session = False
+            dlog1("Session     : cached")
+
+    ###########################################################################
+    # Redfish $expand and $select Queries
+    ###########################################################################
+    @staticmethod
+    def _expanded(resource):
+        """
+        Return True if a collection member or navigation link is an
+        $expand'ed resource rather than just an @odata.id link.
+        """
+
+        return isinstance(resource, dict) and \
+            any(not key.startswith('@odata.') for key in resource)
+
+    def _use_resource(self, resource):
+        """
+        Make an $expand'ed resource the last response's dictionary so
+        a stage can parse it as if it had been fetched by itself.
+
+        :param resource: the expanded resource
+        :type resource: dictionary
+        """
+
+        self.response_dict = resource
+        if log.debug >= 4:
+            dlog4("Expanded:\n%s\n" % self.response_json)
+
+    async def _get_expanded(self, path, levels):
+        """
+        GET a collection with its members $expand'ed.
+
+        Expansion is optional ; a BMC that fails the request has its
+        expansion disabled so discovery falls back to walking links.
+
+        :param path: the collection path
+        :type path: str.
+        :param levels: the number of levels to expand
+        :type levels: int
+        :returns the expanded collection dictionary ; None if unsupported
+        """
+
+        if self.expand_symbol is None:
+            return None
+
+        if self.expand_max_levels:
+            levels = min(levels, self.expand_max_levels)
+            query = "$expand=%s($levels=%d)" % (self.expand_symbol, levels)
+        else:
+            query = "$expand=%s" % self.expand_symbol
+
+        try:
+            response = await self.redfish_obj.request(
+                GET, path + '?' + query, headers=GET_HEADERS)
+            if response.status == 200 and \
+                    isinstance(response.dict, dict) and \
+                    isinstance(response.dict.get('Members'), list):
+                dlog2("Expanded    : %s?%s" % (path, query))
+                return response.dict
+            dlog1("Expand      : %s?%s failed (%s) ; disabled" %
+                  (path, query, response.status))
+        except Exception as ex:
+            dlog1("Expand      : %s?%s failed (%s) ; disabled" %
+                  (path, query, ex))
+        self.expand_symbol = None
+        return None
+
+    async def _get_properties(self, path, properties):
+        """
+        GET a resource ; only the listed properties if $select is
+        supported. Used while polling for state changes.
+
+        A BMC that fails the $select request has it disabled and the
+        whole resource is fetched with make_request instead.
+
+        :param path: the resource path
+        :type path: str.
+        :param properties: the property names needed
+        :type properties: list
+        :returns True if the request succeeded
+        """
+
+        if self.select_supported is True:
+            query = "$select=%s" % ','.join(properties)
+            try:
+                response = await self.redfish_obj.request(
+                    GET, path + '?' + query, headers=GET_HEADERS)
+                if response.status == 200 and \
+                        isinstance(response.dict, dict) and \
+                        all(name in response.dict for name in properties):
+                    self.response = response
+                    self.response_dict = response.dict
+                    return True
+                dlog1("Select      : %s?%s failed (%s) ; disabled" %
+                      (path, query, response.status))
+            except Exception as ex:
+                dlog1("Select      : %s?%s failed (%s) ; disabled" %
+                      (path, query, ex))
+            self.select_supported = False
+
+        return await self.make_request(operation=GET, path=path)
+
+    ###########################################################################
+    # Subscribe to BMC Events
+    ###########################################################################
+    async def _redfish_subscribe_events(self):
+        """
+        Open the BMC's Server Sent Event stream if it publishes one.
+
+        State change events wake the polling loops early. Waiting falls
+        back to adaptive polling alone if there is no stream.
+        """
+
+        if self.event_service_url is None or \
+                not isinstance(self.redfish_obj, AsyncRedfishTransport):
+            return
+
+        stage = 'Subscribe to Events'
+        self._stage(stage)
+
+        # Look for the stream uri in the Event Service
+        #
+        # "ServerSentEventUri": "/redfish/v1/EventService/SSE",
+        try:
+            response = await self.redfish_obj.request(
+                GET, self.event_service_url, headers=GET_HEADERS)
+            sse_uri = None
+            if response.status == 200 and response.dict:
+                sse_uri = response.dict.get('ServerSentEventUri')
+            if sse_uri is None:
+                dlog1("Events      : no Server Sent Event stream")
+                return
+            self.event_stream = \
+                await self.redfish_obj.open_event_stream(sse_uri)
+        except Exception as ex:
+            dlog1("Events      : unable to open event stream (%s)" % ex)
+            return
+
+        self.state_event = asyncio.Event()
+        self.event_listener = asyncio.ensure_future(self._event_listener())
+        log.inherit(self.event_listener)
+        ilog("Events      : listening on %s" % sse_uri)
+
+    async def _event_listener(self):
+        """Event stream listener task ; flags each event it receives"""
+
+        try:
+            while True:
+                data = await self.event_stream.next_event()
+                if data is None:
+                    dlog1("Events      : stream closed by BMC")
+                    break
+                dlog3("Event       : %s" % data)
+                self.state_event.set()
+        except (OSError, EOFError, ValueError) as ex:
+            # a read or framing error ; not the CancelledError of
+            # _stop_events, which is an Exception before python 3.8
+            dlog1("Events      : stream failed (%s)" % ex)
+
+    def _stop_events(self):
+        """Stop the event listener and close the event stream"""
+
+        if self.event_listener is not None:
+            self.event_listener.cancel()
+            self.event_listener = None
+        if self.event_stream is not None:
+            self.event_stream.close()
+            self.event_stream = None
+
+    async def _poll_wait(self, interval):
+        """
+        Wait before the next state poll.
+
+        :param interval: the max seconds to wait ; less if the BMC
+                         posts a state change event.
+        :type interval: float
+        """
+
+        if self.state_event is None:
+            await clock.sleep(interval)
+            return
+        try:
+            await asyncio.wait_for(self.state_event.wait(), interval)
+            dlog2("Events      : woken by state change event")
+        except asyncio.TimeoutError:
+            pass
+        self.state_event.clear()
+
+    async def _wait_task(self, deadline):
+        """
+        Wait for the task the last request started to complete if the
+        BMC accepted it with a 202 and a Task Monitor Location header.
+
+        :param deadline: clock.monotonic() value to stop waiting at
+        :type deadline: float
+        :returns True if a task monitor reported the task completed
+        """
+
+        if not self.response or self.response.status != 202:
+            return False
+        location = self.response.getheader('Location')
+        if not location:
+            return False
+        location = urlsplit(location).path
+
+        dlog1("Task Monitor: %s" % location)
+        backoff = AdaptiveBackoff(RETRY_DELAY_SECS)
+        while clock.monotonic() < deadline:
+            try:
+                response = await self.redfish_obj.request(
+                    GET, location, headers=GET_HEADERS)
+            except Exception as ex:
+                dlog1("Task Monitor: query failed (%s)" % ex)
+                return False
+
+            if response.status != 202:
+                if response.status in [200, 201, 204]:
+                    dlog1("Task Monitor: task complete")
+                    return True
+                elog("Task Monitor: task failed ; HTTP %d" % response.status)
+                return False
+
+            # still running ; honor the BMC's Retry-After hint
+            interval = backoff.next_interval()
+            try:
+                interval = min(float(response.getheader('Retry-After')),
+                               RETRY_DELAY_SECS)
+            except (TypeError, ValueError):
+                pass
+            await self._poll_wait(interval)
+        return False
+
+    def _record_wait(self, stage, start_time):
+        """
+        Record the measured time-to-state of a stage.
+
+        :param stage: the execution stage description
+        :type stage: str
+        :param start_time: clock.monotonic() value the wait started at
+        :type start_time: float
+        :returns the measured seconds
+        """
+
+        seconds = clock.monotonic() - start_time
+        self.wait_times[stage] = seconds
+        return seconds
+
+    ###########################################################################
+    # Reconcile Plan
+    ###########################################################################
+    async def _redfish_reconcile_plan(self):
+        """
+        Read the current Virtual Media, Boot and PowerState and plan
+        the install steps that are still needed to get the host to
+        boot the image.
+
+        The desired end state is the image inserted, a one time boot
+        override to CD and the host powered on.
+        """
+
+        stage = 'Reconcile Plan'
+        self._stage(stage)
+
+        # current virtual media state
+        if await self.make_request(operation=GET, path=self.vm_url) is False:
+            elog("Virtual media status query failed (%s)" % self.vm_url)
+            await self._exit(1)
+        inserted = self.get_key_value('Inserted')
+        inserted_image = self.get_key_value('Image')
+
+        # current power and boot override state ; from the first
+        # Systems member with a Boot and PowerState
+        candidates = [self.systems_member_url]
+        if self.systems_member_url is None:
+            candidates = [member.get('@odata.id')
+                          for member in self.systems_members_list
+                          if member and member.get('@odata.id')]
+        boot = None
+        for member_url in candidates:
+            expanded = self.systems_expanded.get(member_url)
+            if expanded is not None:
+                self._use_resource(expanded)
+            elif await self.make_request(operation=GET,
+                                         path=member_url) is False:
+                elog("Unable to get Systems Member from %s" % member_url)
+                await self._exit(1)
+            boot = self.get_key_value('Boot')
+            if boot and self.get_key_value('PowerState'):
+                self.power_state = self.get_key_value('PowerState')
+                break
+            boot = None
+        if boot is None:
+            elog("Unable to learn current Boot and Power State")
+            await self._exit(1)
+
+        # the boot override mode the boot override stage would set
+        modes = self.boot_override_modes
+        if self.boot_capabilities_known is False:
+            modes = boot.get('BootSourceOverrideMode@Redfish.AllowableValues')
+        wanted_mode = None
+        if modes:
+            for mode in ['UEFI', 'Legacy']:
+                if mode in modes:
+                    wanted_mode = mode
+                    break
+
+        media_done = inserted is True and inserted_image == self.img
+        boot_done = \
+            boot.get('BootSourceOverrideEnabled') == 'Once' and \
+            boot.get('BootSourceOverrideTarget') == 'Cd' and \
+            (wanted_mode is None or
+             boot.get('BootSourceOverrideMode') == wanted_mode)
+        powered_on = self.power_state == POWER_ON
+        resumed = self.resume_stages or []
+        if powered_on and media_done and \
+                'Set Next Boot Override to CD/DVD' in resumed:
+            # interrupted after the power on was requested ; the host
+            # booting consumed the one time boot override
+            boot_done = True
+        all_done = media_done and boot_done and powered_on
+
+        self.plan = {}
+        media_reason = "image %s already inserted" % inserted_image
+        if media_done:
+            self.plan['eject'] = (False, media_reason)
+        else:
+            self.plan['eject'] = (inserted is True, "no image inserted")
+        self.plan['insert'] = (not media_done, media_reason)
+        self.plan['boot'] = (not boot_done,
+                             "boot override already %s:%s:%s" %
+                             (boot.get('BootSourceOverrideEnabled'),
+                              boot.get('BootSourceOverrideTarget'),
+                              boot.get('BootSourceOverrideMode')))
+        if all_done:
+            reason = "host already powered on to boot the image"
+        elif not powered_on:
+            reason = "host already powered off"
+        else:
+            reason = ''
+        self.plan['poweroff'] = (not all_done and powered_on, reason)
+        self.plan['poweron'] = (not all_done, reason)
+
+        ilog("Current     : Inserted:%s Image:%s Power:%s Boot:%s:%s:%s" %
+             (inserted, inserted_image, self.power_state,
+              boot.get('BootSourceOverrideEnabled'),
+              boot.get('BootSourceOverrideTarget'),
+              boot.get('BootSourceOverrideMode')))
+        steps = [step for step in ['eject', 'poweroff', 'insert',
+                                   'boot', 'poweron']
+                 if self.plan[step][0] is True]
+        ilog("Plan        : %s" % (", ".join(steps) or "nothing to do"))
+
+    def _planned(self, step):
+        """
+        Return True if an install step needs to be performed ; always
+        True unless a reconcile plan says it is already done.
+
+        :param step: eject, poweroff, insert, boot or poweron
+        :type step: str
+        """
+
+        if self.plan is None or self.plan[step][0] is True:
+            return True
+        ilog("Reconcile   : skipping %s ; %s" % (step, self.plan[step][1]))
+        return False
+
+    ###########################################################################
+    # Load Cached Discovery Info
+    ###########################################################################
+    async def _redfish_load_cached_discovery(self):
+        """
+        Load this BMC's discovery info from the discovery cache.
+
+        The cached CD/DVD virtual media URL is validated with one GET
+        that also refreshes its actions. Any mismatch invalidates the
+        entry and falls back to full discovery.
+
+        :returns True if the discovery info was loaded from the cache
+        """
+
+        if discovery_cache is None or self.bmc_identity is None:
+            return False
+
+        entry = discovery_cache.lookup(self.bmc_identity)
+        if entry is None:
+            dlog1("Disc Cache  : miss")
+            return False
+
+        stage = 'Load Cached Discovery'
+        self._stage(stage)
+
+        # Validation GET ; not through make_request as a stale URL must
+        # fall back to discovery rather than fail the target.
+        vm_url = entry.get('vm_url')
+        response = None
+        try:
+            response = await self.redfish_obj.request(GET, vm_url,
+                                                      headers=GET_HEADERS)
+        except Exception as ex:
+            dlog1("Disc Cache  : validation GET %s failed (%s)" %
+                  (vm_url, ex))
+
+        vm_info = None
+        if response is not None and response.status == 200:
+            vm_info = response.dict
+        if not vm_info or \
+                str(vm_info.get('@odata.id')).rstrip('/') != \
+                str(vm_url).rstrip('/') or \
+                supported_device(vm_info.get('MediaTypes', [])) is False or \
+                not vm_info.get('Actions') or \
+                not entry.get('systems_member_url'):
+            ilog("Discovery cache entry is stale ; rediscovering")
+            discovery_cache.invalidate(self.bmc_identity)
+            return False
+
+        for member in DiscoveryCache.MEMBERS:
+            setattr(self, member, entry.get(member))
+
+        # refresh the actions from the validation GET
+        self.vm_actions = vm_info.get('Actions')
+        self.vm_media_types = vm_info.get('MediaTypes')
+
+        # Only the cached Systems member needs to be walked
+        self.systems_members_list = [{'@odata.id': self.systems_member_url}]
+        self.systems_members = 1
+        self.boot_capabilities_known = True
+        self.discovery_cached = True
+
+        ilog("Discovery loaded from cache (%s)" % self.vm_url)
+        return True
+
+    def _store_discovery(self):
+        """Store this BMC's discovery info in the discovery cache"""
+
+        if discovery_cache is None or self.bmc_identity is None:
+            return
+        entry = {}
+        for member in DiscoveryCache.MEMBERS:
+            entry[member] = getattr(self, member)
+        discovery_cache.store(self.bmc_identity, entry)
+
+    ###########################################################################
+    # Query Redfish Managers
+    ###########################################################################
+    async def _redfish_get_managers(self):
+        """
+        Query Redfish Managers
+        """
+
+        stage = 'Get Managers'
+        self._stage(stage)
+
+        # Virtual Media support is located through the
+        # Managers link of the root query response.
+        #
+        # The root query stage learned that Managers URL Link from the
+        # Root Query Result:
+        #
+        # Expecting something like this ...
+        #
+        # {
+        #    ...
+        #    "Managers":
+        #    {
+        #        "@odata.id": "/redfish/v1/Managers/"
+        #    },
+        #    ...
+        # }
+        if self.managers_group_url is None:
+            elog("Failed to learn BMC RedFish Managers link")
+            await self._exit(1)
+
+        # Managers Query (/redfish/v1/Managers/) ; with its members and
+        # their Virtual Media expanded if the BMC supports $expand.
+        managers = await self._get_expanded(self.managers_group_url,
+                                            MANAGERS_EXPAND_LEVELS)
+        if managers is not None:
+            self._use_resource(managers)
+        elif await self.make_request(operation=GET,
+                                     path=self.managers_group_url) is False:
+            elog("Failed GET Managers from %s" % self.managers_group_url)
+            await self._exit(1)
+
+        # Look for the Managers 'Members' URL Link list from the Managers Query
+        #
+        # Expect something like this ...
+        #
+        # {
+        #    ...
+        #    "Members":
+        #    [
+        #         { "@odata.id": "/redfish/v1/Managers/1/" }
+        #    ],
+        #   ...
+        # }
+        # Support multiple Managers in the list
+
+        self.manager_members_list = self.get_key_value('Members')
+
+    ######################################################################
+    # Get Systems Members
+    ######################################################################
+    async def _redfish_get_systems_members(self):
+        """
+        Get Systems Members
+        """
+
+        stage = 'Get Systems'
+        self._stage(stage)
+
+        # Query Systems Group URL for list of Systems Members ; with the
+        # members expanded if the BMC supports $expand.
+        systems = await self._get_expanded(self.systems_group_url, 1)
+        if systems is not None:
+            self._use_resource(systems)
+        elif await self.make_request(operation=GET,
+                                     path=self.systems_group_url) is False:
+            elog("Unable to %s Members from %s" %
+                 (stage, self.systems_group_url))
+            await self._exit(1)
+
+        members_list = self.get_key_value('Members')
+        if members_list is None:
+            elog("Systems Members URL GET Response\n%s" % self.response_json)
+            await self._exit(1)
+
+        # Keep expanded members aside ; the power and boot override
+        # stages use them instead of fetching each member again.
+        self.systems_members_list = []
+        self.systems_expanded = {}
+        for member in members_list:
+            if self._expanded(member):
+                self.systems_expanded[member.get('@odata.id')] = member
+                member = {'@odata.id': member.get('@odata.id')}
+            self.systems_members_list.append(member)
+        dlog3("Systems Members List: %s" % self.systems_members_list)
+
+        self.systems_members = len(self.systems_members_list)
+        if self.systems_members == 0:
+            elog("BMC not publishing any System Members:\n%s" %
+                 self.response_json)
+            await self._exit(1)
+
+    ######################################################################
+    # Power On or Off Host
+    ######################################################################
+    async def _redfish_powerctl_host(self, state):
+        """
+        Power On or Off the Host
+        """
+        stage = 'Power ' + state + ' Host'
+        self._stage(stage)
+
+        if self.power_state == state:
+            # already in required state
+            return
+
+        # Walk the Systems Members list looking for Action support.
+        #
+        #  "Members": [ { "@odata.id": "/redfish/v1/Systems/1/" } ],
+        #
+        # Loop over Systems Members List looking for Reset Actions Dictionary
+        info = 'Redfish Systems Actions Member'
+        self.systems_member_url = None
+        for member in range(self.systems_members):
+            systems_member = self.systems_members_list[member]
+            if systems_member:
+                self.systems_member_url = systems_member.get('@odata.id')
+            if self.systems_member_url is None:
+                elog("Unable to get %s URL:\n%s\n" %
+                     (info, self.response_json))
+                await self._exit(1)
+
+            # An expanded member's PowerState is only current before
+            # the first power command.
+            expanded = self.systems_expanded.get(self.systems_member_url)
+            if expanded is not None and self.power_state is None:
+                self._use_resource(expanded)
+            elif await self.make_request(
+                    operation=GET, path=self.systems_member_url) is False:
+                elog("Unable to get %s from %s" %
+                     (info, self.systems_member_url))
+                await self._exit(1)
+
+            # Look for Reset Actions Dictionary
+            self.reset_action_dict = \
+                self.get_key_value('Actions', '#ComputerSystem.Reset')
+            if self.reset_action_dict is None:
+                # try other URL
+                self.systems_member_url = None
+                continue
+            else:
+                # Got the Reset Actions Dictionary
+
+                # get powerState
+                self.power_state = self.get_key_value('PowerState')
+
+                # Ensure we don't issue current state command
+                if state in [POWER_OFF, POWER_ON]:
+                    # This is a Power ON or Off command
+                    if self.power_state == state:
+                        dlog2("Power already %s" % state)
+                        # ... AND we are already in that state then
+                        # we are done. Issuing a power command while
+                        # in the same state will error out.
+                        # So don't do it.
+                        return
+                break
+
+        info = 'Systems Reset Action Dictionary'
+        if self.reset_action_dict is None:
+            elog("BMC not publishing %s:\n%s\n" %
+                 (info, self.response_json))
+            await self._exit(1)
+
+        ##############################################################
+        # Reset Actions Dictionary. This is what we are looking for  #
+        ##############################################################
+        #
+        # Look for Reset Actions label
+        #
+        # "Actions":
+        # {
+        #   "#ComputerSystem.Reset":
+        #   {
+        #     "ResetType@Redfish.AllowableValues": [
+        #       "On",
+        #       "ForceOff",
+        #       "ForceRestart",
+        #       "Nmi",
+        #       "PushPowerButton"
+        #     ],
+        #     "target":"/redfish/v1/Systems/1/Actions/ComputerSystem.Reset/"
+        #   }
+        # }
+        #
+        # Need to get 2 pieces of information out of the Actions output
+        #
+        #  1. the Redfish Systems Reset Action Target
+        #  2. the Redfish Systems Reset Action List
+        #
+        ###############################################################
+
+        info = 'Systems Reset Action Target'
+        self.reset_command_url = self.reset_action_dict.get('target')
+        if self.reset_command_url is None:
+            elog("Unable to get Reset Command URL (members:%d)\n%s" %
+                 (self.systems_members, self.reset_action_dict))
+            await self._exit(1)
+
+        # With the reset target url in hand, all that is needed now
+        # is the reset command this target supports
+        #
+        # The reset command list looks like this.
+        #
+        #        "ResetType@Redfish.AllowableValues": [
+        #            "On",
+        #            "ForceOff",
+        #            "ForceRestart",
+        #            "Nmi",
+        #            "PushPowerButton"
+        #        ],
+        #
+        # Some targets support GracefulRestart and/or ForceRestart
+
+        info = 'Allowable Reset Actions'
+        reset_command_list = \
+            self.reset_action_dict.get('ResetType@Redfish.AllowableValues')
+        if reset_command_list is None:
+            elog("BMC is not publishing any %s" % info)
+            await self._exit(1)
+
+        dlog3("ResetActions: %s" % reset_command_list)
+
+        # load the appropriate acceptable command list
+        if state == POWER_OFF:
+            acceptable_commands = ['ForceOff', 'GracefulShutdown']
+        elif state == POWER_ON:
+            acceptable_commands = ['ForceOn', 'On']
+        else:
+            acceptable_commands = ['ForceRestart', 'GracefulRestart']
+
+        # Look for the best command for the power state requested.
+        command = None
+        for acceptable_command in acceptable_commands:
+            for reset_command in reset_command_list:
+                if reset_command == acceptable_command:
+                    command = reset_command
+                    break
+            else:
+                continue
+            break
+
+        if command is None:
+            elog("Failed to find acceptable Power %s command in:\n%s" %
+                 (state, reset_command_list))
+            await self._exit(1)
+
+        # All that is left to do is POST the reset command
+        # to the reset_command_url.
+        payload = {'ResetType': command}
+        start_time = clock.monotonic()
+        if await self.make_request(operation=POST,
+                                   payload=payload,
+                                   path=self.reset_command_url) is False:
+            elog("Failed to Power %s Host" % state)
+            await self._exit(1)
+
+        if state not in [POWER_OFF, POWER_ON]:
+            # no need to refresh power state if
+            # this was not a power command
+            return
+
+        # wait for the requested power state.
+        deadline = start_time + POWER_TIMEOUT_SECS
+        await self._wait_task(deadline)
+        backoff = AdaptiveBackoff(POWER_POLL_MAX_SECS)
+        poll_count = 0
+        while clock.monotonic() < deadline and self.power_state != state:
+            await self._poll_wait(backoff.next_interval())
+            poll_count = poll_count + 1
+
+            # get systems info
+            if await self._get_properties(self.systems_member_url,
+                                          ['PowerState']) is False:
+                elog("Failed to Get System State (poll %i)" % poll_count)
+            else:
+                # get powerState
+                self.power_state = self.get_key_value('PowerState')
+                if self.power_state != state:
+                    dlog1("waiting for power %s (%s) (%d)" %
+                          (state, self.power_state, poll_count))
+        if self.power_state != state:
+            elog("Failed to Set System Power State to %s (%s)" %
+                 (self.power_state, self.systems_member_url))
+            await self._exit(1)
+        else:
+            ilog("%s verified (took %.1f seconds ; %d polls)" %
+                 (stage, self._record_wait(stage, start_time), poll_count))
+
+    ######################################################################
+    # Get CD/DVD Virtual Media URL
+    ######################################################################
+    async def _redfish_get_vm_url(self):
+        """
+        Get CD/DVD Virtual Media URL from one of the Manager Members list
+        """
+
+        stage = 'Get CD/DVD Virtual Media'
+        self._stage(stage)
+
+        if self.manager_members_list is None:
+            elog("Unable to index Managers Members from %s" %
+                 self.managers_group_url)
+            await self._exit(1)
+
+        members = len(self.manager_members_list)
+        if members == 0:
+            elog("BMC is not publishing any redfish Manager Members")
+            await self._exit(1)
+
+        # Issue a Get from each 'Manager Member URL Link looking
+        # for supported virtual devices.
+        for member in range(members):
+            member_url = None
+            this_member = self.manager_members_list[member]
+            if this_member:
+                member_url = this_member.get('@odata.id')
+            if member_url is None:
+                continue
+            if self._expanded(this_member):
+                self._use_resource(this_member)
+            elif await self.make_request(operation=GET,
+                                         path=member_url) is False:
+                elog("Unable to get Manager Member from %s" % member_url)
+                await self._exit(1)
+
+            ########################################################
+            #                Query Virtual Media                   #
+            ########################################################
+            # Look for Virtual Media Support by this Manager Member
+            #
+            # Expect something like this ...
+            #
+            # {
+            #    ...
+            #    "VirtualMedia":
+            #    {
+            #        "@odata.id": "/redfish/v1/Managers/1/VirtualMedia/"
+            #    }
+            #    ...
+            # }
+            self.vm_group_url = None
+            self.vm_group = self.get_key_value('VirtualMedia')
+            if self.vm_group is None:
+                if (member + 1) == members:
+                    elog("Virtual Media not supported by target BMC")
+                    await self._exit(1)
+                else:
+                    dlog3("Virtual Media not supported by member %d" % member)
+                    continue
+            else:
+                try:
+                    self.vm_group_url = self.vm_group.get('@odata.id')
+                except Exception:
+                    elog("Unable to get Virtual Media Group from %s" %
+                         self.vm_group_url)
+                    await self._exit(1)
+
+            # Query this member's Virtual Media Service Group ; unless it
+            # was already expanded with its manager. Expand its members.
+            if self._expanded(self.vm_group):
+                self._use_resource(self.vm_group)
+            else:
+                vm_group = await self._get_expanded(self.vm_group_url, 1)
+                if vm_group is not None:
+                    self._use_resource(vm_group)
+                elif await self.make_request(
+                        operation=GET, path=self.vm_group_url) is False:
+                    elog("Failed to GET Virtual Media Service group "
+                         "from %s" % self.vm_group_url)
+                    continue
+
+            # Look for Virtual Media Device URL Links
+            #
+            # Expect something like this ...
+            #
+            # {
+            #   ...
+            #   "Members":
+            #   [
+            #       { "@odata.id": "/redfish/v1/Managers/1/VirtualMedia/1/" },
+            #       { "@odata.id": "/redfish/v1/Managers/1/VirtualMedia/2/" }
+            #   ],
+            #    ...
+            # }
+            self.vm_members_array = []
+            try:
+                self.vm_members_array = self.get_key_value('Members')
+                vm_members = len(self.vm_members_array)
+            except Exception:
+                vm_members = 0
+
+            if vm_members == 0:
+                elog("No Virtual Media members found at %s" %
+                     self.vm_group_url)
+                await self._exit(1)
+
+            # Loop over each member's URL looking for the CD or DVD device
+            # Consider trying the USB device as well if BMC supports that.
+            for vm_member in range(vm_members):
+
+                # Look for Virtual Media Device URL
+                this_member = self.vm_members_array[vm_member]
+                if this_member:
+                    self.vm_url = this_member.get('@odata.id')
+
+                if self._expanded(this_member):
+                    self._use_resource(this_member)
+                elif await self.make_request(operation=GET,
+                                             path=self.vm_url) is False:
+                    elog("Failed to GET Virtual Media Service group from %s" %
+                         self.vm_group_url)
+                    continue
+
+                # Query Virtual Media Device Type looking for supported device
+                self.vm_media_types = self.get_key_value('MediaTypes')
+                if self.vm_media_types is None:
+                    dlog3("No Virtual MediaTypes found at %s ; "
+                          "trying other members" % self.vm_url)
+                    break
+
+                if log.debug >= 4:
+                    dlog4("Virtual Media Service:\n%s" %
+                          self.response_json)
+
+                if supported_device(self.vm_media_types) is True:
+                    dlog3("Supported Virtual Media found at %s ; %s" %
+                          (self.vm_url, self.vm_media_types))
+                    break
+                else:
+                    dlog3("Virtual Media %s does not support CD/DVD ; "
+                          "trying other members" % self.vm_url)
+                    self.vm_url = None
+
+            if self.vm_url is None:
+                elog("Failed to find CD or DVD Virtual media type")
+                await self._exit(1)
+
+    ######################################################################
+    # Load Selected Virtual Media Version and Actions
+    ######################################################################
+    async def _redfish_load_vm_actions(self):
+        """
+        Load Selected Virtual Media Version and Actions
+        """
+
+        stage = 'Load Selected Virtual Media Version and Actions'
+        self._stage(stage)
+
+        if self.vm_url is None:
+            elog("Failed to find CD or DVD Virtual media type")
+            await self._exit(1)
+
+        # Extract Virtual Media Version and Insert/Eject Actions
+        #
+        # Looks something like this. First half of odata.type is the VM label
+        #
+        # {
+        #   ...
+        #   "@odata.type": "#VirtualMedia.v1_2_0.VirtualMedia",
+        #   "Actions": {
+        #   "#VirtualMedia.EjectMedia":
+        #   {
+        #     "target" :
+        #     ".../Managers/1/VirtualMedia/2/Actions/VirtualMedia.EjectMedia/"
+        #   },
+        #   "#VirtualMedia.InsertMedia":
+        #   {
+        #     "target":
+        #     ".../Managers/1/VirtualMedia/2/Actions/VirtualMedia.InsertMedia/"
+        #   }
+        #   ...
+        # },
+        vm_data_type = self.get_key_value('@odata.type')
+        if vm_data_type:
+            self.vm_label = vm_data_type.split('.')[0]
+            self.vm_version = vm_data_type.split('.')[1]
+            self.vm_actions = self.get_key_value('Actions')
+        dlog1("VM Version  : %s" % self.vm_version)
+        dlog1("VM Label    : %s" % self.vm_label)
+        dlog3("VM Actions  :\n%s\n" % self.vm_actions)
+
+    ######################################################################
+    # Power Off Host
+    ######################################################################
+    async def _redfish_poweroff_host(self):
+        """
+        Power Off the Host
+        """
+
+        await self._redfish_powerctl_host(POWER_OFF)
+
+    ######################################################################
+    # Eject Current Image
+    ######################################################################
+    async def _redfish_eject_image(self):
+        """
+        Eject Current Image
+        """
+
+        stage = 'Eject Current Image'
+        self._stage(stage)
+
+        if await self.make_request(operation=GET, path=self.vm_url) is False:
+            elog("Virtual media status query failed (%s)" % self.vm_url)
+            await self._exit(1)
+
+        if self.get_key_value('Inserted') is False:
+            return
+
+        # Ensure there is no image inserted and handle the case where
+        # one might be in the process of loading.
+        MAX_EJECT_RETRY_COUNT = 10
+        eject_retry_count = 0
+        ejecting = True
+        start_time = clock.monotonic()
+        deadline = start_time + MEDIA_TIMEOUT_SECS
+        eject_media_label = '#VirtualMedia.EjectMedia'
+        while eject_retry_count < MAX_EJECT_RETRY_COUNT and ejecting:
+            eject_retry_count = eject_retry_count + 1
+            vm_eject = self.vm_actions.get(eject_media_label)
+            if not vm_eject:
+                elog("Failed to get eject target (%s)" % eject_media_label)
+                await self._exit(1)
+
+            self.vm_eject_url = vm_eject.get('target')
+            if self.vm_eject_url:
+                if self.get_key_value('Image'):
+                    ilog("Eject Request Image %s" %
+                         (self.get_key_value('Image')))
+                else:
+                    dlog1("Eject Request")
+
+                eject_time = clock.monotonic()
+                if await self.make_request(operation=POST,
+                                           payload={},
+                                           path=self.vm_eject_url) is False:
+                    elog("Eject request failed (%s)" % self.vm_eject_url)
+                    # accept this and continue to poll
+                else:
+                    await self._wait_task(deadline)
+
+                backoff = AdaptiveBackoff(RETRY_DELAY_SECS)
+                while clock.monotonic() < deadline and ejecting:
+                    # verify the image is not in inserted
+                    await self._poll_wait(backoff.next_interval())
+                    if await self._get_properties(
+                            self.vm_url, ['Inserted', 'Image']) is True:
+                        if self.get_key_value('Inserted') is False:
+                            ilog("Ejected (took %.1f seconds)" %
+                                 self._record_wait(stage, start_time))
+                            ejecting = False
+                        elif self.get_key_value('Image') and \
+                                clock.monotonic() - eject_time >= \
+                                DELAY_2_SECS:
+                            # if image is still present after the BMC had
+                            # time to act on the eject then its ready to
+                            # retry the eject, break out of poll loop
+                            dlog1("Image Present  ; %s" %
+                                  self.get_key_value('Image'))
+                            break
+                        else:
+                            dlog1("Eject Wait     ; Image: %s" %
+                                  self.get_key_value('Image'))
+                    else:
+                        elog("Failed to query vm state (%s)" % self.vm_url)
+                        await self._exit(1)
+
+                if clock.monotonic() >= deadline:
+                    break
+
+        if ejecting is True:
+            elog("%s wait timeout" % stage)
+            await self._exit(1)
+
+    ######################################################################
+    # Insert Image into Virtual Media CD/DVD
+    ######################################################################
+    async def _redfish_insert_image(self):
+        """
+        Insert Image into Virtual Media CD/DVD
+        """
+
+        await self._wait_slot('mount')
+        stage = 'Insert Image into Virtual Media CD/DVD'
+        self._stage(stage)
+
+        vm_insert_url = None
+        vm_insert_act = self.vm_actions.get('#VirtualMedia.InsertMedia')
+        if vm_insert_act:
+            vm_insert_url = vm_insert_act.get('target')
+
+        if vm_insert_url is None:
+            elog("Unable to get Virtual Media Insertion URL\n%s\n" %
+                 self.response_json)
+            await self._exit(1)
+
+        payload = {'Image': self.img,
+                   'Inserted': True,
+                   'WriteProtected': True}
+        start_time = clock.monotonic()
+        deadline = start_time + MEDIA_TIMEOUT_SECS
+        if await self.make_request(operation=POST,
+                                   payload=payload,
+                                   path=vm_insert_url) is False:
+            elog("Failed to Insert Media")
+            await self._exit(1)
+        await self._wait_task(deadline)
+
+        # Handle case where the BMC loads the iso image during the insertion.
+        # In that case the 'Inserted' is True but the Image is not immediately
+        # mounted.
+        poll_count = 0
+        backoff = AdaptiveBackoff(RETRY_DELAY_SECS)
+        ImageInserting = True
+        while ImageInserting:
+            if await self._get_properties(self.vm_url,
+                                          ['Inserted', 'Image']) is False:
+                elog("Unable to verify Image insertion (%s)" % self.vm_url)
+                await self._exit(1)
+
+            if self.get_key_value('Image') == self.img:
+                ImageInserting = False
+            elif clock.monotonic() >= deadline:
+                break
+            else:
+                await self._poll_wait(backoff.next_interval())
+                poll_count = poll_count + 1
+                dlog1("Image Insertion Wait ; %5.1f secs (poll %3d)" %
+                      (clock.monotonic() - start_time, poll_count))
+
+        if ImageInserting is True:
+            elog("Image insertion timeout")
+            await self._exit(1)
+        else:
+            ilog("%s verified (took %.1f seconds ; %d polls)" %
+                 (stage, self._record_wait(stage, start_time), poll_count))
+
+        if self.get_key_value('Image') != self.img:
+            elog("Insertion verification failed.")
+            ilog("Expected Image: %s" % self.img)
+            ilog("Detected Image: %s" % self.get_key_value('Image'))
+            await self._exit(1)
+
+        # Verify Insertion
+        #
+        # Looking for the following values
+        #
+        dlog3("Image URI   : %s" % self.get_key_value('Image'))
+        dlog3("ImageName   : %s" % self.get_key_value('ImageName'))
+        dlog3("Inserted    : %s" % self.get_key_value('Inserted'))
+        dlog3("Protected   : %s" % self.get_key_value('WriteProtected'))
+
+    ######################################################################
+    # Get Boot Override Capabilities
+    ######################################################################
+    async def _redfish_get_boot_capabilities(self):
+        """
+        Get the Systems Member Boot Override Capabilities
+        """
+
+        if self.boot_capabilities_known is True:
+            # The boot override modes came from the discovery cache or
+            # an earlier operation and the systems member url is
+            # already known ; skip the walk.
+            return
+
+        stage = 'Get Boot Override Capabilities'
+        self._stage(stage)
+
+        # Walk the Systems Members list looking for Boot support.
+        #
+        #  "Members": [ { "@odata.id": "/redfish/v1/Systems/1/" } ],
+        #
+        # Loop over Systems Members List looking for Boot Dictionary
+        info = 'Systems Boot Member'
+        for member in range(self.systems_members):
+
+            self.systems_member_url = None
+            systems_member = self.systems_members_list[member]
+            if systems_member:
+                self.systems_member_url = systems_member.get('@odata.id')
+            if self.systems_member_url is None:
+                elog("Unable to get %s from %s" %
+                     (info, self.systems_members_list))
+                await self._exit(1)
+
+            # An expanded member's boot capabilities are still current
+            expanded = self.systems_expanded.get(self.systems_member_url)
+            if expanded is not None:
+                self._use_resource(expanded)
+            elif await self.make_request(
+                    operation=GET, path=self.systems_member_url) is False:
+                elog("Unable to get %s from %s" %
+                     (info, self.systems_member_url))
+                await self._exit(1)
+
+            # Look for Reset Actions Dictionary
+            self.boot_control_dict = self.get_key_value('Boot')
+            if self.boot_control_dict is None:
+                continue
+
+        if self.boot_control_dict is None:
+            elog("Unable to get %s from %s" % (info, self.systems_member_url))
+            await self._exit(1)
+
+        allowable_label = 'BootSourceOverrideMode@Redfish.AllowableValues'
+        self.boot_override_modes = self.get_key_value('Boot', allowable_label)
+        self.boot_capabilities_known = True
+
+    ######################################################################
+    # Set Next Boot Override to CD/DVD
+    ######################################################################
+    async def _redfish_set_boot_override(self):
+        """
+        Set Next Boot Override to CD/DVD
+        """
+
+        # a no-op once the install stage graph got them
+        await self._redfish_get_boot_capabilities()
+
+        stage = 'Set Next Boot Override to CD/DVD'
+        self._stage(stage)
+
+        if self.boot_control_dict is None:
+            elog("Unable to get Systems Boot Member from %s" %
+                 self.systems_member_url)
+            await self._exit(1)
+        else:
+            mode_list = self.boot_override_modes
+            if mode_list is None:
+                payload = {"Boot": {"BootSourceOverrideEnabled": "Once",
+                                    "BootSourceOverrideTarget": "Cd"}}
+            else:
+                dlog1("Boot Override Modes: %s" % mode_list)
+
+                # Prioritize UEFI over Legacy
+                if "UEFI" in mode_list:
+                    payload = {"Boot": {"BootSourceOverrideEnabled": "Once",
+                                        "BootSourceOverrideMode": "UEFI",
+                                        "BootSourceOverrideTarget": "Cd"}}
+                elif "Legacy" in mode_list:
+                    payload = {"Boot": {"BootSourceOverrideEnabled": "Once",
+                                        "BootSourceOverrideMode": "Legacy",
+                                        "BootSourceOverrideTarget": "Cd"}}
+                else:
+                    elog("BootSourceOverrideModes %s not supported" %
+                         mode_list)
+                    await self._exit(1)
+
+                dlog2("Boot Override Payload: %s" % payload)
+
+        if await self.make_request(operation=PATCH,
+                                   path=self.systems_member_url,
+                                   payload=payload) is False:
+            elog("Unable to Set Boot Override (%s)" % self.vm_url)
+            await self._exit(1)
+
+        if await self.make_request(operation=GET,
+                                   path=self.systems_member_url) is False:
+            elog("Unable to verify Set Boot Override (%s)" % self.vm_url)
+            await self._exit(1)
+        else:
+            enabled = self.get_key_value('Boot', 'BootSourceOverrideEnabled')
+            device = self.get_key_value('Boot', 'BootSourceOverrideTarget')
+            mode = self.get_key_value('Boot', 'BootSourceOverrideMode')
+            if enabled == "Once" and \
+                    supported_device(self.vm_media_types) is True:
+                ilog("%s verified [%s:%s:%s]" %
+                     (stage, enabled, device, mode))
+            else:
+                elog("Unable to verify Set Boot Override [%s:%s:%s]" %
+                     (enabled, device, mode))
+                await self._exit(1)
+
+    ######################################################################
+    # Power On Host
+    ######################################################################
+    async def _redfish_poweron_host(self):
+        """
+        Power On or Off the Host
+        """
+
+        await self._redfish_powerctl_host(POWER_ON)
+
+    async def _open(self):
+        """
+        Connect, create a session and discover the BMC's Redfish
+        resources ; or reuse those kept warm by a previous operation
+        if the session is still valid.
+        """
+
+        # per operation state
+        self.start_time = clock.monotonic()
+        self.stage_timings = []
+        self.request_timings = []
+        self.wait_times = {}
+        self.retries = {}
+        self.overlapped_stages = []
+        self.critical_path = None
+        self.plan = None
+        self.power_state = None
+        self.error = None
+        log.last_error()            # forget earlier operations' errors
+
+        if self.warm is True and await self._session_valid() is True:
+            await self._wait_slot('session')
+            ilog("Session     : reusing warm session")
+            # the expanded systems members hold the last operation's
+            # power and boot state
+            self.systems_expanded = {}
+            await self._redfish_subscribe_events()
+            return
+
+        self._drop_session()
+        await self._redfish_client_connect()
+        await self._redfish_root_query()
+        await self._wait_slot('session')
+        await self._redfish_create_session()
+        await self._redfish_subscribe_events()
+        if await self._redfish_load_cached_discovery() is False:
+            # the systems walk only needs the root query's systems url
+            await self._run_stages([
+                ('managers', self._redfish_get_managers, []),
+                ('systems', self._redfish_get_systems_members, []),
+                ('media', self._redfish_discover_media, ['managers'])])
+        self._compact_discovery()
+
+    async def _redfish_discover_media(self):
+        """Get the cd/dvd virtual media url and load its actions"""
+
+        # one branch ; the actions are read from the vm url's response
+        await self._redfish_get_vm_url()
+        await self._redfish_load_vm_actions()
+
+    def _compact_discovery(self):
+        """
+        Drop the discovery responses the later stages don't need.
+
+        $expand'ed Managers and VirtualMedia members are reduced to
+        their links and only the selected Systems member's expanded
+        resource is kept for the power and boot override stages.
+        """
+
+        def links(members):
+            if not isinstance(members, list):
+                return members
+            return [{'@odata.id': member.get('@odata.id')}
+                    if isinstance(member, dict) else member
+                    for member in members]
+
+        self.manager_members_list = links(self.manager_members_list)
+        self.vm_members_array = links(self.vm_members_array)
+        if isinstance(self.vm_group, dict):
+            self.vm_group = {'@odata.id': self.vm_group.get('@odata.id')}
+        if self.systems_member_url is not None:
+            expanded = self.systems_expanded.get(self.systems_member_url)
+            self.systems_expanded = {}
+            if expanded is not None:
+                self.systems_expanded[self.systems_member_url] = expanded
+
+    async def _session_valid(self):
+        """Return True if the warm session still gets authenticated"""
+
+        try:
+            response = await self.redfish_obj.request(
+                GET, self.vm_url, headers=GET_HEADERS)
+        except Exception as ex:
+            ilog("Session     : warm session check failed (%s) ; "
+                 "reconnecting" % ex)
+            return False
+        if response.status != 200:
+            ilog("Session     : warm session expired (%s) ; reconnecting" %
+                 response.status)
+            return False
+        return True
+
+    def _drop_session(self):
+        """Forget a warm session and close its transport"""
+
+        if self.redfish_obj is not None:
+            self.redfish_obj.close()
+            self.redfish_obj = None
+        self.session = False
+        self.warm = False
+
+    async def _close(self):
+        """
+        Finish a successful operation ; log out and close the
+        transport unless they are kept warm for the next operation.
+        """
+
+        # everything discovered worked ; remember it for next time
+        if self.discovery_cached is False:
+            self._store_discovery()
+
+        self._stop_events()
+        self._end_stage('ok')
+        if self.journal_entry is not None:
+            journal.finish(self, self.journal_entry, 'done')
+            self.journal_entry = None
+        if self.wait_times:
+            ilog("Wait Times  : %s" %
+                 " ; ".join(["%s %.1fs" % (stage, seconds)
+                             for stage, seconds in self.wait_times.items()]))
+        if self.retries:
+            ilog("Retries     : %s" % self.retry_summary())
+        if self.overlapped_stages:
+            ilog("Crit Path   : %.1f seconds ; overlapped %s" %
+                 (self.critical_seconds(),
+                  " ; ".join(self.overlapped_stages)))
+        ilog("Done")
+
+        if self.keep_session is True:
+            self.warm = True
+            dlog1("Session     : kept warm")
+        else:
+            self._cache_session()
+            if self.redfish_obj is not None and self.session is True:
+                await self.redfish_obj.logout()
+                self.session = False
+                dlog1("Session     : Closed")
+            if self.redfish_obj is not None:
+                self.redfish_obj.close()
+                self.redfish_obj = None
+            # nothing reads the responses of a finished operation
+            self.response = None
+            self.response_dict = None
+            self.systems_expanded = {}
+        if self.transport_stats is not None:
+            ilog("Transport   : %s" % self.transport_stats)
+        self.record_result('ok')
+
+    async def release(self):
+        """Log out of a warm session and close its transport"""
+
+        self._cache_session()
+        if self.redfish_obj is not None and self.session is True:
+            try:
+                await self.redfish_obj.logout()
+                dlog1("Session     : Closed")
+            except Exception as ex:
+                elog("Session close failed ; %s" % ex)
+        self._drop_session()
+
+    async def execute(self):
+        """The main controller function that executes the iso insertion
+        algorithm for the specified target object (self)"""
+
+        if journal is not None:
+            self.journal_entry = journal.start(self)
+        await self._open()
+        if reconcile or self.resume_stages is not None:
+            # a resumed install re-verifies the steps already done
+            await self._redfish_reconcile_plan()
+
+        # The install stage graph ; a stage starts once the planned
+        # stages it depends on are done. The host must be off before
+        # the image is inserted and the boot override is set ; and the
+        # boot override is only set once the image is inserted. So the
+        # eject overlaps the power off and the boot capabilities read
+        # overlaps the insert.
+        graph = [('eject', self._redfish_eject_image, []),
+                 ('poweroff', self._redfish_poweroff_host, []),
+                 ('insert', self._redfish_insert_image,
+                  ['eject', 'poweroff']),
+                 ('caps', self._redfish_get_boot_capabilities, ['poweroff']),
+                 ('boot', self._redfish_set_boot_override,
+                  ['insert', 'caps']),
+                 ('poweron', self._redfish_poweron_host, ['insert', 'boot'])]
+        planned = dict((step, self._planned(step)) for step in
+                       ['eject', 'poweroff', 'insert', 'boot', 'poweron'])
+        planned['caps'] = planned['boot']
+        await self._run_stages([stage for stage in graph
+                                if planned[stage[0]] is True])
+        await self._close()
+
+    async def eject(self):
+        """Eject the image inserted in the target's virtual media"""
+
+        await self._open()
+        await self._redfish_eject_image()
+        await self._close()
+
+    async def power(self, state):
+        """
+        Power the target's host on or off.
+
+        :param state: POWER_ON or POWER_OFF
+        :type state: str
+        """
+
+        await self._open()
+        await self._redfish_powerctl_host(state)
+        await self._close()
+
+    async def logout_cached(self):
+        """Log out of the target's cached session ; if it has one"""
+
+        key = self._session_cache_key()
+        entry = session_cache.lookup(key)
+        if entry is None:
+            ilog("Session     : none cached")
+            return
+
+        self.start_time = clock.monotonic()
+        await self._redfish_client_connect()
+        self._stage('Log Out Cached Session')
+        session_cache.invalidate(key)
+        self.redfish_obj.resume_session(entry.get('token'),
+                                        entry.get('location'))
+        try:
+            await self.redfish_obj.logout()
+            ilog("Session     : cached session logged out")
+        except Exception as ex:
+            elog("Session close failed ; %s" % ex)
+            await self._exit(1)
+        self._drop_session()
+        self.record_result('ok')
+
+
+def icmp_checksum(data):
+    """
+    Return the internet checksum of an icmp message.
+
+    :param data: the icmp message with a zero checksum field
+    :type data: bytes
+    """
+
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack('!%dH' % (len(data) // 2), data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def tcp_probe(port, timeout):
+    """
+    Return a tcp connect reachability check of a BMC's Redfish port.
+
+    :param port: the bmc's Redfish port
+    :type port: int
+    :param timeout: max seconds to wait for the connection
+    :type timeout: float
+    :returns a coroutine function of the bmc ip address or hostname
+             that returns (ok, description)
+    """
+
+    async def check(address):
+        try:
+            _reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(address, port), timeout)
+        except asyncio.TimeoutError:
+            return (False, "tcp port %d timeout" % port)
+        except (OSError, ValueError) as ex:
+            return (False, "tcp port %d %s" %
+                    (port, getattr(ex, 'strerror', None) or ex))
+        writer.close()
+        return (True, "tcp port %d" % port)
+
+    return check
+
+
+def icmp_probe(ipv6, timeout):
+    """
+    Return an icmp echo reachability check.
+
+    Uses an unprivileged icmp 'ping' socket when the ping socket group
+    permission allows it, else a raw socket. The check fails if
+    neither can be opened.
+
+    :param ipv6: True if the checked address is an IPv6 address
+    :type ipv6: bool
+    :param timeout: max seconds to wait for the echo reply
+    :type timeout: float
+    :returns a coroutine function of the bmc ip address that returns
+             (ok, description)
+    """
+
+    async def check(address):
+        if ipv6 is True:
+            family, proto = socket.AF_INET6, socket.IPPROTO_ICMPV6
+            request_type, reply_type = 128, 129
+        else:
+            family, proto = socket.AF_INET, socket.IPPROTO_ICMP
+            request_type, reply_type = 8, 0
+        sock = None
+        raw = False
+        for raw in [False, True]:
+            try:
+                sock = socket.socket(family,
+                                     socket.SOCK_RAW if raw
+                                     else socket.SOCK_DGRAM,
+                                     proto)
+                break
+            except OSError:
+                continue
+        if sock is None:
+            return (False, "icmp not permitted")
+
+        loop = asyncio.get_event_loop()
+        start_time = time.monotonic()
+        sequence = random.randint(0, 0xffff)
+        try:
+            sock.setblocking(False)
+            # only receive the replies from this address
+            sock.connect((address, 0))
+            # the kernel sets the identifier of ping socket requests
+            # and only passes them their own replies
+            message = struct.pack('!BBHHH', request_type, 0, 0,
+                                  ICMP_ECHO_ID, sequence) + b'rvmc'
+            if ipv6 is False:
+                message = message[:2] + \
+                    struct.pack('!H', icmp_checksum(message)) + message[4:]
+            sock.send(message)
+            while True:
+                remaining = timeout - (time.monotonic() - start_time)
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                reply = await asyncio.wait_for(loop.sock_recv(sock, 1024),
+                                               remaining)
+                if raw is True and ipv6 is False:
+                    # strip the ip header
+                    reply = reply[(reply[0] & 0x0f) * 4:]
+                if len(reply) < 8:
+                    continue
+                reply_id, reply_sequence = struct.unpack('!HH', reply[4:8])
+                if reply[0] == reply_type and \
+                        reply_sequence == sequence and \
+                        (raw is False or reply_id == ICMP_ECHO_ID):
+                    return (True, "icmp echo")
+        except asyncio.TimeoutError:
+            return (False, "icmp echo timeout")
+        except OSError as ex:
+            return (False, "icmp echo %s" % (ex.strerror or ex))
+        finally:
+            sock.close()
+
+    return check
+
+
+async def probe_target(targetObj, semaphore, method, timeout, attempts):
+    """
+    Reachability check task ; check one target with its log prefix set.
+
+    :param targetObj: the target object to check
+    :type targetObj: VmcObject
+    :param semaphore: limits the number of targets checked at once
+    :type semaphore: asyncio.Semaphore
+    :param method, timeout, attempts: see VmcObject.probe
+    :returns True if the target is reachable
+    """
+
+    async with semaphore:
+        log_prefixes[current_task()] = "[%s] " % targetObj.label
+        try:
+            return await targetObj.probe(method, timeout, max(attempts, 1))
+        finally:
+            del log_prefixes[current_task()]
+
+
+async def probe_targets(target_objects, method='any', timeout=2.0,
+                        attempts=3):
+    """
+    Check that the BMCs of all targets are reachable ; all at the same
+    time. Log a reachable/unreachable report.
+
+    :param target_objects: list of target objects to check
+    :type target_objects: list
+    :param method, timeout, attempts: see VmcObject.probe
+    :returns list of the reachable target objects
+    """
+
+    ilog("Checking %d targets are reachable" % len(target_objects))
+
+    start_time = time.time()
+    semaphore = asyncio.Semaphore(PROBE_CONCURRENCY)
+    results = await asyncio.gather(*[probe_target(targetObj, semaphore,
+                                                  method, timeout, attempts)
+                                     for targetObj in target_objects])
+    elapsed = time.time() - start_time
+
+    reachable = []
+    for targetObj, ok in zip(target_objects, results):
+        if ok is True:
+            reachable.append(targetObj)
+            dlog1("Reachable   : %s %s ; %s" %
+                  (targetObj.label, targetObj.ip, targetObj.probe_result))
+        else:
+            elog("Unreachable : %s %s ; %s" %
+                 (targetObj.label, targetObj.ip, targetObj.probe_result))
+    ilog("%d of %d targets reachable ; %d unreachable (took %.1f seconds)" %
+         (len(reachable), len(target_objects),
+          len(target_objects) - len(reachable), elapsed))
+    return reachable
+
+
+async def check_target_images(target_objects):
+    """
+    Check the install image of each target ; each unique image url
+    once. Fail the targets whose image can't be fetched.
+
+    :param target_objects: list of target objects to check
+    :type target_objects: list
+    :returns list of the target objects whose image passed the check
+    """
+
+    results = await image.check_images([targetObj.img
+                                        for targetObj in target_objects],
+                                       image_check, image_check_timeout)
+    ready = []
+    for targetObj in target_objects:
+        check = results[targetObj.img]
+        if check.ok is True:
+            ready.append(targetObj)
+            continue
+        log_prefixes[current_task()] = "[%s] " % targetObj.label
+        try:
+            targetObj.image_unavailable(check)
+        finally:
+            del log_prefixes[current_task()]
+    return ready
+
+
+async def run_target(targetObj, operation):
+    """
+    Run one target operation ; its failure is recorded in the target
+    object's error rather than raised so the other targets carry on.
+
+    :param targetObj: the target object the operation is for
+    :type targetObj: VmcObject
+    :param operation: the operation ; e.g. targetObj.execute()
+    :type operation: coroutine
+    :returns True if the operation succeeded
+    """
+
+    try:
+        await operation
+    except TargetError:
+        return False
+    except Exception as ex:
+        elog("Unexpected exception (%s)" % ex)
+        targetObj.error = TargetError(targetObj.label, targetObj.stage,
+                                      "unexpected exception (%s)" % ex)
+        targetObj.record_result('failed')
+        await targetObj.release()
+        return False
+    finally:
+        if scheduler is not None:
+            scheduler.release(targetObj)
+        if recordings is not None:
+            recordings.save(targetObj.label)
+    return True
+
+
+async def execute_target(targetObj, semaphore):
+    """
+    Parallel mode task ; execute the iso insertion algorithm for one
+    target object with its log prefix set and record the outcome.
+
+    :param targetObj: the target object to execute
+    :type targetObj: VmcObject
+    :param semaphore: limits the number of targets executing at once
+    :type semaphore: asyncio.Semaphore
+    :returns dictionary of target, address, result, exit code, seconds,
+             critical path seconds and the connections opened for the
+             requests sent
+    """
+
+    label = targetObj.label
+
+    async with semaphore:
+        log_prefixes[current_task()] = "[%s] " % label
+        start_time = time.time()
+        ilog("BMC IP Addr : %s" % targetObj.ip)
+        ilog("Host Image  : %s" % targetObj.img)
+        code = 0
+        if await run_target(targetObj, targetObj.execute()) is False:
+            code = 1
+        elapsed = time.time() - start_time
+        del log_prefixes[current_task()]
+
+    if code:
+        result = 'Failed: ' + str(targetObj.stage)
+    else:
+        result = 'Done'
+    stats = targetObj.transport_stats
+    if stats is None:
+        connections = '-'
+    else:
+        connections = "%d/%d" % (stats.connections, stats.requests)
+    critical = '-'
+    if targetObj.critical_path is not None:
+        critical = "%.1f" % targetObj.critical_path
+    return {'target': label,
+            'address': targetObj.ip,
+            'result': result,
+            'code': code,
+            'seconds': elapsed,
+            'critical': critical,
+            'connections': connections,
+            'retries': sum(targetObj.retries.values())}
+
+
+async def run_parallel(target_objects, workers):
+    """
+    Execute up to 'workers' target objects at the same time and
+    print a per target summary table once they have all finished.
+
+    :param target_objects: list of target objects to execute
+    :type target_objects: list
+    :param workers: max number of targets to execute at the same time
+    :type workers: int
+    :returns list of the target objects that failed
+    """
+
+    workers = min(workers, len(target_objects))
+    ilog("Installing %d targets ; %d at a time" %
+         (len(target_objects), workers))
+
+    start_time = time.time()
+    semaphore = asyncio.Semaphore(workers)
+    results = await asyncio.gather(*[execute_target(targetObj, semaphore)
+                                     for targetObj in target_objects])
+    elapsed = time.time() - start_time
+
+    failed = [result for result in results if result['code']]
+
+    # Summary Table
+    target_width = max([len('Target')] +
+                       [len(result['target']) for result in results])
+    address_width = max([len('BMC Address')] +
+                        [len(result['address']) for result in results])
+    row = "%%-%ds  %%-%ds  %%8s  %%8s  %%10s  %%7s  %%s" % \
+        (target_width, address_width)
+    sys.stdout.write("\n\n" +
+                     row % ('Target', 'BMC Address', 'Seconds', 'Critical',
+                            'Conns/Reqs', 'Retries', 'Result'))
+    sys.stdout.write("\n" +
+                     row % ('-' * target_width, '-' * address_width,
+                            '-' * 8, '-' * 8, '-' * 10, '-' * 7, '-' * 6))
+    for result in results:
+        sys.stdout.write("\n" + row % (result['target'],
+                                       result['address'],
+                                       "%d" % result['seconds'],
+                                       result['critical'],
+                                       result['connections'],
+                                       result['retries'],
+                                       result['result']))
+    sys.stdout.write("\n")
+    retries = sum([result['retries'] for result in results])
+    ilog("%d of %d targets done ; %d failed ; %d request retries "
+         "(took %i seconds)" %
+         (len(results) - len(failed), len(results), len(failed), retries,
+          elapsed))
+    return [targetObj for targetObj, result in zip(target_objects, results)
+            if result['code']]
+
+
+def shutdown():
+    """
+    Stop the install image server ; save the journal, the discovery
+    and session caches and metrics files
+    """
+
+    if iso_server is not None:
+        iso_server.stop()
+    if journal is not None:
+        journal.flush()
+    if discovery_cache is not None:
+        discovery_cache.save()
+    if session_cache is not None:
+        session_cache.save()
+    if timings is not None:
+        timings.save()
+    sys.stdout.write("\n\n")
+
+
+def rvmc_exit(code):
+    """Exit not tied to object ; early fault handling"""
+
+    shutdown()
+    sys.exit(code)
+
+
+def logout_cached(target_objects):
+    """
+    Log out of the cached sessions of the target objects ; all at the
+    same time.
+
+    :param target_objects: list of target objects
+    :type target_objects: list
+    :returns list of the target objects that failed
+    """
+
+    async def logout_target(targetObj):
+        log_prefixes[current_task()] = "[%s] " % targetObj.label
+        try:
+            return await run_target(targetObj, targetObj.logout_cached())
+        finally:
+            del log_prefixes[current_task()]
+
+    async def logout_all():
+        return await asyncio.gather(*[logout_target(targetObj)
+                                      for targetObj in target_objects])
+
+    event_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(event_loop)
+    try:
+        results = event_loop.run_until_complete(logout_all())
+    finally:
+        event_loop.close()
+    failed = [targetObj for targetObj, ok in zip(target_objects, results)
+              if ok is False]
+    report_failures(target_objects, failed)
+    return failed
+
+
+def report_failures(target_objects, failed):
+    """
+    Log the error of each failed target and how to retry them.
+
+    :param target_objects: list of the target objects installed
+    :type target_objects: list
+    :param failed: list of the target objects that failed
+    :type failed: list
+    """
+
+    if not failed:
+        ilog("All %d targets done" % len(target_objects))
+        return
+    elog("%d of %d targets failed" % (len(failed), len(target_objects)))
+    for targetObj in failed:
+        elog("Failed      : %s (%s)" %
+             (targetObj.error, targetObj.error.__class__.__name__))
+    names = failed_targets(failed)
+    if names:
+        alog("Retry the failed targets with --target %s" % names)
+
+
+def failed_targets(failed):
+    """
+    Return the --target option value that selects the failed targets.
+
+    :param failed: list of the target objects that failed
+    :type failed: list
+    :returns comma delimited target list ; empty for a single target
+             config file as it has no target names
+    """
+
+    return ','.join([targetObj.target for targetObj in failed
+                     if targetObj.target is not None])
+
+
+def install(target_objects, parallel=0, probe='any', probe_timeout=2.0,
+            probe_attempts=3, resume=False):
+    """
+    Install the host of each target object.
+
+    A target that fails doesn't stop the others ; its error is recorded
+    in its target object and it is returned in the failed list.
+
+    :param target_objects: list of target objects to install
+    :type target_objects: list
+    :param parallel: max number of targets to install at the same time
+                     ; 0 or 1 installs one at a time
+    :type parallel: int
+    :param probe: reachability check ; any, tcp, icmp or none
+    :type probe: str
+    :param probe_timeout: max seconds per reachability check attempt
+    :type probe_timeout: float
+    :param probe_attempts: reachability check attempts per target
+    :type probe_attempts: int
+    :param resume: skip the targets the journal shows are done and
+                   re-verify the steps done by the in-flight ones
+    :type resume: bool
+    :returns list of the target objects that failed ; empty if all
+             targets were installed
+    """
+
+    all_targets = target_objects
+    failed = []
+
+    if resume and journal is not None:
+        target_objects = journal.resume(target_objects)
+
+    # All targets are executed by this thread's event loop
+    event_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(event_loop)
+    try:
+        # Drop the targets whose BMC is unreachable before installing any
+        if len(target_objects) and probe != 'none':
+            reachable = event_loop.run_until_complete(
+                probe_targets(target_objects, probe, probe_timeout,
+                              probe_attempts))
+            failed = [targetObj for targetObj in target_objects
+                      if targetObj not in reachable]
+            if not reachable:
+                elog("Operation aborted ; no reachable bmc found")
+                alog("Check BMC ip addresses are reachable")
+            target_objects = reachable
+
+        # Fail the targets whose image can't be fetched before any of
+        # them is powered off
+        if len(target_objects) and image_check != 'none':
+            ready = event_loop.run_until_complete(
+                check_target_images(target_objects))
+            failed += [targetObj for targetObj in target_objects
+                       if targetObj not in ready]
+            if not ready:
+                elog("Operation aborted ; no install image can be fetched")
+                alog("Check the image urls and their image server")
+            target_objects = ready
+
+        waves = [target_objects]
+        if scheduler is not None and target_objects:
+            scheduler.reset()
+            target_objects = scheduler.order(
+                target_objects,
+                journal.durations() if journal is not None else None)
+            waves = scheduler.waves(target_objects)
+            if len(waves) > 1:
+                ilog("Schedule    : canary wave of %d targets (%s) ; then "
+                     "%d targets" %
+                     (len(waves[0]),
+                      ', '.join([targetObj.label for targetObj in waves[0]]),
+                      len(waves[1])))
+
+        for wave in waves:
+            if wave is not waves[0]:
+                canary_failed = [targetObj for targetObj in waves[0]
+                                 if targetObj in failed]
+                if canary_failed:
+                    elog("Operation aborted ; %d of %d canary targets "
+                         "failed" % (len(canary_failed), len(waves[0])))
+                    alog("Fix the canary failures before installing the "
+                         "other targets")
+                    reason = "canary %s failed ; not installed" % \
+                        ', '.join([targetObj.label
+                                   for targetObj in canary_failed])
+                    for targetObj in wave:
+                        targetObj.error = stage_error(
+                            targetObj.label, 'Canary Wave', reason)
+                    failed += wave
+                    break
+                ilog("Schedule    : canary wave done ; installing %d "
+                     "targets" % len(wave))
+
+            if parallel > 1 and wave:
+                # Load the Iso for up to 'parallel' objects at the same time
+                failed += event_loop.run_until_complete(
+                    run_parallel(wave, parallel))
+            else:
+                # Load the Iso for all objects
+                for targetObj in wave:
+                    if targetObj.target is not None:
+                        ilog("BMC Target  : %s" % targetObj.target)
+                    if log.debug == 0:
+                        ilog("BMC IP Addr : %s" % targetObj.ip)
+                        ilog("Host Image  : %s" % targetObj.img)
+                    if event_loop.run_until_complete(
+                            run_target(targetObj,
+                                       targetObj.execute())) is False:
+                        failed.append(targetObj)
+        if scheduler is not None and (scheduler.mount_cap or
+                                      scheduler.vendor_cap):
+            ilog("Schedule    : %s" % scheduler.summary())
+    finally:
+        if journal is not None:
+            journal.flush()
+        event_loop.close()
+
+    report_failures(all_targets, failed)
+    return failed
@@ -0,0 +1,118 @@
+###############################################################################
+#
+# Copyright (c) 2026 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller errors"""
+
+###############################################################################
+#
+# A stage that fails raises the TargetError subclass of its stage once
+# the target's session is closed. It ends that target's execution only ;
+# the engine records the failure and carries on with the other targets.
+#
+###############################################################################
+
+
+class RvmcError(Exception):
+    """Base class of the Redfish Virtual Media Controller errors"""
+
+
+class TargetError(RvmcError):
+    """
+    A target's execution failed.
+
+    :param target: the target label ; its name or bmc address
+    :type target: str
+    :param stage: the execution stage that failed
+    :type stage: str
+    :param reason: the last error logged for the target
+    :type reason: str
+    """
+
+    def __init__(self, target, stage, reason=None):
+        super(TargetError, self).__init__(target, stage, reason)
+        self.target = target
+        self.stage = stage
+        self.reason = reason
+
+    def __str__(self):
+        if self.reason:
+            return "%s: %s failed ; %s" % (self.target, self.stage,
+                                           self.reason)
+        return "%s: %s failed" % (self.target, self.stage)
+
+
+class ConnectionFailed(TargetError):
+    """The bmc is unreachable or doesn't answer redfish requests"""
+
+
+class SessionFailed(TargetError):
+    """The bmc refused to create an authenticated session"""
+
+
+class DiscoveryFailed(TargetError):
+    """The bmc's managers, systems or virtual media could not be found"""
+
+
+class PowerFailed(TargetError):
+    """The host could not be powered on or off"""
+
+
+class MediaFailed(TargetError):
+    """The image could not be ejected or inserted"""
+
+
+class BootOverrideFailed(TargetError):
+    """The next boot override to cd/dvd could not be set"""
+
+
+class ImageUnavailable(TargetError):
+    """The install image could not be fetched from its server"""
+
+
+class CanaryFailed(TargetError):
+    """The target was not installed because the canary wave failed"""
+
+
+# the error raised by each execution stage ; TargetError for the others
+STAGE_ERRORS = {
+    'Reachability Check': ConnectionFailed,
+    'Image Pre-flight': ImageUnavailable,
+    'Canary Wave': CanaryFailed,
+    'Redfish Client Connection': ConnectionFailed,
+    'Root Query': ConnectionFailed,
+    'Create Communication Session': SessionFailed,
+    'Log Out Cached Session': SessionFailed,
+    'Subscribe to Events': DiscoveryFailed,
+    'Reconcile Plan': DiscoveryFailed,
+    'Load Cached Discovery': DiscoveryFailed,
+    'Get Managers': DiscoveryFailed,
+    'Get Systems': DiscoveryFailed,
+    'Get CD/DVD Virtual Media': DiscoveryFailed,
+    'Load Selected Virtual Media Version and Actions': DiscoveryFailed,
+    'Power On Host': PowerFailed,
+    'Power Off Host': PowerFailed,
+    'Eject Current Image': MediaFailed,
+    'Insert Image into Virtual Media CD/DVD': MediaFailed,
+    'Get Boot Override Capabilities': BootOverrideFailed,
+    'Set Next Boot Override to CD/DVD': BootOverrideFailed,
+}
+
+
+def stage_error(target, stage, reason=None):
+    """
+    Return the error of a failed execution stage.
+
+    :param target: the target label
+    :type target: str
+    :param stage: the execution stage that failed
+    :type stage: str
+    :param reason: the last error logged for the target
+    :type reason: str
+    :returns a TargetError
+    """
+
+    return STAGE_ERRORS.get(stage, TargetError)(target, stage, reason)
@@ -0,0 +1,384 @@
+###############################################################################
+#
+# Copyright (c) 2026 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller install image pre-flight"""
+
+###############################################################################
+#
+# Many targets usually install the same image. A BMC only reports that
+# it can't fetch its image once the insert stage's poll gives up ; after
+# the host was powered off and minutes later.
+#
+# So before the install phase each unique image url is checked once ;
+# all of them at the same time, from this process:
+#
+#     HEAD      ... the image server answers and the image's size
+#     Range GET ... the first IMAGE_SAMPLE_BYTES ; measures throughput and
+#                   whether the server serves byte ranges, which some
+#                   BMCs' virtual media need
+#     sidecar   ... <image url>.sha256 ; optional. With the 'verify' check
+#                   the whole image is downloaded and its sha256 compared
+#
+# The targets of an image that fails the check fail right away with an
+# ImageUnavailable error ; before any of them is powered off. Checks
+# that pass are remembered for IMAGE_CHECK_TTL_SECS ; so a run checks
+# each image once and the install daemon rechecks them from time to time.
+#
+###############################################################################
+
+import asyncio
+import hashlib
+import re
+import ssl
+import time
+
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+
+from rvmc.log import alog
+from rvmc.log import dlog1
+from rvmc.log import elog
+from rvmc.log import ilog
+from rvmc.transport import AsyncRedfishTransport
+
+# image checks ; none (default), sample or verify. The BMCs fetch the
+# image, not rvmc ; rvmc may have no route to an image server that the
+# BMCs can reach, so a check is only made when asked for.
+IMAGE_CHECK_MODES = ['sample', 'verify', 'none']
+IMAGE_CHECK_DEFAULT = 'none'
+
+# max seconds for each request of a check ; the verify download excepted
+IMAGE_CHECK_TIMEOUT_SECS = 10
+
+# bytes read by the Range GET that measures the image server's throughput
+IMAGE_SAMPLE_BYTES = 1 << 20
+
+# max number of images checked at the same time
+IMAGE_CHECK_CONCURRENCY = 16
+
+# seconds a passed check is remembered
+IMAGE_CHECK_TTL_SECS = 300
+
+# the checksum sidecar file of an image is <image url><suffix>
+IMAGE_SIDECAR_SUFFIX = '.sha256'
+IMAGE_SIDECAR_MAX_BYTES = 4096
+
+# max redirects followed per request
+MAX_REDIRECTS = 3
+
+READ_BYTES = 1 << 16
+
+# the passed checks ; url -> ImageCheck
+checks = {}
+
+
+class ImageCheck(object):
+    """
+    The pre-flight check result of one image url
+    """
+
+    def __init__(self, url):
+        """
+        :param url: the image url
+        :type url: str
+        """
+
+        self.url = url
+        self.ok = False
+        self.reason = None          # why the check failed
+        self.size = None            # image bytes ; None if not reported
+        self.ranges = False         # True if the server serves byte ranges
+        self.rate = None            # Range GET bytes per second
+        self.sha256 = None          # the sidecar's sha256 ; if there is one
+        self.verified = None        # True/False once the image is verified
+        self.checked = None         # monotonic time of the check
+
+    def summary(self):
+        """Return a one line description of the check result"""
+
+        if self.ok is False:
+            return self.reason
+        parts = []
+        if self.size is not None:
+            parts.append("%.1f MB" % (self.size / 1e6))
+        if self.rate is not None:
+            parts.append("%.1f MB/s" % (self.rate / 1e6))
+            if self.size:
+                parts.append("~%.0fs to fetch" % (self.size / self.rate))
+        if self.ranges is False:
+            parts.append("no byte ranges")
+        if self.verified is True:
+            parts.append("sha256 verified")
+        elif self.sha256 is not None:
+            parts.append("sha256 sidecar")
+        return ' ; '.join(parts)
+
+
+class ImageHttpError(Exception):
+    """An image server request failed"""
+
+
+async def http_request(url, method, headers=None, timeout=None, sink=None,
+                       limit=None, head=None):
+    """
+    Issue one http request to an image server ; redirects are followed.
+
+    :param url: http or https url
+    :type url: str
+    :param method: HEAD or GET
+    :type method: str
+    :param headers: extra request headers
+    :type headers: dictionary
+    :param timeout: max seconds to wait for each read ; and to connect
+    :type timeout: float
+    :param sink: passed each body block ; the body isn't kept if given
+    :type sink: function
+    :param limit: max body bytes read ; the rest is not read
+    :type limit: int
+    :param head: passed the status and header dictionary before the body
+                 is read ; the body isn't read if it returns False
+    :type head: function
+    :returns (status, header dictionary, body bytes, body bytes read,
+              seconds from request to the end of the body)
+    :raises ImageHttpError: if the server can't be reached or answers
+                            with an invalid response
+    """
+
+    timeout = timeout or IMAGE_CHECK_TIMEOUT_SECS
+    for _redirect in range(MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        if parts.scheme not in ['http', 'https']:
+            raise ImageHttpError("unsupported url scheme '%s'" % parts.scheme)
+        context = None
+        if parts.scheme == 'https':
+            # image servers like BMCs often serve self signed certificates
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        port = parts.port or (443 if context else 80)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        start_time = time.monotonic()
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(parts.hostname, port, ssl=context),
+                timeout)
+        except asyncio.TimeoutError as ex:
+            raise ImageHttpError("connect to %s:%d timeout" %
+                                 (parts.hostname, port)) from ex
+        except (OSError, ValueError) as ex:
+            raise ImageHttpError("connect to %s:%d failed ; %s" %
+                                 (parts.hostname, port,
+                                  getattr(ex, 'strerror', None) or ex)) \
+                from ex
+        try:
+            lines = ['%s %s HTTP/1.1' % (method, path),
+                     'Host: %s' % parts.netloc.rpartition('@')[2],
+                     'User-Agent: rvmc',
+                     'Connection: close']
+            for name, value in (headers or {}).items():
+                lines.append('%s: %s' % (name, value))
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            _version, status, response_headers = await asyncio.wait_for(
+                AsyncRedfishTransport.read_head(reader), timeout)
+
+            if status in [301, 302, 303, 307, 308] and \
+                    response_headers.get('location'):
+                url = urljoin(url, response_headers['location'])
+                dlog1("Image Check : %s redirected to %s" % (path, url))
+                continue
+
+            blocks = []
+            nbytes = 0
+            read_body = method != 'HEAD'
+            if head is not None and head(status, response_headers) is False:
+                read_body = False
+            length = response_headers.get('content-length')
+            chunked = 'chunked' in \
+                response_headers.get('transfer-encoding', '').lower()
+            while read_body and (limit is None or nbytes < limit):
+                if chunked:
+                    block = await asyncio.wait_for(
+                        AsyncRedfishTransport.read_chunk(reader), timeout)
+                else:
+                    size = READ_BYTES
+                    if length is not None:
+                        size = min(size, int(length) - nbytes)
+                    if size <= 0:
+                        break
+                    block = await asyncio.wait_for(reader.read(size),
+                                                   timeout)
+                if not block:
+                    break
+                nbytes += len(block)
+                if sink is not None:
+                    sink(block)
+                else:
+                    blocks.append(block)
+            return (status, response_headers, b''.join(blocks), nbytes,
+                    time.monotonic() - start_time)
+        except asyncio.TimeoutError as ex:
+            raise ImageHttpError("%s %s timeout" % (method, path)) from ex
+        except (OSError, ValueError, asyncio.IncompleteReadError) as ex:
+            raise ImageHttpError("%s %s failed ; %s" %
+                                 (method, path,
+                                  getattr(ex, 'strerror', None) or ex)) \
+                from ex
+        finally:
+            writer.close()
+    raise ImageHttpError("too many redirects")
+
+
+async def check_image(url, mode=IMAGE_CHECK_MODES[0],
+                      timeout=IMAGE_CHECK_TIMEOUT_SECS):
+    """
+    Check that an image can be fetched.
+
+    :param url: the image url
+    :type url: str
+    :param mode: sample or verify
+    :type mode: str
+    :param timeout: max seconds for each request
+    :type timeout: float
+    :returns ImageCheck
+    """
+
+    check = ImageCheck(url)
+    check.checked = time.monotonic()
+    try:
+        # HEAD ; some image servers don't implement it
+        status, headers, _body, _nbytes, _seconds = \
+            await http_request(url, 'HEAD', timeout=timeout)
+        if status not in [200, 405, 501]:
+            raise ImageHttpError("HEAD HTTP %d" % status)
+        if status == 200 and headers.get('content-length'):
+            check.size = int(headers['content-length'])
+
+        # Range GET sample
+        status, headers, _body, nbytes, seconds = await http_request(
+            url, 'GET', {'Range': 'bytes=0-%d' % (IMAGE_SAMPLE_BYTES - 1)},
+            timeout=timeout, sink=lambda block: None,
+            limit=IMAGE_SAMPLE_BYTES)
+        if status == 206:
+            check.ranges = True
+            total = headers.get('content-range', '').rpartition('/')[2]
+            if total.isdigit():
+                check.size = int(total)
+        elif status == 200:
+            if check.size is None and headers.get('content-length'):
+                check.size = int(headers['content-length'])
+        else:
+            raise ImageHttpError("GET HTTP %d" % status)
+        if check.size == 0 or nbytes == 0:
+            raise ImageHttpError("image is empty")
+        check.rate = nbytes / max(seconds, 0.001)
+
+        check.sha256 = await fetch_sidecar(url, timeout)
+        if mode == 'verify':
+            await verify_image(check, timeout)
+        check.ok = check.verified is not False
+    except ImageHttpError as ex:
+        check.reason = str(ex)
+    except ValueError as ex:
+        check.reason = "invalid response ; %s" % ex
+    return check
+
+
+async def fetch_sidecar(url, timeout):
+    """
+    Return the sha256 of an image's checksum sidecar ; None if there is
+    no sidecar or it doesn't hold one.
+    """
+
+    try:
+        status, _headers, body, _nbytes, _seconds = await http_request(
+            url + IMAGE_SIDECAR_SUFFIX, 'GET', timeout=timeout,
+            limit=IMAGE_SIDECAR_MAX_BYTES)
+    except ImageHttpError as ex:
+        dlog1("Image Check : no sidecar ; %s" % ex)
+        return None
+    if status != 200:
+        return None
+    match = re.search(br'\b([0-9a-fA-F]{64})\b', body)
+    if match is None:
+        return None
+    return match.group(1).decode('ascii').lower()
+
+
+async def verify_image(check, timeout):
+    """
+    Download the whole image and compare its sha256 with its sidecar's.
+    Sets check.verified ; None if there is no sidecar to compare with.
+    """
+
+    if check.sha256 is None:
+        alog("Image Check : %s has no %s sidecar ; not verified" %
+             (check.url, IMAGE_SIDECAR_SUFFIX))
+        return
+    digest = hashlib.sha256()
+    status, _headers, _body, nbytes, seconds = await http_request(
+        check.url, 'GET', timeout=timeout, sink=digest.update)
+    if status != 200:
+        raise ImageHttpError("GET HTTP %d" % status)
+    check.verified = digest.hexdigest() == check.sha256
+    if check.verified is False:
+        check.reason = "sha256 %s does not match the sidecar's %s" % \
+            (digest.hexdigest(), check.sha256)
+    dlog1("Image Check : downloaded %d bytes in %.1f seconds" %
+          (nbytes, seconds))
+
+
+async def check_images(urls, mode=IMAGE_CHECK_MODES[0],
+                       timeout=IMAGE_CHECK_TIMEOUT_SECS):
+    """
+    Check a set of image urls ; each once and all at the same time.
+    Log an image report.
+
+    :param urls: the image urls
+    :type urls: iterable
+    :param mode: sample or verify
+    :type mode: str
+    :param timeout: max seconds for each request
+    :type timeout: float
+    :returns dictionary of url -> ImageCheck
+    """
+
+    results = {}
+    pending = []
+    for url in sorted(set(urls)):
+        check = checks.get(url)
+        if check is not None and \
+                time.monotonic() - check.checked < IMAGE_CHECK_TTL_SECS:
+            results[url] = check
+        else:
+            pending.append(url)
+    if not pending:
+        return results
+
+    ilog("Checking %d install images" % len(pending))
+    start_time = time.time()
+    semaphore = asyncio.Semaphore(IMAGE_CHECK_CONCURRENCY)
+
+    async def limited(url):
+        async with semaphore:
+            return await check_image(url, mode, timeout)
+
+    for check in await asyncio.gather(*[limited(url) for url in pending]):
+        results[check.url] = check
+        if check.ok is True:
+            checks[check.url] = check
+            ilog("Image Ok    : %s ; %s" % (check.url, check.summary()))
+        else:
+            checks.pop(check.url, None)
+            elog("Image Failed: %s ; %s" % (check.url, check.summary()))
+    failed = len([url for url in pending if results[url].ok is False])
+    ilog("%d of %d images ok ; %d failed (took %.1f seconds)" %
+         (len(pending) - failed, len(pending), failed,
+          time.time() - start_time))
+    return results
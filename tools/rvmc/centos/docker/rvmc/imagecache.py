@@ -0,0 +1,470 @@
+###############################################################################
+#
+# Copyright (c) 2026 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller install image caching proxy"""
+
+###############################################################################
+#
+# Subclouds are often far from the central image server ; when each
+# BMC's virtual media pulls the whole image over the WAN on its own, a
+# region fetches every image once per BMC.
+#
+# --image-cache <dir> makes the built-in image server a read-through
+# caching proxy. Each target's image url is rewritten to the proxy:
+#
+#   http(s)://<address>:<port>/cache/<url key>/<image file name>
+#
+# and the proxy fetches each upstream image once ; as soon as the
+# targets are pointed at it, while their BMCs are still being powered
+# off. The image is written to the cache directory as it arrives and
+# Range requests are answered as soon as their bytes are on disk ; so
+# BMCs start reading the image before the fetch completes. The upstream
+# <image url>.sha256 sidecar is forwarded.
+#
+# The cache directory holds:
+#
+#   <sha256>             ... one image ; named by its content hash, so
+#                            urls of the same image share one file
+#   <url key>.<pid>.part ... an image being fetched
+#   index.json           ... upstream url -> sha256, size, the upstream
+#                            ETag and Last-Modified and when it was last
+#                            used
+#
+# A cached image is revalidated with a HEAD the first time a run uses
+# it and fetched again if its upstream ETag, Last-Modified or size
+# changed ; the cached copy is served if the upstream can't be reached.
+#
+# The images use at most --image-cache-size GB. The least recently
+# used ones ; older image versions, are evicted to make room for a new
+# fetch. Images a run uses are never evicted by it.
+#
+###############################################################################
+
+import asyncio
+import email.utils
+import hashlib
+import json
+import os
+import re
+import time
+
+from urllib.parse import urlsplit
+
+from rvmc.image import IMAGE_SIDECAR_MAX_BYTES
+from rvmc.image import IMAGE_SIDECAR_SUFFIX
+from rvmc.image import ImageHttpError
+from rvmc.image import http_request
+from rvmc.isoserver import content_type
+from rvmc.log import alog
+from rvmc.log import dlog1
+from rvmc.log import elog
+from rvmc.log import ilog
+
+# version of the index file layout ; an index of another is discarded
+IMAGE_CACHE_VERSION = 1
+
+IMAGE_CACHE_INDEX = 'index.json'
+
+# max seconds to wait for each upstream read ; and to connect
+IMAGE_CACHE_TIMEOUT_SECS = 30
+
+# the part file of an image being fetched by a process
+PART_NAME = re.compile(r'^[0-9a-f]{16}\.(\d+)\.part$')
+
+
+class CachedImage(object):
+    """
+    An upstream image served through the cache ; fetched at most once
+    """
+
+    def __init__(self, cache, url):
+        """
+        :param cache: the cache the image is stored in
+        :type cache: ImageCache
+        :param url: the upstream image url
+        :type url: str
+        """
+
+        self.cache = cache
+        self.url = url
+        self.key = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+        self.name = os.path.basename(urlsplit(url).path) or 'image.iso'
+        self.content_type = content_type(self.name)
+        self.path = None            # the image file ; the part while fetched
+        self.map = None             # never mapped ; the file may grow
+        self.size = None            # None until the upstream reports it
+        self.available = 0          # bytes on disk
+        self.complete = False
+        self.error = None           # why the image can't be served
+        self.etag = '"%s"' % self.key
+        self.modified = email.utils.formatdate(usegmt=True)
+        self.sidecar_body = None    # the upstream sidecar once fetched
+        self.task = None            # the load ; None again if it failed
+        self.waiters = []
+
+    def close(self):
+        """Nothing to release ; the file is opened per transfer"""
+
+    async def ready(self):
+        """
+        Start loading the image if it isn't ; wait until its size is
+        known.
+
+        :raises ImageHttpError: if the image can't be fetched
+        """
+
+        if self.task is None:
+            # the first request ; or the last fetch failed and is retried
+            self.path = self.size = None
+            self.available = 0
+            self.complete = False
+            self.error = None
+            self.task = asyncio.ensure_future(self._load())
+        await self._until(lambda: self.size is not None or self.complete)
+        if self.error is not None or self.size is None:
+            raise ImageHttpError(self.error)
+
+    async def wait(self, needed):
+        """
+        Wait until at least the first 'needed' bytes are on disk.
+
+        :returns the bytes on disk
+        :raises ImageHttpError: if the fetch failed before they were
+        """
+
+        await self._until(lambda: self.available >= needed or self.complete)
+        if self.available < needed:
+            raise ImageHttpError(self.error or "image is short")
+        return self.available
+
+    async def sidecar(self):
+        """Return the upstream sidecar's body ; None if there isn't one"""
+
+        if self.sidecar_body is None:
+            try:
+                status, _headers, body, _nbytes, _seconds = \
+                    await http_request(self.url + IMAGE_SIDECAR_SUFFIX, 'GET',
+                                       timeout=IMAGE_CACHE_TIMEOUT_SECS,
+                                       limit=IMAGE_SIDECAR_MAX_BYTES)
+            except ImageHttpError as ex:
+                dlog1("Image Cache : no sidecar ; %s" % ex)
+                return None
+            self.sidecar_body = body if status == 200 else b''
+        return self.sidecar_body or None
+
+    async def _until(self, predicate):
+        """Wait until a predicate of the fetch progress is true"""
+
+        while not predicate() and self.error is None:
+            waiter = asyncio.get_event_loop().create_future()
+            self.waiters.append(waiter)
+            await waiter
+
+    def _progress(self):
+        """Wake up the requests waiting for the fetch"""
+
+        waiters, self.waiters = self.waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _use(self, record):
+        """Serve the cached copy of a record"""
+
+        self.path = self.cache.object_path(record['sha256'])
+        self.size = self.available = record['size']
+        self.etag = '"%s"' % record['sha256'][:32]
+        self.modified = record.get('modified') or self.modified
+        self.complete = True
+        self.cache.hits += 1
+        self.cache.touch(self.url)
+
+    async def _load(self):
+        """Serve the cached copy if it is current ; else fetch the image"""
+
+        try:
+            record = self.cache.records.get(self.url)
+            if record is not None and \
+                    os.path.exists(self.cache.object_path(record['sha256'])):
+                try:
+                    status, headers, _body, _nbytes, _seconds = \
+                        await http_request(self.url, 'HEAD',
+                                           timeout=IMAGE_CACHE_TIMEOUT_SECS)
+                except ImageHttpError as ex:
+                    alog("Image Cache : %s ; serving the cached copy" % ex)
+                    status, headers = None, {}
+                if status != 200 or not changed(record, headers):
+                    dlog1("Image Cache : %s is cached" % self.url)
+                    self._use(record)
+                    return
+                ilog("Image Cache : %s changed upstream" % self.url)
+            await self._fetch()
+        except ImageHttpError as ex:
+            if not self.cache.stopping:
+                elog("Image Cache : %s fetch failed ; %s" % (self.url, ex))
+            self.error = str(ex)
+            self.task = None
+        except (IOError, OSError) as ex:
+            elog("Image Cache : %s fetch failed ; %s" % (self.url, ex))
+            self.error = "cache write failed ; %s" % ex
+            self.task = None
+        finally:
+            self._progress()
+
+    async def _fetch(self):
+        """Fetch the upstream image into the cache directory"""
+
+        part = os.path.join(self.cache.directory,
+                            "%s.%d.part" % (self.key, os.getpid()))
+        digest = hashlib.sha256()
+        record = {}
+        start_time = time.monotonic()
+        ilog("Image Cache : fetching %s" % self.url)
+
+        def head(status, headers):
+            if status != 200:
+                return False
+            if headers.get('content-length', '').isdigit():
+                self.size = int(headers['content-length'])
+                self.cache.make_room(self.size)
+            record['etag'] = headers.get('etag')
+            record['modified'] = headers.get('last-modified')
+            if record['etag']:
+                self.etag = record['etag']
+            self.modified = record['modified'] or self.modified
+            self.path = part
+            self._progress()
+            return True
+
+        # unbuffered ; a transfer reads the part file while it is written
+        with open(part, 'wb', buffering=0) as part_file:
+
+            def sink(block):
+                if self.cache.stopping:
+                    raise ImageHttpError("the image server stopped")
+                part_file.write(block)
+                digest.update(block)
+                self.available += len(block)
+                self.cache.fetched += len(block)
+                self._progress()
+
+            try:
+                status, _headers, _body, nbytes, _seconds = \
+                    await http_request(self.url, 'GET',
+                                       timeout=IMAGE_CACHE_TIMEOUT_SECS,
+                                       sink=sink, head=head)
+                if status != 200:
+                    raise ImageHttpError("GET HTTP %d" % status)
+                if self.size is not None and nbytes != self.size:
+                    raise ImageHttpError("got %d of %d bytes" %
+                                         (nbytes, self.size))
+            except BaseException:
+                os.unlink(part)
+                raise
+
+        record['sha256'] = digest.hexdigest()
+        record['size'] = nbytes
+        record['name'] = self.name
+        path = self.cache.object_path(record['sha256'])
+        if os.path.exists(path):
+            # the same image as another url's
+            os.unlink(part)
+        else:
+            os.rename(part, path)
+        self.path = path
+        self.size = self.available = nbytes
+        self.complete = True
+        self.cache.store(self.url, record)
+        ilog("Image Cache : fetched %s ; %.1f MB in %.1f seconds" %
+             (self.url, nbytes / 1e6, time.monotonic() - start_time))
+
+
+def changed(record, headers):
+    """
+    Return True if an upstream image's HEAD headers show it isn't the
+    cached one.
+
+    :param record: the cached image's index record
+    :type record: dictionary
+    :param headers: the upstream HEAD response headers
+    :type headers: dictionary
+    :returns bool
+    """
+
+    length = headers.get('content-length', '')
+    if length.isdigit() and int(length) != record['size']:
+        return True
+    for name, key in [('etag', 'etag'), ('last-modified', 'modified')]:
+        if headers.get(name) and record.get(key) and \
+                headers[name] != record[key]:
+            return True
+    return False
+
+
+class ImageCache(object):
+    """
+    On disk store of upstream images ; by content hash with least
+    recently used eviction
+    """
+
+    def __init__(self, directory, max_bytes):
+        """
+        :param directory: the cache directory
+        :type directory: str
+        :param max_bytes: max bytes of cached images
+        :type max_bytes: int
+        """
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.records = {}           # upstream url -> index record
+        self.images = {}            # upstream url -> CachedImage of a run
+        self.hits = 0               # images served from the cache
+        self.stopping = False       # True once fetches are to end
+        self.fetched = 0            # bytes fetched from upstream
+
+    def object_path(self, sha256):
+        """Return the path of a cached image"""
+
+        return os.path.join(self.directory, sha256)
+
+    def load(self):
+        """
+        Load the index ; remove the part files of fetches that ended with
+        their process.
+
+        :raises OSError: if the cache directory can't be made
+        """
+
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            with open(os.path.join(self.directory, IMAGE_CACHE_INDEX)) \
+                    as index_file:
+                index = json.load(index_file)
+            if index.get('version') == IMAGE_CACHE_VERSION:
+                self.records = index.get('images', {})
+        except (IOError, OSError, ValueError, AttributeError) as ex:
+            dlog1("Image Cache : no index ; %s" % ex)
+        for name in os.listdir(self.directory):
+            match = PART_NAME.match(name)
+            if match is None:
+                continue
+            try:
+                os.kill(int(match.group(1)), 0)
+            except ProcessLookupError:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                pass
+        for url, record in list(self.records.items()):
+            if not os.path.exists(self.object_path(record.get('sha256',
+                                                              ''))):
+                del self.records[url]
+        ilog("Image Cache : %s ; %d images, %.1f of %.1f GB" %
+             (self.directory, len(self.objects()), self.usage() / 1e9,
+              self.max_bytes / 1e9))
+
+    def save(self):
+        """
+        Write the index.
+
+        It is written to a temporary file that is then renamed so
+        readers never see a partial file.
+        """
+
+        filename = os.path.join(self.directory, IMAGE_CACHE_INDEX)
+        tmp_filename = "%s.%d.tmp" % (filename, os.getpid())
+        try:
+            with open(tmp_filename, 'w') as index_file:
+                json.dump({'version': IMAGE_CACHE_VERSION,
+                           'images': self.records}, index_file,
+                          sort_keys=True)
+            os.rename(tmp_filename, filename)
+        except (IOError, OSError) as ex:
+            elog("Image Cache : unable to write %s (%s)" % (filename, ex))
+
+    def image(self, url):
+        """Return the CachedImage of an upstream url"""
+
+        if url not in self.images:
+            self.images[url] = CachedImage(self, url)
+        return self.images[url]
+
+    def touch(self, url):
+        """Mark an upstream url's image used"""
+
+        self.records[url]['used'] = time.time()
+
+    def store(self, url, record):
+        """Record a fetched image ; drop the one it replaced"""
+
+        previous = self.records.get(url)
+        record['used'] = time.time()
+        self.records[url] = record
+        if previous is not None and \
+                previous['sha256'] not in self.objects():
+            self._unlink(previous['sha256'])
+        self.save()
+
+    def objects(self):
+        """Return sha256 -> [size, last used] of the indexed images"""
+
+        objects = {}
+        for record in self.records.values():
+            entry = objects.setdefault(record['sha256'], [record['size'], 0])
+            entry[1] = max(entry[1], record.get('used', 0))
+        return objects
+
+    def usage(self):
+        """Return the bytes of the indexed images"""
+
+        return sum(size for size, _used in self.objects().values())
+
+    def make_room(self, needed):
+        """
+        Evict the least recently used images until 'needed' more bytes
+        fit ; images of this run are kept.
+        """
+
+        objects = self.objects()
+        keep = set(self.records[url]['sha256'] for url in self.images
+                   if url in self.records)
+        total = self.usage()
+        for sha256, (size, _used) in sorted(objects.items(),
+                                            key=lambda item: item[1][1]):
+            if total + needed <= self.max_bytes:
+                break
+            if sha256 in keep:
+                continue
+            for url in [url for url, record in self.records.items()
+                        if record['sha256'] == sha256]:
+                ilog("Image Cache : evicting %s (%.1f MB)" %
+                     (url, size / 1e6))
+                del self.records[url]
+            self._unlink(sha256)
+            total -= size
+        if total + needed > self.max_bytes:
+            alog("Image Cache : %.1f GB over its size ; the images of "
+                 "this run are kept" % ((total + needed -
+                                         self.max_bytes) / 1e9))
+        self.save()
+
+    def _unlink(self, sha256):
+        """Remove an image file"""
+
+        try:
+            os.unlink(self.object_path(sha256))
+        except (IOError, OSError) as ex:
+            dlog1("Image Cache : unable to remove %s (%s)" % (sha256, ex))
+
+    def summary(self):
+        """Return a one line description of the run's cache use"""
+
+        return "%d of %d images from the cache ; %.1f MB fetched ; " \
+               "%.1f of %.1f GB used" % (self.hits, len(self.images),
+                                         self.fetched / 1e6,
+                                         self.usage() / 1e9,
+                                         self.max_bytes / 1e9)
@@ -0,0 +1,650 @@
+###############################################################################
+#
+# Copyright (c) 2026 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller built-in install image server"""
+
+###############################################################################
+#
+# A BMC's virtual media reads its image from a web server in byte ranges
+# ; for as long as its host boots and installs from it. Without a web
+# server of their own next to the controller the targets all fetch the
+# image from wherever the config points them, often a slow or distant
+# one.
+#
+# --serve-image serves a local image file from this process instead and
+# points every target's image url at it:
+#
+#   http(s)://<address>:<port>/<image file name>
+#
+# The address is the local address of the route to each target's BMC ;
+# so the BMCs of different networks each get an address they can reach.
+# The image's <name>.sha256 sidecar is served too if the file exists.
+#
+# With --image-cache the server is a caching proxy of the targets'
+# upstream images instead ; see rvmc/imagecache.py.
+#
+# The server runs in its own thread and event loop so it outlives each
+# install's event loop and the transfers don't compete with the targets'
+# Redfish requests. It serves:
+#
+#   GET, HEAD   ... the image and its sidecar
+#   Range       ... a single byte range ; bytes=<first>-[<last>] or
+#                   bytes=-<suffix>. Multiple ranges get the whole file
+#   keep-alive  ... HTTP/1.1 connections stay open between requests for
+#                   up to ISO_SERVER_IDLE_SECS
+#   /_rvmc/stats ... json per client throughput ; requests, bytes,
+#                   transfer seconds and bytes per second
+#
+# File data is never read into the process. Plain http bodies are sent
+# with sendfile(2) by loop.sendfile ; python 3.7 and later. Python 3.6
+# writes slices of a read only mmap of the file straight from the page
+# cache ; or, for a cached image that may still be growing, blocks read
+# with pread.
+#
+# At most --serve-max-transfers bodies are sent at the same time ; later
+# requests wait for one to end rather than fail, BMCs rarely retry.
+#
+###############################################################################
+
+import asyncio
+import email.utils
+import json
+import mmap
+import os
+import socket
+import ssl
+import threading
+import time
+
+from urllib.parse import quote
+from urllib.parse import unquote
+from urllib.parse import urlsplit
+
+from rvmc.image import ImageHttpError
+from rvmc.log import current_task
+from rvmc.log import dlog1
+from rvmc.log import dlog2
+from rvmc.log import ilog
+
+# default listen port
+ISO_SERVER_PORT = 8080
+
+# default max number of bodies sent at the same time
+ISO_SERVER_MAX_TRANSFERS = 32
+
+# seconds an idle keep-alive connection is kept open
+ISO_SERVER_IDLE_SECS = 60
+
+# max seconds to wait for the server thread to start or stop
+ISO_SERVER_START_SECS = 10
+
+# the per client throughput stats path
+ISO_SERVER_STATS_PATH = '/_rvmc/stats'
+
+# the checksum sidecar file of an image is <image file><suffix>
+SIDECAR_SUFFIX = '.sha256'
+
+# bytes written per mmap slice ; without sendfile
+MMAP_BLOCK_BYTES = 1 << 20
+
+CONTENT_TYPES = {'.iso': 'application/x-iso9660-image',
+                 '.img': 'application/octet-stream',
+                 SIDECAR_SUFFIX: 'text/plain'}
+
+HTTP_REASONS = {200: 'OK',
+                206: 'Partial Content',
+                400: 'Bad Request',
+                404: 'Not Found',
+                405: 'Method Not Allowed',
+                416: 'Range Not Satisfiable',
+                502: 'Bad Gateway'}
+
+
+def content_type(name):
+    """Return the content type of a served file name"""
+
+    return CONTENT_TYPES.get(os.path.splitext(name)[1],
+                             'application/octet-stream')
+
+
+class RangeNotSatisfiable(Exception):
+    """A Range request starts past the end of the file"""
+
+
+def parse_range(value, size):
+    """
+    Return the byte range a Range header asks for.
+
+    :param value: the Range header value
+    :type value: str
+    :param size: the file's size
+    :type size: int
+    :returns (first, last) inclusive ; None for the whole file
+    :raises RangeNotSatisfiable: if no byte of the range is in the file
+    """
+
+    unit, _sep, spec = value.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, dash, last = spec.strip().partition('-')
+    if not dash:
+        return None
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(size - suffix, 0), size - 1
+        first = int(first)
+        last = int(last) if last else None
+    except ValueError:
+        return None
+    if first < 0 or (last is not None and last < first):
+        return None
+    if first >= size:
+        raise RangeNotSatisfiable()
+    if last is None:
+        return first, size - 1
+    return first, min(last, size - 1)
+
+
+def local_address(remote):
+    """
+    Return the local address of the route to a remote host ; the host
+    name if there is no route.
+
+    :param remote: the remote host name or address ; [] around ipv6
+    :type remote: str
+    :returns str
+    """
+
+    try:
+        family, _type, _proto, _name, address = socket.getaddrinfo(
+            remote.strip('[]'), 9, 0, socket.SOCK_DGRAM)[0]
+        with socket.socket(family, socket.SOCK_DGRAM) as route:
+            # a udp connect picks the route ; nothing is sent
+            route.connect(address)
+            return route.getsockname()[0]
+    except (OSError, IndexError):
+        return socket.getfqdn()
+
+
+class ServedFile(object):
+    """
+    A file the server serves
+    """
+
+    def __init__(self, path):
+        """
+        :param path: the file's path
+        :type path: str
+        :raises OSError: if the file can't be opened
+        """
+
+        self.path = path
+        self.name = os.path.basename(path)
+        self.map = None
+        with open(path, 'rb') as served_file:
+            stat = os.fstat(served_file.fileno())
+            self.size = stat.st_size
+            if self.size:
+                self.map = mmap.mmap(served_file.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+        self.etag = '"%x-%x"' % (self.size, stat.st_mtime_ns)
+        self.modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        self.content_type = content_type(path)
+        self.available = self.size
+
+    async def ready(self):
+        """The size of a local file is always known"""
+
+    async def wait(self, needed):
+        """All of a local file is on disk ; return its size"""
+
+        return self.size
+
+    def close(self):
+        """Unmap the file"""
+
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                # a transfer still holds a slice ; unmapped at exit
+                pass
+
+
+class ClientStats(object):
+    """
+    Throughput of one client address
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.ranges = 0             # Range requests served a part
+        self.bytes = 0              # body bytes sent
+        self.seconds = 0.0          # seconds spent sending bodies
+        self.active = 0             # bodies being sent
+
+    def rate(self):
+        """Return the body bytes sent per second ; None before any"""
+
+        if not self.seconds:
+            return None
+        return self.bytes / self.seconds
+
+    def to_dict(self):
+        """Return the stats as a json object"""
+
+        return {'requests': self.requests,
+                'ranges': self.ranges,
+                'bytes': self.bytes,
+                'seconds': round(self.seconds, 3),
+                'active': self.active,
+                'bytes_per_second': self.rate()}
+
+
+class IsoServer(object):
+    """
+    Serves an install image file, or caches and serves the targets'
+    upstream images, over http or https in its own thread
+    """
+
+    def __init__(self, path=None, address=None, port=ISO_SERVER_PORT,
+                 max_transfers=ISO_SERVER_MAX_TRANSFERS, certfile=None,
+                 keyfile=None, cache=None):
+        """
+        :param path: the image file ; None to serve the cache's images
+        :type path: str
+        :param address: the listen address ; None for every address of
+                        both ipv4 and ipv6
+        :type address: str
+        :param port: the listen port ; 0 for any free one
+        :type port: int
+        :param max_transfers: max bodies sent at the same time
+        :type max_transfers: int
+        :param certfile: https certificate chain file ; None for http
+        :type certfile: str
+        :param keyfile: https private key file ; None if in certfile
+        :type keyfile: str
+        :param cache: the upstream image cache ; None for none
+        :type cache: ImageCache
+        """
+
+        self.path = path
+        self.address = address or None
+        self.port = port
+        self.max_transfers = max(max_transfers, 1)
+        self.certfile = certfile
+        self.keyfile = keyfile
+        self.scheme = 'https' if certfile else 'http'
+        self.files = {}             # url path -> ServedFile
+        self.clients = {}           # client address -> ClientStats
+        self.connections = set()    # the tasks serving a connection
+        self.image = None           # the image's ServedFile
+        self.cache = cache
+        self.loop = None
+        self.thread = None
+        self.transfers = None
+        self.error = None           # why the server didn't start
+        self.started = threading.Event()
+
+    ###########################################################################
+    # Control ; from the caller's thread
+    ###########################################################################
+    def start(self):
+        """
+        Open the served files and start serving them.
+
+        :raises OSError: if a file can't be opened or the address bound
+        :raises ssl.SSLError: if the https certificate can't be loaded
+        """
+
+        if self.path is not None:
+            self.image = ServedFile(self.path)
+            self.files['/' + self.image.name] = self.image
+            if os.path.exists(self.path + SIDECAR_SUFFIX):
+                sidecar = ServedFile(self.path + SIDECAR_SUFFIX)
+                self.files['/' + sidecar.name] = sidecar
+        else:
+            self.cache.load()
+
+        context = None
+        if self.certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER
+                                     if hasattr(ssl, 'PROTOCOL_TLS_SERVER')
+                                     else ssl.PROTOCOL_SSLv23)
+            context.load_cert_chain(self.certfile, self.keyfile)
+
+        self.thread = threading.Thread(target=self._run, args=(context,),
+                                       name='rvmc-isoserver', daemon=True)
+        self.thread.start()
+        self.started.wait(ISO_SERVER_START_SECS)
+        if self.error is not None:
+            self.thread.join(ISO_SERVER_START_SECS)
+            raise self.error
+        if self.image is not None:
+            what = "%s (%.1f MB)" % (self.path, self.image.size / 1e6)
+        else:
+            what = "cached images"
+        ilog("ISO Server  : serving %s on %s port %d" %
+             (what, self.address or 'all addresses', self.port))
+
+    def stop(self):
+        """Stop serving ; log the per client throughput"""
+
+        if self.loop is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(ISO_SERVER_START_SECS)
+        for served in self.files.values():
+            served.close()
+        if self.cache is not None:
+            self.cache.save()
+            ilog("Image Cache : %s" % self.cache.summary())
+        for client, stats in sorted(self.clients.items()):
+            rate = stats.rate()
+            ilog("ISO Client  : %s ; %d requests, %.1f MB%s" %
+                 (client, stats.requests, stats.bytes / 1e6,
+                  " at %.1f MB/s" % (rate / 1e6) if rate else ""))
+
+    def url_for(self, bmc_address, path):
+        """
+        Return the url a BMC fetches a served file from.
+
+        :param bmc_address: the BMC's host name or address
+        :type bmc_address: str
+        :param path: the served file's path
+        :type path: str
+        :returns str
+        """
+
+        host = self.address
+        if host in [None, '0.0.0.0', '::']:
+            host = local_address(bmc_address)
+        if ':' in host:
+            host = '[%s]' % host
+        return "%s://%s:%d%s" % (self.scheme, host, self.port, quote(path))
+
+    def serve_targets(self, target_objects):
+        """
+        Point each target's image url at the server ; start fetching
+        the cached images the targets use.
+        """
+
+        for targetObj in target_objects:
+            if self.image is not None:
+                path = '/' + self.image.name
+            else:
+                cached = self.cache.image(targetObj.img)
+                path = '/cache/%s/%s' % (cached.key, cached.name)
+                if path not in self.files:
+                    self.files[path] = cached
+                    asyncio.run_coroutine_threadsafe(cached.ready(),
+                                                     self.loop)
+            targetObj.img = self.url_for(targetObj.ip, path)
+            dlog1("ISO Server  : %s image %s" %
+                  (targetObj.label, targetObj.img))
+
+    def stats(self):
+        """Return the served files and per client throughput as json"""
+
+        return {'files': dict((path, {'size': served.size,
+                                      'available': served.available,
+                                      'upstream': getattr(served, 'url',
+                                                          None)})
+                              for path, served in list(self.files.items())),
+                'clients': dict((client, stats.to_dict())
+                                for client, stats in
+                                list(self.clients.items()))}
+
+    ###########################################################################
+    # Server thread
+    ###########################################################################
+    def _run(self, context):
+        """The server thread ; runs its own event loop until stopped"""
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        servers = []
+        try:
+            self.transfers = asyncio.Semaphore(self.max_transfers)
+            # one listen socket per address family ; each after the first
+            # on the port the first got so port 0 is the same for all
+            hosts = [self.address]
+            if self.address is None:
+                hosts = sorted(set(info[4][0] for info in socket.getaddrinfo(
+                    None, self.port, socket.AF_UNSPEC, socket.SOCK_STREAM,
+                    0, socket.AI_PASSIVE)))
+            for host in hosts:
+                try:
+                    server = self.loop.run_until_complete(
+                        asyncio.start_server(self._client, host, self.port,
+                                             ssl=context,
+                                             reuse_address=True))
+                except OSError as ex:
+                    if not servers:
+                        raise
+                    # a host without ipv6 ; or without ipv4
+                    dlog1("ISO Server  : unable to listen on %s ; %s" %
+                          (host, ex))
+                    continue
+                servers.append(server)
+                self.port = server.sockets[0].getsockname()[1]
+        except OSError as ex:
+            self.error = ex
+        self.started.set()
+        if self.error is not None:
+            for server in servers:
+                server.close()
+            self.loop.close()
+            return
+        try:
+            self.loop.run_forever()
+        finally:
+            # keep-alive connections don't end by themselves ; nor do
+            # the fetches of cached images no target read to the end
+            for server in servers:
+                server.close()
+            tasks = list(self.connections)
+            if self.cache is not None:
+                # a cancel can be lost by a read that just completed
+                self.cache.stopping = True
+                tasks.extend(cached.task for cached in
+                             self.cache.images.values()
+                             if cached.task is not None)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(
+                asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    async def _client(self, reader, writer):
+        """Serve the requests of one connection until it is closed"""
+
+        peer = writer.get_extra_info('peername')
+        client = peer[0] if peer else 'unknown'
+        self.clients.setdefault(client, ClientStats())
+        task = current_task()
+        self.connections.add(task)
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b'\r\n\r\n'), ISO_SERVER_IDLE_SECS)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                        asyncio.LimitOverrunError):
+                    break
+                keep_alive = await self._request(head, writer, client)
+        except (OSError, ImageHttpError) as ex:
+            # BMCs often drop a connection in the middle of a range ; a
+            # cached image's fetch may fail in the middle of one
+            dlog2("ISO Server  : %s connection failed ; %s" % (client, ex))
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    async def _request(self, head, writer, client):
+        """
+        Serve one request.
+
+        :param head: the request line and headers
+        :type head: bytes
+        :param client: the client's address
+        :type client: str
+        :returns True if the connection is kept open for another request
+        """
+
+        lines = head.decode('latin-1').split('\r\n')
+        fields = lines[0].split(' ')
+        if len(fields) != 3 or not fields[2].startswith('HTTP/'):
+            await self._respond(writer, 400, False)
+            return False
+        method, target, version = fields
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        stats = self.clients[client]
+        stats.requests += 1
+
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.0':
+            keep_alive = 'keep-alive' in connection
+        else:
+            keep_alive = 'close' not in connection
+        if method not in ['GET', 'HEAD'] or \
+                headers.get('content-length', '0') != '0':
+            await self._respond(writer, 405, False, ['Allow: GET, HEAD'])
+            return False
+
+        path = unquote(urlsplit(target).path)
+        if path == ISO_SERVER_STATS_PATH:
+            body = json.dumps(self.stats(), sort_keys=True).encode() + b'\n'
+            await self._respond(writer, 200, keep_alive,
+                                ['Content-Type: application/json'],
+                                body if method == 'GET' else b'',
+                                len(body))
+            return keep_alive
+        served = self.files.get(path)
+        if served is None and path.endswith(SIDECAR_SUFFIX) and \
+                self.cache is not None and \
+                path[:-len(SIDECAR_SUFFIX)] in self.files:
+            body = await self.files[path[:-len(SIDECAR_SUFFIX)]].sidecar()
+            if body is not None:
+                await self._respond(writer, 200, keep_alive,
+                                    ['Content-Type: text/plain'],
+                                    body if method == 'GET' else b'',
+                                    len(body))
+                return keep_alive
+        if served is None:
+            await self._respond(writer, 404, keep_alive)
+            return keep_alive
+        try:
+            # a cached image's size is known once its fetch started
+            await served.ready()
+        except ImageHttpError:
+            await self._respond(writer, 502, keep_alive)
+            return keep_alive
+
+        first, last = 0, served.size - 1
+        status = 200
+        headers_out = ['Content-Type: %s' % served.content_type,
+                       'Accept-Ranges: bytes',
+                       'ETag: %s' % served.etag,
+                       'Last-Modified: %s' % served.modified]
+        if 'range' in headers and \
+                headers.get('if-range', served.etag) in [served.etag,
+                                                         served.modified]:
+            try:
+                byte_range = parse_range(headers['range'], served.size)
+            except RangeNotSatisfiable:
+                await self._respond(writer, 416, keep_alive,
+                                    ['Content-Range: bytes */%d' %
+                                     served.size])
+                return keep_alive
+            if byte_range is not None:
+                first, last = byte_range
+                status = 206
+                stats.ranges += 1
+                headers_out.append('Content-Range: bytes %d-%d/%d' %
+                                   (first, last, served.size))
+        count = last - first + 1
+        dlog2("ISO Server  : %s %s %s bytes %d-%d" %
+              (client, method, path,
+               first, last))
+        await self._respond(writer, status, keep_alive, headers_out,
+                            length=count)
+        if method == 'GET' and count:
+            await self._send_body(writer, served, first, count, stats)
+        return keep_alive
+
+    @staticmethod
+    async def _respond(writer, status, keep_alive, headers=None, body=b'',
+                       length=0):
+        """Send a response head and a small body"""
+
+        lines = ['HTTP/1.1 %d %s' % (status, HTTP_REASONS[status]),
+                 'Server: rvmc',
+                 'Date: %s' % email.utils.formatdate(usegmt=True),
+                 'Content-Length: %d' % length,
+                 'Connection: %s' % ('keep-alive' if keep_alive else 'close')]
+        if keep_alive:
+            lines.append('Keep-Alive: timeout=%d' % ISO_SERVER_IDLE_SECS)
+        lines.extend(headers or [])
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') +
+                     body)
+        await writer.drain()
+
+    async def _send_body(self, writer, served, first, count, stats):
+        """
+        Send a byte range of a file without reading it into the process.
+        Waits for a transfer slot first.
+        """
+
+        async with self.transfers:
+            stats.active += 1
+            mark = time.monotonic()
+            end = first + count
+            try:
+                # a file object per transfer since the https sendfile
+                # fallback seeks it
+                with open(served.path, 'rb') as body_file:
+                    view = None
+                    if served.map is not None:
+                        view = memoryview(served.map)
+                    while first < end:
+                        # a cached image being fetched is sent as its
+                        # bytes arrive
+                        available = await served.wait(first + 1)
+                        size = min(end, available) - first
+                        if hasattr(self.loop, 'sendfile'):
+                            size = await self.loop.sendfile(
+                                writer.transport, body_file, first, size)
+                            if not size:
+                                raise ImageHttpError("%s is short" %
+                                                     served.path)
+                        else:
+                            # the transport may keep a slice until it is
+                            # sent ; so they are left to be freed rather
+                            # than released here
+                            size = min(size, MMAP_BLOCK_BYTES)
+                            if view is not None:
+                                writer.write(view[first:first + size])
+                            else:
+                                writer.write(os.pread(body_file.fileno(),
+                                                      size, first))
+                            await writer.drain()
+                        stats.bytes += size
+                        first += size
+                        now = time.monotonic()
+                        stats.seconds += now - mark
+                        mark = now
+            finally:
+                stats.seconds += time.monotonic() - mark
+                stats.active -= 1
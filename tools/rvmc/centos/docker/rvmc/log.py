@@ -0,0 +1,190 @@
+###############################################################################
+#
+# Copyright (c) 2019-2020 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller logging"""
+
+###############################################################################
+#
+# Every log goes to stdout with a time stamp, a type and, while more
+# than one target is installing at the same time, the [target] prefix
+# of the asyncio task that logs it. The logs of a task that has a log
+# listener are also passed to that listener ; that is how the install
+# daemon streams a job's progress to its caller.
+#
+# This module only imports the standard library modules it needs to
+# log so the command line can report errors before it imports the
+# stage engine.
+#
+###############################################################################
+
+import datetime
+import sys
+import weakref
+
+# debug log level ; 0 = none .. 4 = all
+debug = 0
+
+# maps each running target's asyncio task to its target log prefix
+log_prefixes = weakref.WeakKeyDictionary()
+
+# maps an asyncio task to a function that is passed each of its logs
+log_listeners = weakref.WeakKeyDictionary()
+
+# maps an asyncio task to the last error it logged
+last_errors = weakref.WeakKeyDictionary()
+
+
+def current_task():
+    """
+    Return the running asyncio task ; None if there isn't one.
+
+    Nothing can be running until the stage engine has imported asyncio.
+    asyncio.Task.current_task was replaced by asyncio.current_task in 3.7
+    """
+
+    asyncio = sys.modules.get('asyncio')
+    if asyncio is None:
+        return None
+    try:
+        if hasattr(asyncio, 'current_task'):
+            return asyncio.current_task()
+        return asyncio.Task.current_task()
+    except RuntimeError:
+        # no running event loop
+        return None
+
+
+def t():
+    """
+    Return current time for log functions
+    """
+
+    return datetime.datetime.now().replace(microsecond=0)
+
+
+def p():
+    """
+    Return the target log prefix of the calling asyncio task.
+    Only set while installing more than one target at the same time.
+    """
+
+    task = current_task()
+    if task is None:
+        return ''
+    return log_prefixes.get(task, '')
+
+
+def inherit(task):
+    """
+    Give a task the log prefix and listener of the calling task.
+
+    :param task: a task started on behalf of the calling task
+    :type task: asyncio.Task
+    """
+
+    parent = current_task()
+    if parent is None:
+        return
+    if parent in log_prefixes:
+        log_prefixes[task] = log_prefixes[parent]
+    if parent in log_listeners:
+        log_listeners[task] = log_listeners[parent]
+
+
+def last_error():
+    """
+    Return the last error logged by the calling asyncio task and forget
+    it ; None if there isn't one.
+    """
+
+    task = current_task()
+    if task is None:
+        return None
+    return last_errors.pop(task, None)
+
+
+def emit(line):
+    """
+    Write a log line to stdout and pass it to the calling task's
+    log listener.
+
+    :param line: the log line without its leading newline
+    :type line: str
+    """
+
+    sys.stdout.write("\n" + line)
+    task = current_task()
+    if task is not None:
+        listener = log_listeners.get(task)
+        if listener is not None:
+            listener(line)
+
+
+def ilog(string):
+    """
+    Info Log Utility
+    """
+
+    emit("%s Info  : %s%s" % (t(), p(), string))
+
+
+def elog(string):
+    """
+    Error Log Utility
+    """
+
+    emit("%s Error : %s%s" % (t(), p(), string))
+    task = current_task()
+    if task is not None:
+        last_errors[task] = string
+
+
+def alog(string):
+    """
+    Action Log Utility
+    """
+
+    emit("%s Action: %s%s" % (t(), p(), string))
+
+
+def dlog1(string, level=1):
+    """
+    Debug Log - Level
+    """
+
+    if debug and level <= debug:
+        emit("%s Debug%d: %s%s" % (t(), level, p(), string))
+
+
+def dlog2(string):
+    """
+    Debug Log - Level 2
+    """
+
+    dlog1(string, 2)
+
+
+def dlog3(string):
+    """
+    Debug Log - Level 3
+    """
+
+    dlog1(string, 3)
+
+
+def dlog4(string):
+    """
+    Debug Log - Level 4
+    """
+
+    dlog1(string, 4)
+
+
+def slog(stage):
+    """Execution Stage Log"""
+
+    emit("%s Stage : %s%s" % (t(), p(), stage))
@@ -0,0 +1,216 @@
+###############################################################################
+#
+# Copyright (c) 2026 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller install wave scheduler"""
+
+###############################################################################
+#
+# Hundreds of targets installed at the same time all mount the same
+# image from the same image server and their hosts all boot from it at
+# the same moment ; that saturates the server's uplink and makes every
+# mount slow. Some BMC firmware also only copes with so many sessions.
+#
+# The wave scheduler releases the targets of a run under caps:
+#
+#   mount cap   ... max targets of an image host, the host:port of the
+#                   image url, that have an image inserted at the same
+#                   time. A target takes its mount slot before the
+#                   insert and holds it until its install ends ; its
+#                   host boots from the image while it is held.
+#   vendor cap  ... max targets of a BMC vendor with a session at the
+#                   same time. The vendor is learned by the root query
+#                   so the session slot is taken right after it.
+#   canary      ... the first wave ; these targets are installed first
+#                   and the others only if all of them succeed. They are
+#                   the targets expected to finish soonest ; one per
+#                   image host first so each image server is exercised.
+#
+# The others are released longest first ; by their last install time in
+# the journal, so the slowest targets don't start last and the run ends
+# sooner. Targets without one are expected to take the average time.
+#
+# A cap of 0 is no cap.
+#
+###############################################################################
+
+import asyncio
+import time
+
+from urllib.parse import urlsplit
+
+from rvmc.log import ilog
+
+# the kinds of slots a target takes
+SLOT_KINDS = ['session', 'mount']
+
+
+class SlotPool(object):
+    """
+    Counting semaphores of one kind of slot ; one per key
+    """
+
+    def __init__(self, cap):
+        """
+        :param cap: max slots per key ; 0 for no cap
+        :type cap: int
+        """
+
+        self.cap = cap
+        self.semaphores = {}
+
+    async def acquire(self, key):
+        """Wait for and take one of a key's slots"""
+
+        if not self.cap:
+            return
+        semaphore = self.semaphores.get(key)
+        if semaphore is None:
+            # made once a loop is running ; a python 3.6 semaphore is
+            # bound to the event loop it was made in
+            semaphore = asyncio.Semaphore(self.cap)
+            self.semaphores[key] = semaphore
+        await semaphore.acquire()
+
+    def release(self, key):
+        """Give back one of a key's slots"""
+
+        if self.cap:
+            self.semaphores[key].release()
+
+
+class WaveScheduler(object):
+    """
+    Releases the targets of a run in waves under per image host and
+    per BMC vendor caps
+    """
+
+    def __init__(self, mount_cap=0, vendor_cap=0, canary=0):
+        """
+        :param mount_cap: max targets per image host with an image
+                          inserted at the same time ; 0 for no cap
+        :type mount_cap: int
+        :param vendor_cap: max targets per bmc vendor with a session at
+                           the same time ; 0 for no cap
+        :type vendor_cap: int
+        :param canary: number of targets of the canary wave ; 0 for none
+        :type canary: int
+        """
+
+        self.mount_cap = mount_cap
+        self.vendor_cap = vendor_cap
+        self.canary = canary
+        self.pools = {}
+        self.held = {}              # target object -> [(kind, key), ..]
+        self.waited = {}            # kind -> seconds waited for a slot
+        self.reset()
+
+    def reset(self):
+        """Forget the slots of an earlier event loop"""
+
+        self.pools = {'session': SlotPool(self.vendor_cap),
+                      'mount': SlotPool(self.mount_cap)}
+        self.held = {}
+        self.waited = dict((kind, 0.0) for kind in SLOT_KINDS)
+
+    @staticmethod
+    def slot_key(targetObj, kind):
+        """
+        Return the key of a target's slot ; its image host for a mount
+        slot and its bmc vendor for a session slot.
+        """
+
+        if kind == 'mount':
+            return urlsplit(targetObj.img or '').netloc or 'local'
+        return targetObj.vendor or 'unknown'
+
+    async def acquire(self, targetObj, kind):
+        """
+        Wait for and take a target's slot ; a slot the target already
+        holds is kept.
+
+        :param targetObj: the target object
+        :type targetObj: VmcObject
+        :param kind: session or mount
+        :type kind: str
+        :returns the seconds waited
+        """
+
+        held = self.held.setdefault(targetObj, [])
+        if kind in [held_kind for held_kind, _key in held]:
+            return 0.0
+        key = self.slot_key(targetObj, kind)
+        start_time = time.monotonic()
+        await self.pools[kind].acquire(key)
+        held.append((kind, key))
+        seconds = time.monotonic() - start_time
+        self.waited[kind] += seconds
+        return seconds
+
+    def release(self, targetObj):
+        """Give back all of a target's slots"""
+
+        for kind, key in self.held.pop(targetObj, []):
+            self.pools[kind].release(key)
+
+    def order(self, target_objects, durations=None):
+        """
+        Return the targets longest expected install first.
+
+        :param target_objects: list of target objects
+        :type target_objects: list
+        :param durations: target label -> seconds its last install took
+        :type durations: dictionary
+        :returns list of target objects
+        """
+
+        if not durations:
+            return list(target_objects)
+        known = [durations[targetObj.label] for targetObj in target_objects
+                 if targetObj.label in durations]
+        if not known:
+            return list(target_objects)
+        average = sum(known) / len(known)
+        ilog("Schedule    : longest first ; %d of %d targets have a "
+             "previous install time" % (len(known), len(target_objects)))
+        return sorted(target_objects,
+                      key=lambda targetObj: -durations.get(targetObj.label,
+                                                           average))
+
+    def waves(self, target_objects):
+        """
+        Return the waves of targets to install one after the other.
+
+        :param target_objects: list of target objects ; in release order
+        :type target_objects: list
+        :returns list of lists of target objects ; the canary wave first
+        """
+
+        if not self.canary or len(target_objects) <= self.canary:
+            return [list(target_objects)]
+
+        soonest = list(reversed(target_objects))
+        canary = []
+        hosts = set()
+        for targetObj in soonest:
+            host = self.slot_key(targetObj, 'mount')
+            if host not in hosts and len(canary) < self.canary:
+                canary.append(targetObj)
+                hosts.add(host)
+        for targetObj in soonest:
+            if len(canary) >= self.canary:
+                break
+            if targetObj not in canary:
+                canary.append(targetObj)
+        return [canary, [targetObj for targetObj in target_objects
+                         if targetObj not in canary]]
+
+    def summary(self):
+        """Return a one line description of the slot waits"""
+
+        return ' ; '.join(["%s slots waited %.1fs" % (kind,
+                                                      self.waited[kind])
+                           for kind in SLOT_KINDS])
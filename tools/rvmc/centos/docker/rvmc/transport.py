@@ -0,0 +1,814 @@
+###############################################################################
+#
+# Copyright (c) 2019-2020 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish Virtual Media Controller transports"""
+
+###############################################################################
+#
+# A transport carries the Redfish http requests of one BMC. Both
+# transports offer the same coroutine interface to the stage engine.
+#
+#   connect()                       ... verify the BMC is serving https
+#   request(method, path, body,...) ... issue a request ; returns response
+#   login(path)                     ... create an X-Auth-Token session
+#   logout()                        ... delete the session
+#   session_token()                 ... the session's token and uri
+#   resume_session(token, uri, path) .. use a session created earlier
+#
+# With 'renew' set, a request that gets a 401 because its session
+# expired creates a new session and is sent again once.
+#
+# The asyncio transport can also open a Redfish Server Sent Event stream
+#
+#   open_event_stream(path)         ... returns a RedfishEventStream
+#
+# It keeps its requests' connections alive in a small per BMC pool and
+# resumes the BMC's TLS session when it opens a new one, because some
+# BMCs take seconds per full TLS handshake. Its 'stats' counts the
+# connections it opened against the requests it sent.
+#
+#   close()                         ... close the pooled connections
+#
+# Each transport calls its 'observer', if set, after every request with
+# its method, path, status (None if it failed), response bytes and
+# monotonic latency in seconds. Its 'recorder', if set, is handed every
+# request, with its reply or error, and the connect check ; see
+# rvmc.cassette.
+#
+# The Redfish Python Library is only imported when its transport is
+# used ; it takes longer to import than all the rest of this tool.
+#
+###############################################################################
+
+import asyncio
+import json
+import ssl
+import time
+
+from urllib.parse import urlsplit
+
+from rvmc import VERSION_MAJOR
+from rvmc import VERSION_MINOR
+from rvmc.log import dlog1
+from rvmc.log import dlog2
+from rvmc.log import dlog3
+
+# Constants
+# ---------
+REDFISH_ROOT_PATH = '/redfish/v1'
+
+REDFISH_SESSIONS_PATH = REDFISH_ROOT_PATH + '/SessionService/Sessions'
+
+# headers for each request type
+HDR_CONTENT_TYPE = {'Content-Type': 'application/json'}
+HDR_ACCEPT = {'Accept': 'application/json'}
+
+# they all happen to be the same right now
+GET_HEADERS = dict(HDR_CONTENT_TYPE, **HDR_ACCEPT)
+POST_HEADERS = dict(HDR_CONTENT_TYPE, **HDR_ACCEPT)
+PATCH_HEADERS = dict(HDR_CONTENT_TYPE, **HDR_ACCEPT)
+
+# HTTP request types ; only 3 are required by this tool ; plus the
+# session logout DELETE that the transport issues
+POST = 'POST'
+GET = 'GET'
+PATCH = 'PATCH'
+DELETE = 'DELETE'
+
+# the pseudo method the connect check is recorded as
+CONNECT = 'CONNECT'
+
+# HTTPS port of the BMC's Redfish service
+REDFISH_PORT = 443
+
+# max seconds to wait for a connection or a complete http response
+HTTP_TIMEOUT_SECS = 60
+
+# Connection pool: the max number of request connections to one BMC
+# and the max seconds a connection may sit idle in the pool. BMCs drop
+# connections that are idle for about 10 seconds ; retire them first.
+POOL_MAX_CONNECTIONS = 2
+POOL_IDLE_SECS = 8
+
+
+class LoginFailed(ConnectionError):
+    """A session create request was refused ; 'response' is the reply"""
+
+    def __init__(self, response):
+        super(LoginFailed, self).__init__(
+            "session create failed ; HTTP %d" % response.status)
+        self.response = response
+
+
+class NoReply(ConnectionAbortedError):
+    """The BMC closed the connection before any byte of its reply"""
+
+
+class RedfishResponse(object):
+    """
+    Redfish http response.
+
+    Offers the same status, read, dict and getheader() members as the
+    Redfish Python Library's response object that this tool was
+    written against.
+    """
+
+    __slots__ = ('status', 'headers', 'read', '_dict')
+
+    def __init__(self, status, headers, read):
+        self.status = status
+        self.headers = headers      # header dictionary ; lower case names
+        self.read = read            # response body text
+        self._dict = None
+
+    @property
+    def dict(self):
+        """Return the response body as a dictionary ; None if not json"""
+
+        if self._dict is None and self.read:
+            try:
+                self._dict = json.loads(self.read)
+            except ValueError:
+                return None
+        return self._dict
+
+    def getheader(self, name):
+        """Return the value of header 'name' ; None if not present"""
+
+        return self.headers.get(name.lower())
+
+    def __str__(self):
+        return "%d %s" % (self.status, self.read)
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """
+    SSL context that resumes its last TLS session.
+
+    asyncio creates each connection's SSL object through wrap_bio()
+    without a session argument ; inject the one learned from the
+    previous connection to the same BMC.
+    """
+
+    tls_session = None
+
+    # pylint: disable=arguments-differ
+    def wrap_bio(self, incoming, outgoing, server_side=False,
+                 server_hostname=None, session=None):
+        if session is None and not server_side:
+            session = self.tls_session
+        return super().wrap_bio(incoming, outgoing,
+                                server_side=server_side,
+                                server_hostname=server_hostname,
+                                session=session)
+
+
+class TransportStats(object):
+    """
+    Connection reuse counters of one transport
+    """
+
+    def __init__(self):
+        self.connections = 0    # connections opened
+        self.resumed = 0        # ... of which resumed a TLS session
+        self.requests = 0       # requests sent
+        self.reconnects = 0     # requests resent after a stale connection
+
+    def __str__(self):
+        return ("%d requests over %d connections "
+                "(%d TLS resumed ; %d stale reconnects)" %
+                (self.requests, self.connections,
+                 self.resumed, self.reconnects))
+
+
+class PooledConnection(object):
+    """
+    One keep-alive connection to a BMC
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.reused = False          # True once it served a request
+        self.idle_since = time.monotonic()
+        self.idle_secs = POOL_IDLE_SECS
+
+    def expired(self):
+        """Return True if the connection can no longer be trusted"""
+
+        return self.reader.at_eof() or \
+            time.monotonic() - self.idle_since >= self.idle_secs
+
+    def close(self):
+        """Close the connection"""
+
+        self.writer.close()
+
+
+class AsyncRedfishTransport(object):
+    """
+    asyncio native Redfish HTTP/1.1 over TLS transport for one BMC.
+
+    Needs no threads, so a single process can drive hundreds of BMCs.
+    """
+
+    def __init__(self, address, username, password, port=REDFISH_PORT):
+        """
+        :param address: bmc ip address ; IPv6 addresses enclosed in []
+        :type address: str.
+        :param username: bmc username
+        :type username: str.
+        :param password: decoded bmc password
+        :type password: str.
+        :param port: bmc Redfish https port
+        :type port: int
+        """
+
+        # The [] of an IPv6 address are only used in the Host header
+        self.host = address.strip('[]')
+        self.host_header = address
+        if port != REDFISH_PORT:
+            self.host_header = "%s:%d" % (address, port)
+        self.port = port
+        self.username = username
+        self.password = password
+        self.session_key = None         # X-Auth-Token of the open session
+        self.session_location = None    # URI of the open session
+        self.sessions_path = None       # where the session was created
+        self.renew = False              # True to renew it on a 401
+        self.stats = TransportStats()
+        self.observer = None            # request timing callback
+        self.recorder = None            # request recording cassette
+        self.monotonic = time.monotonic     # latency time source
+
+        # the connection pool ; created in the event loop on first use
+        self.idle = []                  # idle connections ; newest last
+        self.slots = None               # bounds the pool's connections
+
+        # BMCs serve self signed certificates
+        self.ssl_context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        self.ssl_context.check_hostname = False
+        self.ssl_context.verify_mode = ssl.CERT_NONE
+
+    async def _open(self):
+        """Open a TLS connection to the BMC ; resumes the last session"""
+
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port,
+                                    ssl=self.ssl_context),
+            HTTP_TIMEOUT_SECS)
+        self.stats.connections += 1
+        ssl_object = writer.get_extra_info('ssl_object')
+        if ssl_object is not None and ssl_object.session_reused:
+            self.stats.resumed += 1
+            dlog3("Transport   : resumed TLS session")
+        return reader, writer
+
+    def _save_tls_session(self, writer):
+        """Remember the connection's TLS session for the next _open"""
+
+        ssl_object = writer.get_extra_info('ssl_object')
+        if ssl_object is not None and ssl_object.session is not None:
+            self.ssl_context.tls_session = ssl_object.session
+
+    async def _acquire(self):
+        """
+        Return a pooled connection ; reuse the newest idle connection
+        that has not expired, otherwise open a new one.
+        """
+
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(POOL_MAX_CONNECTIONS)
+        await self.slots.acquire()
+        try:
+            while self.idle:
+                connection = self.idle.pop()
+                if not connection.expired():
+                    connection.reused = True
+                    return connection
+                dlog3("Transport   : dropped idle connection")
+                connection.close()
+            reader, writer = await self._open()
+            return PooledConnection(reader, writer)
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def _release(self, connection, keep_alive):
+        """
+        Return a connection to the pool, or close it.
+
+        :param connection: the connection
+        :type connection: PooledConnection
+        :param keep_alive: True if it can carry another request
+        :type keep_alive: bool
+        """
+
+        self._save_tls_session(connection.writer)
+        if keep_alive:
+            connection.idle_since = time.monotonic()
+            self.idle.append(connection)
+        else:
+            connection.close()
+        self.slots.release()
+
+    def close(self):
+        """Close all idle pooled connections"""
+
+        while self.idle:
+            self.idle.pop().close()
+
+    async def connect(self):
+        """
+        Verify the BMC accepts TLS connections on its Redfish port.
+
+        The connection becomes the pool's first.
+        """
+
+        start_time = self.monotonic()
+        try:
+            connection = await self._acquire()
+        except BaseException as ex:
+            if self.recorder is not None:
+                self.recorder.record(CONNECT, '', None, None, ex,
+                                     self.monotonic() - start_time)
+            raise
+        self._release(connection, True)
+        if self.recorder is not None:
+            self.recorder.record(CONNECT, '', None, None, None,
+                                 self.monotonic() - start_time)
+
+    def _encode(self, method, path, body, headers):
+        """Return the encoded http request"""
+
+        request_headers = {'Host': self.host_header,
+                           'User-Agent': 'rvmc/%d.%d' %
+                                         (VERSION_MAJOR, VERSION_MINOR)}
+        if headers:
+            request_headers.update(headers)
+        if self.session_key:
+            request_headers['X-Auth-Token'] = self.session_key
+
+        data = b''
+        if body is not None:
+            data = json.dumps(body).encode('utf-8')
+        if data or method in [POST, PATCH]:
+            request_headers['Content-Length'] = str(len(data))
+
+        lines = ['%s %s HTTP/1.1' % (method, path)]
+        for name, value in request_headers.items():
+            lines.append('%s: %s' % (name, value))
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + data
+
+    @staticmethod
+    async def read_head(reader):
+        """
+        Read the status line and headers of one http response
+
+        :returns (version, status, header dictionary)
+        """
+
+        try:
+            status_line = await reader.readline()
+        except (ConnectionResetError, BrokenPipeError) as ex:
+            raise NoReply("connection reset by BMC") from ex
+        if not status_line:
+            raise NoReply("connection closed by BMC")
+        try:
+            version = status_line.split()[0].decode('latin-1')
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError) as ex:
+            raise ConnectionError("invalid status line %r" %
+                                  status_line) from ex
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in [b'\r\n', b'\n', b'']:
+                break
+            name, _sep, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return version, status, headers
+
+    @staticmethod
+    async def read_chunk(reader):
+        """Read one chunk of a chunked body ; b'' after the last chunk"""
+
+        size_line = await reader.readline()
+        size = int(size_line.split(b';')[0].strip() or b'0', 16)
+        if size == 0:
+            # skip trailers
+            while await reader.readline() not in [b'\r\n', b'\n', b'']:
+                pass
+            return b''
+        chunk = await reader.readexactly(size)
+        await reader.readline()
+        return chunk
+
+    async def _read_response(self, reader, method):
+        """
+        Read one http response.
+
+        :returns (RedfishResponse, True if the connection can be reused)
+        """
+
+        version, status, headers = await self.read_head(reader)
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.0':
+            keep_alive = connection == 'keep-alive'
+        else:
+            keep_alive = connection != 'close'
+
+        if method == 'HEAD' or status in [204, 304] or status < 200:
+            body = b''
+        elif 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                chunk = await self.read_chunk(reader)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            # body ends when the BMC closes the connection
+            body = await reader.read()
+            keep_alive = False
+
+        return (RedfishResponse(status, headers,
+                                body.decode('utf-8', 'replace')),
+                keep_alive)
+
+    @staticmethod
+    def _idle_secs(response):
+        """Return how long the BMC will keep the connection idle"""
+
+        # Keep-Alive: timeout=5, max=100
+        for param in response.headers.get('keep-alive', '').split(','):
+            name, _sep, value = param.partition('=')
+            if name.strip().lower() == 'timeout':
+                try:
+                    return min(POOL_IDLE_SECS, max(int(value) - 1, 0))
+                except ValueError:
+                    break
+        return POOL_IDLE_SECS
+
+    async def request(self, method, path, body=None, headers=None):
+        """
+        Issue one http request.
+
+        :param method: http method
+        :type method: str.
+        :param path: request path
+        :type path: str.
+        :param body: json request body
+        :type body: dictionary
+        :param headers: additional request headers
+        :type headers: dictionary
+        :returns RedfishResponse
+        """
+
+        response = await self._observed(method, path, body, headers)
+        if response.status == 401 and self.renew is True and \
+                self.session_key and path != self.sessions_path:
+            dlog1("Session     : expired (HTTP 401) ; renewing")
+            self.session_key = None
+            await self.login(self.sessions_path)
+            response = await self._observed(method, path, body, headers)
+        return response
+
+    async def _observed(self, method, path, body, headers):
+        """Issue one http request and pass its timing to the observer"""
+
+        start_time = self.monotonic()
+        try:
+            response = await self._request(method, path, body, headers)
+        except BaseException as ex:
+            seconds = self.monotonic() - start_time
+            if self.observer is not None:
+                self.observer(method, path, None, 0, seconds)
+            if self.recorder is not None:
+                self.recorder.record(method, path, body, None, ex, seconds)
+            raise
+        seconds = self.monotonic() - start_time
+        if self.observer is not None:
+            self.observer(method, path, response.status,
+                          len(response.read), seconds)
+        if self.recorder is not None:
+            self.recorder.record(method, path, body, response, None,
+                                 seconds)
+        return response
+
+    async def _request(self, method, path, body, headers):
+        """Issue one http request over a pooled connection"""
+
+        data = self._encode(method, path, body, headers)
+        self.stats.requests += 1
+        while True:
+            connection = await self._acquire()
+            keep_alive = False
+            try:
+                connection.writer.write(data)
+                response, keep_alive = await asyncio.wait_for(
+                    self._read_response(connection.reader, method),
+                    HTTP_TIMEOUT_SECS)
+                connection.idle_secs = self._idle_secs(response)
+            except NoReply as ex:
+                # The BMC may have closed a reused idle connection just
+                # as it was used ; it sent no byte of a reply, so it
+                # closed it before reading the request. Resend it over a
+                # new connection. A reply that was cut short is raised
+                # instead ; the BMC processed that request, and a POST
+                # or PATCH must not be repeated.
+                if connection.reused is False:
+                    raise
+                self.stats.reconnects += 1
+                dlog2("Transport   : stale connection (%s) ; reconnect" %
+                      ex)
+                continue
+            finally:
+                self._release(connection, keep_alive)
+
+            return response
+
+    async def open_event_stream(self, path):
+        """
+        Open a Redfish Server Sent Event stream on its own connection.
+
+        :param path: the EventService ServerSentEventUri
+        :type path: str.
+        :returns RedfishEventStream
+        """
+
+        reader, writer = await self._open()
+        try:
+            writer.write(self._encode(GET, path, None,
+                                      {'Accept': 'text/event-stream'}))
+            _version, status, headers = await asyncio.wait_for(
+                self.read_head(reader), HTTP_TIMEOUT_SECS)
+        except Exception:
+            writer.close()
+            raise
+        if status != 200:
+            writer.close()
+            raise ConnectionError("event stream request failed ; HTTP %d" %
+                                  status)
+        chunked = 'chunked' in headers.get('transfer-encoding', '').lower()
+        return RedfishEventStream(self, reader, writer, chunked)
+
+    async def login(self, path=None):
+        """
+        Create an X-Auth-Token session.
+
+        :param path: the SessionService Sessions collection path
+        :type path: str.
+        """
+
+        if path is None:
+            path = REDFISH_SESSIONS_PATH
+        self.sessions_path = path
+        response = await self.request(POST, path,
+                                      body={'UserName': self.username,
+                                            'Password': self.password},
+                                      headers=POST_HEADERS)
+        token = response.getheader('X-Auth-Token')
+        if response.status not in [200, 201, 202, 204] or not token:
+            raise LoginFailed(response)
+        self.session_key = token
+        location = response.getheader('Location')
+        if location:
+            # may be an absolute url ; only the path is needed
+            location = urlsplit(location).path
+        self.session_location = location
+
+    def session_token(self):
+        """Return the open session's X-Auth-Token and URI"""
+
+        return self.session_key, self.session_location
+
+    def resume_session(self, token, location, path=None):
+        """
+        Use an X-Auth-Token session created by an earlier login.
+
+        :param token: the session's X-Auth-Token
+        :type token: str.
+        :param location: the session's URI
+        :type location: str.
+        :param path: the SessionService Sessions collection path
+        :type path: str.
+        """
+
+        self.session_key = token
+        self.session_location = location
+        self.sessions_path = path or REDFISH_SESSIONS_PATH
+
+    async def logout(self):
+        """Delete the open session and close the pooled connections"""
+
+        location = self.session_location
+        self.session_location = None
+        try:
+            if location:
+                await self.request(DELETE, location)
+        finally:
+            self.session_key = None
+            self.close()
+
+
+class RedfishEventStream(object):
+    """
+    Redfish Server Sent Event (SSE) stream
+    """
+
+    def __init__(self, transport, reader, writer, chunked):
+        self.transport = transport
+        self.reader = reader
+        self.writer = writer
+        self.chunked = chunked
+        self.buffer = b''
+
+    async def _read(self):
+        """Read more of the stream ; b'' once it is closed"""
+
+        if self.chunked:
+            return await self.transport.read_chunk(self.reader)
+        return await self.reader.read(4096)
+
+    async def next_event(self):
+        """
+        Wait for the next event.
+
+        :returns the event's data field text ; None once the stream closed
+        """
+
+        while True:
+            index = self.buffer.find(b'\n\n')
+            if index >= 0:
+                block = self.buffer[:index]
+                self.buffer = self.buffer[index + 2:]
+                data = [line[5:].strip() for line in block.split(b'\n')
+                        if line.startswith(b'data:')]
+                if data:
+                    return b'\n'.join(data).decode('utf-8', 'replace')
+                # comment or keep-alive only block
+                continue
+
+            more = await self._read()
+            if not more:
+                return None
+            self.buffer += more.replace(b'\r\n', b'\n')
+
+    def close(self):
+        """Close the stream's connection"""
+
+        self.writer.close()
+
+
+class LibraryRedfishTransport(object):
+    """
+    Redfish Python Library transport for one BMC.
+
+    The library's blocking calls run in the event loop's default
+    thread pool executor.
+    """
+
+    def __init__(self, address, username, password, port=REDFISH_PORT):
+        """
+        :param address: bmc ip address ; IPv6 addresses enclosed in []
+        :type address: str.
+        :param username: bmc username
+        :type username: str.
+        :param password: decoded bmc password
+        :type password: str.
+        :param port: bmc Redfish https port
+        :type port: int
+        """
+
+        self.uri = "https://" + address
+        if port != REDFISH_PORT:
+            self.uri = "%s:%d" % (self.uri, port)
+        self.username = username
+        self.password = password
+        self.client = None
+        self.stats = None           # the library pools its own connections
+        self.observer = None        # request timing callback
+        self.recorder = None        # request recording cassette
+        self.monotonic = time.monotonic     # latency time source
+        self.renew = False          # True to renew the session on a 401
+
+    @staticmethod
+    async def _run(function, *args, **kwargs):
+        """Run a blocking library call in the executor"""
+
+        return await asyncio.get_event_loop().run_in_executor(
+            None, lambda: function(*args, **kwargs))
+
+    async def connect(self):
+        """Create the library client object ; queries the BMC"""
+
+        # Import Redfish Python Library
+        # Module: https://pypi.org/project/redfish/
+        import redfish
+
+        start_time = self.monotonic()
+        try:
+            self.client = await self._run(redfish.redfish_client,
+                                          base_url=self.uri,
+                                          username=self.username,
+                                          password=self.password,
+                                          default_prefix=REDFISH_ROOT_PATH)
+            if self.client is None:
+                raise ConnectionError("no redfish client object created")
+        except BaseException as ex:
+            if self.recorder is not None:
+                self.recorder.record(CONNECT, '', None, None, ex,
+                                     self.monotonic() - start_time)
+            raise
+        if self.recorder is not None:
+            self.recorder.record(CONNECT, '', None, None, None,
+                                 self.monotonic() - start_time)
+
+    async def request(self, method, path, body=None, headers=None):
+        """
+        Issue one http request.
+
+        :returns the library's response object
+        """
+
+        response = await self._observed(method, path, body, headers)
+        if response.status == 401 and self.renew is True and \
+                self.client.get_session_key():
+            dlog1("Session     : expired (HTTP 401) ; renewing")
+            await self.login()
+            response = await self._observed(method, path, body, headers)
+        return response
+
+    async def _observed(self, method, path, body, headers):
+        """Issue one http request and pass its timing to the observer"""
+
+        start_time = self.monotonic()
+        try:
+            response = await self._request(method, path, body, headers)
+        except BaseException as ex:
+            seconds = self.monotonic() - start_time
+            if self.observer is not None:
+                self.observer(method, path, None, 0, seconds)
+            if self.recorder is not None:
+                self.recorder.record(method, path, body, None, ex, seconds)
+            raise
+        seconds = self.monotonic() - start_time
+        if self.observer is not None:
+            self.observer(method, path, response.status,
+                          len(response.read or ''), seconds)
+        if self.recorder is not None:
+            self.recorder.record(method, path, body, response, None,
+                                 seconds)
+        return response
+
+    async def _request(self, method, path, body, headers):
+        """Issue one http request through the library client"""
+
+        if method == GET:
+            return await self._run(self.client.get, path, headers=headers)
+        if method == POST:
+            return await self._run(self.client.post, path, body=body,
+                                   headers=headers)
+        if method == PATCH:
+            return await self._run(self.client.patch, path, body=body,
+                                   headers=headers)
+        if method == DELETE:
+            return await self._run(self.client.delete, path,
+                                   headers=headers)
+        raise ValueError("unsupported method %s" % method)
+
+    async def login(self, path=None):
+        """Create a session ; the library finds the sessions path itself"""
+
+        await self._run(self.client.login, auth="session")
+
+    def session_token(self):
+        """Return the open session's X-Auth-Token and URI"""
+
+        location = self.client.get_session_location()
+        if location:
+            location = urlsplit(location).path
+        return self.client.get_session_key(), location
+
+    def resume_session(self, token, location, path=None):
+        """Use an X-Auth-Token session created by an earlier login"""
+
+        self.client.set_session_key(token)
+        self.client.set_session_location(location)
+
+    async def logout(self):
+        """Delete the open session"""
+
+        await self._run(self.client.logout)
+
+    def close(self):
+        """Nothing to close ; the library owns its connections"""
@@ -0,0 +1,917 @@
+#!/usr/bin/python3
+###############################################################################
+#
+# Copyright (c) 2026 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+"""Redfish BMC Simulator"""
+
+###############################################################################
+#
+# This Redfish BMC Simulator implements the subset of the Redfish service
+# that the Redfish Virtual Media Controller (rvmc) uses so that rvmc can
+# be exercised, benchmarked and regression tested without real BMCs.
+#
+# Each virtual BMC is an independent Redfish service with its own
+# listening socket, sessions, virtual media, power and boot state.
+# Thousands of them can be served from a single process either on
+# consecutive localhost ports or on a range of IP aliases.
+#
+# Resources served
+#
+#     /redfish/v1                                     ... ServiceRoot
+#     /redfish/v1/SessionService/Sessions[/<id>]      ... session login/out
+#     /redfish/v1/Managers[/1]                        ... Managers
+#     /redfish/v1/Managers/1/VirtualMedia[/<id>]      ... Virtual Media
+#         .../Actions/VirtualMedia.InsertMedia        ... Insert action
+#         .../Actions/VirtualMedia.EjectMedia         ... Eject action
+#     /redfish/v1/Systems[/1]                         ... Systems ; Boot PATCH
+#         .../Actions/ComputerSystem.Reset            ... Reset action
+#     /redfish/v1/TaskService/TaskMonitors/<id>       ... 'task-monitor' quirk
+#     /redfish/v1/EventService[/SSE]                  ... 'sse' quirk
+#
+# GET requests honor the $expand=.($levels=n) (up to 3 levels) and
+# $select=<properties> query parameters unless the 'no-expand' quirk
+# is set.
+#
+# Calling Sequence:
+#
+#    Serve 100 BMCs on 127.0.0.1 ports 9000..9099 and write a matching
+#    rvmc multi target config file ; each target gets a 'bmc_port'.
+#
+#    > redfish_simulator.py --count 100 --base-port 9000 \
+#          --write-config /tmp/rvmc.yaml \
+#          --image http://127.0.0.1:8080/iso/bootimage.iso
+#
+#    Serve 50 BMCs on IP aliases 127.0.1.1 .. 127.0.1.50 port 443.
+#    Linux routes all of 127.0.0.0/8 to the loopback device so these
+#    aliases need no setup ; other address ranges must be added to an
+#    interface first.
+#
+#    > redfish_simulator.py --count 50 --address 127.0.1.1 --port 443
+#
+#    Each BMC serves https with a generated self signed certificate
+#    unless --tls-cert/--tls-key name one or --plain-http is given.
+#    The open file limit is raised to its hard limit so thousands of
+#    BMCs can listen at once.
+#
+#    --latency <secs>        ... per request latency
+#    --latency-jitter <secs> ... random additional per request latency
+#    --mount-delay <secs>    ... time for an inserted image to be mounted
+#    --power-delay <secs>    ... time for a power state transition
+#    --session-delay <secs>  ... additional session create latency
+#    --session-timeout <secs> .. idle session expiry ; 0 = never
+#    --error-rate <0..1>     ... probability of a 503 response to a request
+#    --drop-rate <0..1>      ... probability of dropping the connection
+#    --vendor <name>         ... vendor personality ; see VENDORS below
+#                                ; 'mixed' cycles through all of them
+#    --quirks <list>         ... comma delimited quirk list ; see QUIRKS
+#
+###############################################################################
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import signal
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from resource import getrlimit
+from resource import RLIMIT_NOFILE
+from resource import setrlimit
+from urllib.parse import parse_qsl
+
+
+FEATURE_NAME = 'Redfish BMC Simulator'
+VERSION_MAJOR = 1
+VERSION_MINOR = 0
+
+REDFISH_ROOT_PATH = '/redfish/v1'
+SESSIONS_PATH = REDFISH_ROOT_PATH + '/SessionService/Sessions'
+MANAGERS_PATH = REDFISH_ROOT_PATH + '/Managers'
+MANAGER_PATH = MANAGERS_PATH + '/1'
+VM_GROUP_PATH = MANAGER_PATH + '/VirtualMedia'
+SYSTEMS_PATH = REDFISH_ROOT_PATH + '/Systems'
+SYSTEM_PATH = SYSTEMS_PATH + '/1'
+RESET_PATH = SYSTEM_PATH + '/Actions/ComputerSystem.Reset'
+TASK_MONITOR_PATH = REDFISH_ROOT_PATH + '/TaskService/TaskMonitors'
+EVENT_SERVICE_PATH = REDFISH_ROOT_PATH + '/EventService'
+SSE_PATH = EVENT_SERVICE_PATH + '/SSE'
+
+POWER_ON = 'On'
+POWER_OFF = 'Off'
+
+# Vendor personalities ; what the ServiceRoot and ComputerSystem report
+VENDORS = {
+    'generic': {'Vendor': 'Simulated', 'Product': 'Redfish BMC',
+                'Manufacturer': 'Simulated', 'Model': 'Generic'},
+    'dell': {'Vendor': 'Dell', 'Product': 'Integrated Dell Remote Access '
+             'Controller', 'Manufacturer': 'Dell Inc.',
+             'Model': 'PowerEdge R740'},
+    'hpe': {'Vendor': 'HPE', 'Product': 'ProLiant DL380 Gen10',
+            'Manufacturer': 'HPE', 'Model': 'ProLiant DL380 Gen10'},
+    'supermicro': {'Vendor': 'Supermicro', 'Product': 'X11DPi',
+                   'Manufacturer': 'Supermicro', 'Model': 'SYS-1029P'},
+}
+
+# Supported vendor quirks
+#
+#   trailing-slash  ... all @odata.id links end with a '/'
+#   multi-vm        ... a floppy/usb virtual media member precedes the CD
+#   no-boot-modes   ... no BootSourceOverrideMode allowable values published
+#   legacy-only     ... only Legacy boot override mode is supported
+#   eject-empty-400 ... ejecting an empty device returns a 400
+#   task-monitor    ... actions return 202 with a Task Monitor Location
+#   sse             ... EventService with a ServerSentEventUri is published
+#   no-keepalive    ... the connection is closed after each response
+#   idle-close      ... idle keep-alive connections are closed after 10 secs
+#   no-expand       ... $expand and $select are not supported
+QUIRKS = ['trailing-slash', 'multi-vm', 'no-boot-modes', 'legacy-only',
+          'eject-empty-400', 'task-monitor', 'sse', 'no-keepalive',
+          'idle-close', 'no-expand']
+
+# max $expand levels ; deeper requests are rejected
+EXPAND_MAX_LEVELS = 3
+
+IDLE_CLOSE_SECS = 10
+
+HTTP_REASONS = {200: 'OK', 201: 'Created', 202: 'Accepted',
+                204: 'No Content', 400: 'Bad Request', 401: 'Unauthorized',
+                404: 'Not Found', 405: 'Method Not Allowed',
+                503: 'Service Unavailable'}
+
+
+def error_body(message):
+    """Redfish style error response body"""
+
+    return {'error': {'code': 'Base.1.0.GeneralError',
+                      'message': message}}
+
+
+class VirtualBmc(object):
+    """
+    A single simulated BMC ; one Redfish service with its own state
+    """
+
+    def __init__(self, index, address, port, options):
+
+        self.index = index
+        self.address = address
+        self.port = port
+        self.options = options
+        self.quirks = options.quirk_set
+        if options.vendor == 'mixed':
+            names = sorted(VENDORS.keys())
+            self.vendor = VENDORS[names[index % len(names)]]
+        else:
+            self.vendor = VENDORS[options.vendor]
+        self.uuid = str(uuid.uuid5(uuid.NAMESPACE_URL,
+                                   '%s:%d' % (address, port)))
+        self.sessions = {}          # token -> session id
+        self.session_used = {}      # token -> monotonic time last used
+        self.next_session = 1
+        self.tasks = {}             # task id -> completion time
+        self.next_task = 1
+        self.subscribers = []       # sse listener queues
+        self.server = None
+
+        # host state
+        self.power_state = POWER_ON
+        self.inserted = False
+        self.image = None
+        self.boot = {'BootSourceOverrideEnabled': 'Disabled',
+                     'BootSourceOverrideTarget': 'None',
+                     'BootSourceOverrideMode': 'UEFI'}
+
+        # statistics
+        self.requests = 0
+        self.connections = 0
+        self.errors_injected = 0
+
+    def link(self, path):
+        """Return an @odata.id link dictionary honoring quirks"""
+
+        if 'trailing-slash' in self.quirks:
+            path = path + '/'
+        return {'@odata.id': path}
+
+    def vm_members(self):
+        """Return the list of virtual media member ids"""
+
+        if 'multi-vm' in self.quirks:
+            return ['1', '2']
+        return ['2']
+
+    def notify(self, origin):
+        """Post a ResourceChanged event to all SSE listeners"""
+
+        event = {'EventType': 'ResourceChanged',
+                 'Events': [{'EventType': 'ResourceChanged',
+                             'OriginOfCondition': {'@odata.id': origin},
+                             'EventTimestamp': time.strftime(
+                                 '%Y-%m-%dT%H:%M:%SZ', time.gmtime())}]}
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+
+    def later(self, delay, callback, *args):
+        """Run a state change after the configured delay"""
+
+        asyncio.get_event_loop().call_later(delay, callback, *args)
+
+    def action_response(self, delay):
+        """
+        Return the response to an accepted action. With the task-monitor
+        quirk a 202 with a Task Monitor Location header is returned.
+        """
+
+        if 'task-monitor' in self.quirks:
+            task_id = str(self.next_task)
+            self.next_task += 1
+            self.tasks[task_id] = time.monotonic() + delay
+            return 202, {}, {'Location': TASK_MONITOR_PATH + '/' + task_id}
+        return 204, None, {}
+
+    ###########################################################################
+    # State changes
+    ###########################################################################
+    def _mount(self, image):
+        """The inserted image is now mounted"""
+
+        self.image = image
+        self.notify(VM_GROUP_PATH + '/2')
+
+    def _unmount(self):
+        """The ejected image is now removed"""
+
+        self.inserted = False
+        self.image = None
+        self.notify(VM_GROUP_PATH + '/2')
+
+    def _power(self, state):
+        """The power state transition completed"""
+
+        self.power_state = state
+        if state == POWER_ON and \
+                self.boot['BootSourceOverrideEnabled'] == 'Once':
+            # the override is consumed by the next boot
+            self.later(self.options.power_delay, self._consume_override)
+        self.notify(SYSTEM_PATH)
+
+    def _consume_override(self):
+        """The next boot consumed the one time boot override"""
+
+        self.boot['BootSourceOverrideEnabled'] = 'Disabled'
+        self.notify(SYSTEM_PATH)
+
+    ###########################################################################
+    # Resources
+    ###########################################################################
+    def service_root(self):
+        """ServiceRoot resource"""
+
+        root = {'@odata.id': REDFISH_ROOT_PATH,
+                '@odata.type': '#ServiceRoot.v1_5_0.ServiceRoot',
+                'Id': 'RootService',
+                'Name': 'Root Service',
+                'RedfishVersion': '1.6.0',
+                'UUID': self.uuid,
+                'Vendor': self.vendor['Vendor'],
+                'Product': self.vendor['Product'],
+                'Systems': self.link(SYSTEMS_PATH),
+                'Managers': self.link(MANAGERS_PATH),
+                'SessionService': self.link(
+                    REDFISH_ROOT_PATH + '/SessionService'),
+                'Links': {'Sessions': self.link(SESSIONS_PATH)}}
+        if 'sse' in self.quirks:
+            root['EventService'] = self.link(EVENT_SERVICE_PATH)
+        if 'no-expand' not in self.quirks:
+            root['ProtocolFeaturesSupported'] = {
+                'ExpandQuery': {'ExpandAll': True, 'Levels': True,
+                                'Links': True, 'NoLinks': True,
+                                'MaxLevels': EXPAND_MAX_LEVELS},
+                'SelectQuery': True}
+        return root
+
+    def virtual_media(self, vm_id):
+        """VirtualMedia member resource"""
+
+        path = VM_GROUP_PATH + '/' + vm_id
+        if vm_id == '1':
+            return {'@odata.id': path,
+                    '@odata.type': '#VirtualMedia.v1_2_0.VirtualMedia',
+                    'Id': vm_id,
+                    'Name': 'Virtual Removable Media',
+                    'MediaTypes': ['Floppy', 'USBStick'],
+                    'Inserted': False,
+                    'Image': None}
+        actions = path + '/Actions/VirtualMedia.'
+        return {'@odata.id': path,
+                '@odata.type': '#VirtualMedia.v1_2_0.VirtualMedia',
+                'Id': vm_id,
+                'Name': 'Virtual CD',
+                'MediaTypes': ['CD', 'DVD'],
+                'Image': self.image,
+                'ImageName': os.path.basename(self.image)
+                if self.image else None,
+                'Inserted': self.inserted,
+                'WriteProtected': True,
+                'Actions': {
+                    '#VirtualMedia.EjectMedia':
+                        {'target': actions + 'EjectMedia'},
+                    '#VirtualMedia.InsertMedia':
+                        {'target': actions + 'InsertMedia'}}}
+
+    def system(self):
+        """ComputerSystem resource"""
+
+        boot = dict(self.boot)
+        boot['BootSourceOverrideTarget@Redfish.AllowableValues'] = \
+            ['None', 'Pxe', 'Cd', 'Hdd']
+        if 'legacy-only' in self.quirks:
+            boot['BootSourceOverrideMode'] = 'Legacy'
+            boot['BootSourceOverrideMode@Redfish.AllowableValues'] = \
+                ['Legacy']
+        elif 'no-boot-modes' in self.quirks:
+            del boot['BootSourceOverrideMode']
+        else:
+            boot['BootSourceOverrideMode@Redfish.AllowableValues'] = \
+                ['UEFI', 'Legacy']
+        return {'@odata.id': SYSTEM_PATH,
+                '@odata.type': '#ComputerSystem.v1_5_0.ComputerSystem',
+                'Id': '1',
+                'Manufacturer': self.vendor['Manufacturer'],
+                'Model': self.vendor['Model'],
+                'UUID': self.uuid,
+                'PowerState': self.power_state,
+                'Boot': boot,
+                'Actions': {
+                    '#ComputerSystem.Reset': {
+                        'target': RESET_PATH,
+                        'ResetType@Redfish.AllowableValues':
+                            ['On', 'ForceOff', 'GracefulShutdown',
+                             'ForceRestart', 'PushPowerButton']}}}
+
+    def collection(self, path, members):
+        """Resource collection"""
+
+        return {'@odata.id': path,
+                'Members': [self.link(member) for member in members],
+                'Members@odata.count': len(members)}
+
+    ###########################################################################
+    # Request handling
+    ###########################################################################
+    def authorized(self, headers):
+        """Return True if the request carries valid credentials"""
+
+        token = headers.get('x-auth-token')
+        if token in self.sessions:
+            now = time.monotonic()
+            if self.options.session_timeout and \
+                    now - self.session_used[token] > \
+                    self.options.session_timeout:
+                del self.sessions[token]
+                del self.session_used[token]
+                return False
+            self.session_used[token] = now
+            return True
+        auth = headers.get('authorization', '')
+        if auth.startswith('Basic '):
+            try:
+                user, pw = base64.b64decode(auth[6:]).decode().split(':', 1)
+            except Exception:
+                return False
+            return user == self.options.username and \
+                pw == self.options.password
+        return False
+
+    def handle(self, method, path, headers, body):
+        """
+        Handle one request.
+
+        :returns (status, body dictionary or None, extra headers)
+        """
+
+        path, _sep, query = path.partition('?')
+        if path != '/' and path.endswith('/'):
+            path = path[:-1]
+
+        if path == REDFISH_ROOT_PATH and method == 'GET':
+            return 200, self.service_root(), {}
+
+        if path == SESSIONS_PATH and method == 'POST':
+            if body.get('UserName') != self.options.username or \
+                    body.get('Password') != self.options.password:
+                return 401, error_body('Invalid credentials'), {}
+            token = uuid.uuid4().hex
+            session_id = str(self.next_session)
+            self.next_session += 1
+            self.sessions[token] = session_id
+            self.session_used[token] = time.monotonic()
+            location = SESSIONS_PATH + '/' + session_id
+            return 201, {'@odata.id': location, 'Id': session_id,
+                         'UserName': self.options.username}, \
+                {'X-Auth-Token': token, 'Location': location}
+
+        if not self.authorized(headers):
+            return 401, error_body('Authentication required'), {}
+
+        if path.startswith(SESSIONS_PATH + '/'):
+            session_id = path.rsplit('/', 1)[1]
+            tokens = [k for k, v in self.sessions.items() if v == session_id]
+            if not tokens:
+                return 404, error_body('No such session'), {}
+            if method == 'DELETE':
+                del self.sessions[tokens[0]]
+                del self.session_used[tokens[0]]
+                return 204, None, {}
+            return 200, {'@odata.id': path, 'Id': session_id,
+                         'UserName': self.options.username}, {}
+
+        if method == 'GET':
+            if query and 'no-expand' not in self.quirks:
+                return self.handle_query(path, query)
+            return self.handle_get(path)
+        if method == 'POST':
+            return self.handle_post(path, body)
+        if method == 'PATCH':
+            return self.handle_patch(path, body)
+        return 405, error_body('Method not allowed'), {}
+
+    def handle_get(self, path):
+        """Handle a GET request"""
+
+        if path == MANAGERS_PATH:
+            return 200, self.collection(path, [MANAGER_PATH]), {}
+        if path == MANAGER_PATH:
+            return 200, {'@odata.id': path,
+                         '@odata.type': '#Manager.v1_3_0.Manager',
+                         'Id': '1',
+                         'VirtualMedia': self.link(VM_GROUP_PATH)}, {}
+        if path == VM_GROUP_PATH:
+            members = [VM_GROUP_PATH + '/' + m for m in self.vm_members()]
+            return 200, self.collection(path, members), {}
+        if path.startswith(VM_GROUP_PATH + '/'):
+            vm_id = path[len(VM_GROUP_PATH) + 1:]
+            if vm_id in self.vm_members():
+                return 200, self.virtual_media(vm_id), {}
+        if path == SYSTEMS_PATH:
+            return 200, self.collection(path, [SYSTEM_PATH]), {}
+        if path == SYSTEM_PATH:
+            return 200, self.system(), {}
+        if path.startswith(TASK_MONITOR_PATH + '/'):
+            task_id = path.rsplit('/', 1)[1]
+            if task_id not in self.tasks:
+                return 404, error_body('No such task'), {}
+            if time.monotonic() < self.tasks[task_id]:
+                return 202, {'TaskState': 'Running'}, {'Retry-After': '1'}
+            del self.tasks[task_id]
+            return 204, None, {}
+        if path == EVENT_SERVICE_PATH and 'sse' in self.quirks:
+            return 200, {'@odata.id': path,
+                         'ServiceEnabled': True,
+                         'ServerSentEventUri': SSE_PATH}, {}
+        return 404, error_body('Resource not found'), {}
+
+    def handle_query(self, path, query):
+        """Handle a GET request with $expand and/or $select parameters"""
+
+        params = dict(parse_qsl(query))
+        status, resource, extra = self.handle_get(path)
+        if status != 200:
+            return status, resource, extra
+
+        expand = params.get('$expand')
+        if expand:
+            symbol = expand[0]
+            levels = 1
+            if expand[1:].startswith('($levels=') and expand.endswith(')'):
+                try:
+                    levels = int(expand[len('.($levels='):-1])
+                except ValueError:
+                    levels = 0
+            elif expand[1:]:
+                levels = 0
+            if symbol not in '.*~' or not 0 < levels <= EXPAND_MAX_LEVELS:
+                return 400, error_body('Unsupported $expand %s' % expand), {}
+            resource = self.expand(resource, levels, symbol)
+
+        select = params.get('$select')
+        if select:
+            names = select.split(',')
+            resource = dict((key, value) for key, value in resource.items()
+                            if key in names or key.startswith('@odata.'))
+        return 200, resource, extra
+
+    def expand(self, resource, levels, symbol):
+        """
+        Return a copy of a resource with its subordinate resource links
+        replaced by the resources ; 'levels' deep. The '.' symbol does
+        not expand the Links section.
+        """
+
+        def expand_link(link):
+            if not isinstance(link, dict) or list(link) != ['@odata.id']:
+                return link
+            status, linked, _extra = \
+                self.handle_get(link['@odata.id'].rstrip('/'))
+            if status != 200:
+                return link
+            return self.expand(linked, levels - 1, symbol)
+
+        if levels <= 0:
+            return resource
+        expanded = {}
+        for key, value in resource.items():
+            if key == 'Links' and symbol == '.':
+                expanded[key] = value
+            elif key == 'Members' and isinstance(value, list):
+                expanded[key] = [expand_link(member) for member in value]
+            else:
+                expanded[key] = expand_link(value)
+        return expanded
+
+    def handle_post(self, path, body):
+        """Handle a POST (action) request"""
+
+        if path == VM_GROUP_PATH + '/2/Actions/VirtualMedia.InsertMedia':
+            if self.inserted:
+                return 400, error_body('Media already inserted'), {}
+            image = body.get('Image')
+            if not image:
+                return 400, error_body('Image is required'), {}
+            self.inserted = True
+            self.later(self.options.mount_delay, self._mount, image)
+            return self.action_response(self.options.mount_delay)
+
+        if path == VM_GROUP_PATH + '/2/Actions/VirtualMedia.EjectMedia':
+            if not self.inserted and 'eject-empty-400' in self.quirks:
+                return 400, error_body('No media inserted'), {}
+            self.later(self.options.eject_delay, self._unmount)
+            return self.action_response(self.options.eject_delay)
+
+        if path == RESET_PATH:
+            reset_type = body.get('ResetType')
+            if reset_type in ['ForceOff', 'GracefulShutdown']:
+                state = POWER_OFF
+            elif reset_type in ['On', 'ForceOn']:
+                state = POWER_ON
+            elif reset_type in ['ForceRestart', 'PushPowerButton']:
+                state = POWER_ON
+            else:
+                return 400, error_body('Unsupported ResetType'), {}
+            if state == self.power_state and reset_type != 'ForceRestart':
+                return 400, error_body('Already powered %s' % state), {}
+            self.later(self.options.power_delay, self._power, state)
+            return self.action_response(self.options.power_delay)
+
+        return 404, error_body('Action not found'), {}
+
+    def handle_patch(self, path, body):
+        """Handle a PATCH request"""
+
+        if path != SYSTEM_PATH:
+            return 405, error_body('Resource is not patchable'), {}
+        boot = body.get('Boot', {})
+        mode = boot.get('BootSourceOverrideMode')
+        if mode is not None:
+            if 'no-boot-modes' in self.quirks or \
+                    ('legacy-only' in self.quirks and mode != 'Legacy'):
+                return 400, error_body('Unsupported override mode'), {}
+        for key in ['BootSourceOverrideEnabled',
+                    'BootSourceOverrideTarget',
+                    'BootSourceOverrideMode']:
+            if key in boot:
+                self.boot[key] = boot[key]
+        self.notify(SYSTEM_PATH)
+        return 204, None, {}
+
+    ###########################################################################
+    # HTTP protocol
+    ###########################################################################
+    async def serve_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one client connection"""
+
+        self.connections += 1
+        try:
+            while True:
+                timeout = None
+                if 'idle-close' in self.quirks:
+                    timeout = IDLE_CLOSE_SECS
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(),
+                                                          timeout)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                try:
+                    method, target, _version = \
+                        request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _sep, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                body = {}
+                if length:
+                    data = await reader.readexactly(length)
+                    try:
+                        body = json.loads(data.decode('utf-8'))
+                    except ValueError:
+                        body = {}
+                self.requests += 1
+
+                delay = self.options.latency
+                if self.options.latency_jitter:
+                    delay += random.uniform(0, self.options.latency_jitter)
+                if method == 'POST' and \
+                        target.split('?')[0].rstrip('/') == SESSIONS_PATH:
+                    delay += self.options.session_delay
+                if delay:
+                    await asyncio.sleep(delay)
+
+                if self.options.drop_rate and \
+                        random.random() < self.options.drop_rate:
+                    self.errors_injected += 1
+                    break
+
+                if target.split('?')[0].rstrip('/') == SSE_PATH and \
+                        'sse' in self.quirks and method == 'GET':
+                    if not self.authorized(headers):
+                        await self.respond(writer, 401,
+                                           error_body('Unauthorized'), {})
+                        continue
+                    await self.stream_events(writer)
+                    break
+
+                if self.options.error_rate and \
+                        random.random() < self.options.error_rate:
+                    self.errors_injected += 1
+                    status, resp, extra = \
+                        503, error_body('Service busy'), {'Retry-After': '1'}
+                else:
+                    status, resp, extra = self.handle(method, target,
+                                                      headers, body)
+
+                keep_alive = \
+                    headers.get('connection', '').lower() != 'close' and \
+                    'no-keepalive' not in self.quirks
+                await self.respond(writer, status, resp, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError,
+                ssl.SSLError, OSError):
+            pass
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def respond(self, writer, status, body, extra, keep_alive=True):
+        """Write one HTTP response"""
+
+        payload = b''
+        if body is not None and status != 204:
+            payload = json.dumps(body).encode('utf-8')
+        lines = ['HTTP/1.1 %d %s' % (status, HTTP_REASONS.get(status, '')),
+                 'Content-Length: %d' % len(payload),
+                 'Connection: %s' % ('keep-alive' if keep_alive else 'close'),
+                 'OData-Version: 4.0']
+        if payload:
+            lines.append('Content-Type: application/json')
+        for key, value in extra.items():
+            lines.append('%s: %s' % (key, value))
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') +
+                     payload)
+        await writer.drain()
+
+    async def stream_events(self, writer):
+        """Stream Server Sent Events until the client goes away"""
+
+        queue = asyncio.Queue()
+        self.subscribers.append(queue)
+        try:
+            writer.write(b'HTTP/1.1 200 OK\r\n'
+                         b'Content-Type: text/event-stream\r\n'
+                         b'Cache-Control: no-cache\r\n'
+                         b'Connection: close\r\n\r\n')
+            await writer.drain()
+            event_id = 0
+            while True:
+                event = await queue.get()
+                event_id += 1
+                writer.write(('id: %d\ndata: %s\n\n' %
+                              (event_id, json.dumps(event))).encode('utf-8'))
+                await writer.drain()
+        finally:
+            self.subscribers.remove(queue)
+
+    async def start(self, ssl_context):
+        """Start listening"""
+
+        self.server = await asyncio.start_server(self.serve_connection,
+                                                 self.address, self.port,
+                                                 ssl=ssl_context,
+                                                 backlog=128)
+
+
+def address_range(first, count):
+    """Return a list of count consecutive IPv4 addresses starting at first"""
+
+    octets = [int(octet) for octet in first.split('.')]
+    value = (octets[0] << 24) | (octets[1] << 16) | (octets[2] << 8) | \
+        octets[3]
+    addresses = []
+    for offset in range(count):
+        addr = value + offset
+        addresses.append('%d.%d.%d.%d' % ((addr >> 24) & 255,
+                                          (addr >> 16) & 255,
+                                          (addr >> 8) & 255, addr & 255))
+    return addresses
+
+
+def make_self_signed_cert(directory):
+    """Create a self signed certificate with the openssl command"""
+
+    cert = os.path.join(directory, 'simulator.crt')
+    key = os.path.join(directory, 'simulator.key')
+    subprocess.check_call(['openssl', 'req', '-x509', '-newkey', 'rsa:2048',
+                           '-nodes', '-days', '1', '-subj', '/CN=localhost',
+                           '-keyout', key, '-out', cert],
+                          stdout=subprocess.DEVNULL,
+                          stderr=subprocess.DEVNULL)
+    return cert, key
+
+
+def write_config(path, bmcs, options):
+    """Write an rvmc multi target config file for the simulated fleet"""
+
+    password = base64.b64encode(options.password.encode()).decode()
+    with open(path, 'w') as config:
+        config.write('virtual_media_iso:\n')
+        for bmc in bmcs:
+            config.write('    sim%d:\n' % bmc.index)
+            config.write('        bmc_address: %s\n' % bmc.address)
+            if bmc.port != 443:
+                config.write('        bmc_port: %d\n' % bmc.port)
+            config.write('        bmc_username: %s\n' % options.username)
+            config.write('        bmc_password: %s\n' % password)
+            config.write('        image: %s\n' % options.image)
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(description=FEATURE_NAME)
+    parser.add_argument("--count", type=int, default=1,
+                        help="Number of virtual BMCs to serve")
+    parser.add_argument("--address", type=str, default='127.0.0.1',
+                        help="Listen address of the first BMC ; "
+                             "see --port")
+    parser.add_argument("--port", type=int, default=None,
+                        help="Serve every BMC on this port, one per "
+                             "consecutive IP alias starting at --address")
+    parser.add_argument("--base-port", type=int, default=9000,
+                        help="Serve every BMC on --address, one per "
+                             "consecutive port starting here")
+    parser.add_argument("--tls-cert", type=str, default=None,
+                        help="TLS certificate file")
+    parser.add_argument("--tls-key", type=str, default=None,
+                        help="TLS private key file")
+    parser.add_argument("--plain-http", action='store_true',
+                        help="Serve plain http instead of https with a "
+                             "generated self signed certificate")
+    parser.add_argument("--username", type=str, default='root',
+                        help="BMC username")
+    parser.add_argument("--password", type=str, default='password',
+                        help="BMC password")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Per request latency in seconds")
+    parser.add_argument("--latency-jitter", type=float, default=0.0,
+                        help="Random additional per request latency")
+    parser.add_argument("--mount-delay", type=float, default=2.0,
+                        help="Seconds before an inserted image is mounted")
+    parser.add_argument("--eject-delay", type=float, default=0.5,
+                        help="Seconds before an ejected image is removed")
+    parser.add_argument("--power-delay", type=float, default=1.0,
+                        help="Seconds for a power state transition")
+    parser.add_argument("--session-delay", type=float, default=0.0,
+                        help="Additional seconds to create a session")
+    parser.add_argument("--session-timeout", type=float, default=0.0,
+                        help="Seconds before an idle session expires ; "
+                             "0 = never")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Probability of a 503 response ; 0..1")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="Probability of a dropped connection ; 0..1")
+    parser.add_argument("--vendor", type=str, default='generic',
+                        choices=sorted(VENDORS.keys()) + ['mixed'],
+                        help="Vendor personality")
+    parser.add_argument("--quirks", type=str, default='',
+                        help="Comma delimited quirk list ; one or more of "
+                             "%s" % ', '.join(QUIRKS))
+    parser.add_argument("--write-config", type=str, default=None,
+                        help="Write an rvmc config file for the fleet")
+    parser.add_argument("--image", type=str,
+                        default='http://127.0.0.1:8080/iso/bootimage.iso',
+                        help="Image URL used by --write-config")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Random seed for error injection")
+    options = parser.parse_args(argv)
+
+    options.quirk_set = set(q for q in options.quirks.split(',') if q)
+    unknown = options.quirk_set - set(QUIRKS)
+    if unknown:
+        parser.error("unknown quirks: %s" % ', '.join(sorted(unknown)))
+    return options
+
+
+def raise_open_file_limit():
+    """Raise the open file soft limit to the hard limit"""
+
+    soft, hard = getrlimit(RLIMIT_NOFILE)
+    if soft != hard:
+        try:
+            setrlimit(RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+
+def main(argv=None):
+    """Start the simulated BMC fleet and serve until interrupted"""
+
+    options = parse_args(argv)
+    if options.seed is not None:
+        random.seed(options.seed)
+    raise_open_file_limit()
+
+    if options.port is not None:
+        endpoints = [(address, options.port) for address in
+                     address_range(options.address, options.count)]
+    else:
+        endpoints = [(options.address, options.base_port + index)
+                     for index in range(options.count)]
+
+    ssl_context = None
+    cert_dir = None
+    if not options.plain_http and not options.tls_cert:
+        cert_dir = tempfile.mkdtemp(prefix='redfish-sim-')
+        options.tls_cert, options.tls_key = make_self_signed_cert(cert_dir)
+    if options.tls_cert and not options.plain_http:
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ssl_context.load_cert_chain(options.tls_cert, options.tls_key)
+
+    bmcs = [VirtualBmc(index + 1, address, port, options)
+            for index, (address, port) in enumerate(endpoints)]
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    for bmc in bmcs:
+        loop.run_until_complete(bmc.start(ssl_context))
+
+    if options.write_config:
+        write_config(options.write_config, bmcs, options)
+
+    sys.stdout.write("%s version %d.%d ; serving %d BMC(s) %s:%d .. %s:%d "
+                     "(%s)\n" % (FEATURE_NAME, VERSION_MAJOR, VERSION_MINOR,
+                                 len(bmcs), bmcs[0].address, bmcs[0].port,
+                                 bmcs[-1].address, bmcs[-1].port,
+                                 'https' if ssl_context else 'http'))
+    sys.stdout.flush()
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, loop.stop)
+    try:
+        loop.run_forever()
+    finally:
+        requests = sum(bmc.requests for bmc in bmcs)
+        connections = sum(bmc.connections for bmc in bmcs)
+        injected = sum(bmc.errors_injected for bmc in bmcs)
+        sys.stdout.write("Served %d requests over %d connections ; "
+                         "%d errors injected\n" %
+                         (requests, connections, injected))
+        if cert_dir:
+            for name in os.listdir(cert_dir):
+                os.remove(os.path.join(cert_dir, name))
+            os.rmdir(cert_dir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())